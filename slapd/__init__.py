@@ -1,16 +1,52 @@
 import atexit
+import contextlib
+import itertools
 import logging
 import os
+import shutil
 import socket
 import subprocess
 import sys
+import tempfile
+import threading
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import SysLogHandler
-from shutil import which
 from urllib.parse import quote_plus
 
+from slapd.batch import Batch
+from slapd.bulk import iter_chunks
+from slapd.bulk import stream
+from slapd.cache import ConfigCache
+from slapd.cache import DatasetStore
+from slapd.cache import clone_file
+from slapd.client import LDAPClient
+from slapd.config import LiveConfig
+from slapd.ldif import entries as ldif_entries
+from slapd.ldif import init_tree_ldif
+from slapd.ldif import parse as parse_ldif
+from slapd.logs import LOG_LEVEL
+from slapd.logs import LogStats
+from slapd.ports import REGISTRY
+from slapd.ports import reserve_port
+from slapd.probe import probe
+from slapd.reaper import REAPER
+from slapd.resources import ResourceSampler
+from slapd.resources import mdb_usage
+from slapd.resources import process_usage
+from slapd.stats import measure
+from slapd.storage import free_space
+from slapd.storage import memory_directory
+from slapd.tenant import Tenant
+from slapd.toolchain import Toolchain
+from slapd.tuning import database_options
+from slapd.tuning import global_options
+
 HERE = os.path.abspath(os.path.dirname(__file__))
 
+_INSTANCE_IDS = itertools.count()
+
 SLAPD_CONF_TEMPLATE = r"""dn: cn=config
 objectClass: olcGlobal
 cn: config
@@ -23,7 +59,8 @@ olcTLSCACertificateFile: %(cafile)s
 olcTLSCertificateFile: %(servercert)s
 olcTLSCertificateKeyFile: %(serverkey)s
 olcTLSVerifyClient: try
-
+olcToolThreads: %(tool_threads)s
+%(global_options)s
 dn: cn=module,cn=config
 objectClass: olcModuleList
 cn: module
@@ -42,8 +79,8 @@ olcSuffix: %(suffix)s
 olcRootDN: %(rootdn)s
 olcRootPW: %(rootpw)s
 olcDbDirectory: %(directory)s
-olcDbMaxSize: 1000000000
-"""
+olcDbMaxSize: %(db_max_size)s
+%(database_options)s"""
 
 
 def _add_sbin(path):
@@ -56,6 +93,16 @@ def _add_sbin(path):
     return os.pathsep.join(directories)
 
 
+class _SchemaDir:
+    """The schemas directory of the toolchain, looked for when first read.
+
+    Assigning a path, on a subclass or on an instance, overrides it.
+    """
+
+    def __get__(self, instance, owner):
+        return Toolchain.get(owner.BIN_PATH, owner.SBIN_PATH).schema_dir
+
+
 def combinedlogger(
     log_name,
     log_level=logging.WARN,
@@ -111,7 +158,10 @@ class Slapd:
         The default value is `127.0.0.1`.
 
     :param port: The port on which the slapd server will listen to.
-        If `None` a random available port will be chosen.
+        If `None` a random available port will be chosen. Chosen ports are
+        reserved in a lock file registry shared by the processes using this
+        library from :meth:`start` to :meth:`stop`, and another port is chosen
+        if it was taken in the meantime, or if slapd cannot bind it.
 
     :param log_level: The verbosity of Slapd.
         The default value is `logging.WARNING`.
@@ -131,20 +181,104 @@ class Slapd:
     :param debug: Wether to launch slapd with debug verbosity on. When `True` debug is enabled,
         when `False` debug is disabled, when `None`, debug is only enable when *log_level* is
         `logging.DEBUG`. Default value is `None`.
+
+    :param config_cache: A directory where validated `slapd.d` configurations are cached,
+        so instances with the same configuration, schemas and slapd version skip the
+        configuration import and test at startup. The default value is read from the
+        `SLAPD_CONFIG_CACHE` environment variable, and caching is disabled if it is unset.
+
+    :param engine: How the `ldap*` helper methods run their operations. With `cli`,
+        the OpenLDAP command line tools are executed. With `ldap`, the operations are
+        sent in-process on persistent connections, with results similar to the tools
+        ones, and the command line tools are only used for unsupported arguments.
+        The `ldap` engine needs the `python-ldap` package. Default value is `cli`.
+
+    :param ldapi_only: Whether slapd only listens on its Unix domain socket, without
+        any TCP port. Default value is `False`.
+
+    :param observer: An object whose `record` method is called with a
+        :class:`slapd.stats.Record` after each lifecycle phase and each command
+        execution, like :class:`slapd.stats.Stats`. Default value is `None`.
+
+    :param log_stats: Whether to parse the slapd *stats* logs, to measure the
+        server-side latency of the operations. `True` or a
+        :class:`slapd.logs.LogStats` object enables it, and the object is
+        available as the `log_stats` attribute. The slapd logs are then
+        forwarded to the logger at the debug level. Default value is `None`.
+
+    :param indexes: The MDB attribute indexes, as a dictionary of attribute
+        names and index types, like `{"objectClass": "eq", "cn": ["eq", "sub"]}`.
+        By default no attribute is indexed.
+
+    :param db_max_size: The maximum size of the MDB database, in bytes.
+        The default value is `1000000000`.
+
+    :param db_env_flags: A list of LMDB environment flags, among `nosync`,
+        `nometasync`, `writemap`, `mapasync` and `nordahead`.
+
+    :param db_no_sync: Whether the database is not flushed to disk after
+        each write. Default value is `False`.
+
+    :param db_checkpoint: A `(kbytes, minutes)` tuple, the database checkpoint frequency.
+
+    :param db_max_readers: The maximum number of threads reading the database.
+
+    :param size_limit: The maximum number of entries returned by a search, or `unlimited`.
+
+    :param time_limit: The maximum duration of a search in seconds, or `unlimited`.
+
+    :param threads: The size of the slapd worker threads pool.
+
+    :param listener_threads: The number of slapd listener threads, a power of 2 up to 16.
+
+    :param conn_max_pending: The maximum number of pending requests of
+        anonymous connections.
+
+    :param conn_max_pending_auth: The maximum number of pending requests of
+        authenticated connections.
+
+    The tuning parameters left to `None` keep the slapd default values.
+    Invalid values raise a :class:`ValueError`.
+
+    :param ephemeral: Whether to store the instance on a memory filesystem,
+        like `/dev/shm` or the `SLAPD_EPHEMERAL_DIR` environment variable
+        directory, with the `nosync` and `writemap` MDB environment flags.
+        The data is lost if the machine crashes, which does not matter for
+        disposable instances. The filesystem must have enough free space for
+        *db_max_size* at startup. Default value is `False`.
+
+    :param background_teardown: Whether :meth:`stop` returns immediately,
+        while a background thread terminates slapd and removes its data store.
+        The pending teardowns are finished at interpreter exit, or can be
+        awaited with :meth:`wait_teardown`. Default value is `False`.
+
+    :param dataset_store: A directory, or a :class:`slapd.cache.DatasetStore`,
+        where the databases built from the *dataset* of :meth:`start` are kept,
+        so instances with the same dataset and configuration skip the import.
+        The default value is read from the `SLAPD_DATASET_STORE` environment
+        variable, and the store is disabled if it is unset. The disk usage of
+        a store made from a directory is limited to the `SLAPD_DATASET_BUDGET`
+        environment variable value, in bytes.
     """
 
     TMPDIR = os.environ.get("TMP", os.getcwd())
-    if "SCHEMA" in os.environ:
-        SCHEMADIR = os.environ["SCHEMA"]
-    elif os.path.isdir("/etc/openldap/schema"):
-        SCHEMADIR = "/etc/openldap/schema"
-    elif os.path.isdir("/etc/ldap/schema"):
-        SCHEMADIR = "/etc/ldap/schema"
-    else:
-        SCHEMADIR = None
+    SCHEMADIR = _SchemaDir()
 
     BIN_PATH = os.environ.get("BIN", os.environ.get("PATH", os.defpath))
     SBIN_PATH = os.environ.get("SBIN", _add_sbin(BIN_PATH))
+    CONFIG_CACHE = os.environ.get("SLAPD_CONFIG_CACHE")
+    DATASET_STORE = os.environ.get("SLAPD_DATASET_STORE")
+    DATASET_BUDGET = os.environ.get("SLAPD_DATASET_BUDGET")
+    PORT_REGISTRY = REGISTRY
+
+    START_TIMEOUT = 10
+    START_ATTEMPTS = 3
+    STOP_TIMEOUT = 5
+    RESET_DELETE_COST = 0.0005
+    RESET_COPY_BANDWIDTH = 500 * 1024 * 1024
+    PROBE_INITIAL_DELAY = 0.0005
+    PROBE_MAX_DELAY = 0.1
+    TOOL_THREADS = min(os.cpu_count() or 1, 4)
 
     def __init__(
         self,
@@ -159,6 +293,26 @@ class Slapd:
         configuration_template=None,
         datadir_prefix=None,
         debug=None,
+        config_cache=None,
+        engine="cli",
+        ldapi_only=False,
+        observer=None,
+        log_stats=None,
+        indexes=None,
+        db_max_size=1000000000,
+        db_env_flags=None,
+        db_no_sync=False,
+        db_checkpoint=None,
+        db_max_readers=None,
+        size_limit=None,
+        time_limit=None,
+        threads=None,
+        listener_threads=None,
+        conn_max_pending=None,
+        conn_max_pending_auth=None,
+        ephemeral=False,
+        background_teardown=False,
+        dataset_store=None,
     ):
         self.logger = combinedlogger("python-ldap-test", log_level=log_level)
         self.schemas = schemas or ("core.ldif",)
@@ -170,33 +324,61 @@ class Slapd:
         self.host = host or "127.0.0.1"
 
         self._proc = None
-        self.port = port or self._avail_tcpport()
-        self.server_id = self.port % 4096
-        self.testrundir = os.path.join(
-            self.TMPDIR, f"{datadir_prefix or 'python-ldap-test'}-{self.port}"
-        )
-        self._slapd_conf = os.path.join(self.testrundir, "slapd.d")
-        self._db_directory = os.path.join(self.testrundir, "openldap-data")
-        self.ldap_uri = f"ldap://{self.host}:{self.port}/"
+        self.start_timings = []
+        self.observer = observer
+        self.background_teardown = background_teardown
+        self._teardown_done = None
+        self._live_config = None
+        self.tenants = {}
+        self._tenant_ids = itertools.count(1)
+        self._snapshot_lock = threading.Lock()
+        self._log_reader = None
+        self.log_stats = LogStats() if log_stats is True else log_stats or None
+        self.datadir_prefix = datadir_prefix or "python-ldap-test"
+        self.ephemeral = ephemeral
+        self.tmpdir = memory_directory() if ephemeral else self.TMPDIR
+        if ldapi_only and not hasattr(socket, "AF_UNIX"):
+            raise ValueError("ldapi_only needs Unix domain sockets support.")
+        self._port_reservation = None
+        self._port_finalizer = None
+        self._prepared = False
+        self._auto_port = port is None and not ldapi_only
+        # the port is only reserved by start, so idle instances hold no socket
+        self._set_port(None if ldapi_only else port or self._free_tcpport())
         self.configuration_template = configuration_template or SLAPD_CONF_TEMPLATE
+        self.indexes = dict(indexes or {})
+        self.db_max_size = db_max_size
+        self.db_env_flags = list(db_env_flags or [])
+        if ephemeral:
+            self.db_env_flags.extend(
+                flag for flag in ("nosync", "writemap") if flag not in self.db_env_flags
+            )
+        self.db_no_sync = db_no_sync
+        self.db_checkpoint = db_checkpoint
+        self.db_max_readers = db_max_readers
+        self.size_limit = size_limit
+        self.time_limit = time_limit
+        self.threads = threads
+        self.listener_threads = listener_threads
+        self.conn_max_pending = conn_max_pending
+        self.conn_max_pending_auth = conn_max_pending_auth
+        self._tuning_options()
         self.debug = debug
-        have_ldapi = hasattr(socket, "AF_UNIX")
-        if have_ldapi:
-            ldapi_path = os.path.join(self.testrundir, "ldapi")
-            self.ldapi_uri = f"ldapi://{quote_plus(ldapi_path)}"
-            self.default_ldap_uri = self.ldapi_uri
-            # use SASL/EXTERNAL via LDAPI when invoking OpenLDAP CLI tools
-            self.cli_sasl_external = True
-        else:
-            self.ldapi_uri = None
-            self.default_ldap_uri = self.ldap_uri
-            # Use simple bind via LDAP uri
-            self.cli_sasl_external = False
-
+        config_cache = config_cache or self.CONFIG_CACHE
+        self.config_cache = ConfigCache(config_cache) if config_cache else None
+        dataset_store = dataset_store or self.DATASET_STORE
+        if dataset_store and not isinstance(dataset_store, DatasetStore):
+            budget = int(self.DATASET_BUDGET) if self.DATASET_BUDGET else None
+            dataset_store = DatasetStore(dataset_store, budget)
+        self.dataset_store = dataset_store or None
+        self.dataset = None
+
+        self.toolchain = Toolchain.get(self.BIN_PATH, self.SBIN_PATH)
         self._find_commands()
 
         if self.SCHEMADIR is None:
             raise ValueError("SCHEMADIR is None, ldap schemas are missing.")
+        self.toolchain.check(self.database, self._schema_paths())
 
         self.cafile = os.path.join(HERE, "certs/ca.pem")
         self.servercert = os.path.join(HERE, "certs/server.pem")
@@ -204,6 +386,10 @@ class Slapd:
         self.clientcert = os.path.join(HERE, "certs/client.pem")
         self.clientkey = os.path.join(HERE, "certs/client.key")
 
+        if engine not in ("cli", "ldap"):
+            raise ValueError(f"Unknown engine {engine!r}, expected 'cli' or 'ldap'.")
+        self.client = LDAPClient(self) if engine == "ldap" else None
+
     def __enter__(self):
         self.start()
         return self
@@ -211,6 +397,18 @@ class Slapd:
     def __exit__(self, exc_type, exc_value, traceback):
         self.stop()
 
+    @property
+    def config(self):
+        """A :class:`slapd.config.LiveConfig` to reconfigure the running instance."""
+        if self._live_config is None:
+            self._live_config = LiveConfig(self)
+        return self._live_config
+
+    @property
+    def _database_dn(self):
+        """The DN of the configuration entry of the database."""
+        return f"olcDatabase={{1}}{self.database},cn=config"
+
     @property
     def root_dn(self):
         return f"cn={self.root_cn},{self.suffix}"
@@ -224,24 +422,10 @@ class Slapd:
         self.PATH_SLAPADD = self._find_command("slapadd")
         self.PATH_SLAPCAT = self._find_command("slapcat")
 
-        self.PATH_SLAPD = os.environ.get("SLAPD", None)
-        if not self.PATH_SLAPD:
-            self.PATH_SLAPD = self._find_command("slapd", in_sbin=True)
+        self.PATH_SLAPD = self.toolchain.slapd
 
     def _find_command(self, cmd, in_sbin=False):
-        if in_sbin:
-            path = self.SBIN_PATH
-            var_name = "SBIN"
-        else:
-            path = self.BIN_PATH
-            var_name = "BIN"
-        command = which(cmd, path=path)
-        if command is None:
-            raise ValueError(
-                f"Command '{cmd}' not found. Set the {var_name} environment variable to "
-                "override slapd's search path."
-            )
-        return command
+        return self.toolchain.command(cmd, in_sbin)
 
     def _setup_rundir(self):
         """Create rundir structure.
@@ -249,6 +433,11 @@ class Slapd:
         for setting up a custom directory structure you have to override
         this method
         """
+        if self.ephemeral and free_space(self.tmpdir) < self.db_max_size:
+            raise ValueError(
+                f"{self.tmpdir} has less than {self.db_max_size} bytes available "
+                "for the database, lower db_max_size."
+            )
         os.mkdir(self.testrundir)
         os.mkdir(self._db_directory)
         dir_name = os.path.join(self.testrundir, "slapd.d")
@@ -257,31 +446,79 @@ class Slapd:
 
     def _cleanup_rundir(self):
         """Recursively delete whole directory specified by `path'."""
+        self._prepared = False
         if not os.path.exists(self.testrundir):
             return
 
         self.logger.debug("clean-up %s", self.testrundir)
-        for dirpath, dirnames, filenames in os.walk(self.testrundir, topdown=False):
-            for filename in filenames:
-                self.logger.debug("remove %s", os.path.join(dirpath, filename))
-                os.remove(os.path.join(dirpath, filename))
-            for dirname in dirnames:
-                self.logger.debug("rmdir %s", os.path.join(dirpath, dirname))
-                os.rmdir(os.path.join(dirpath, dirname))
-        os.rmdir(self.testrundir)
+        shutil.rmtree(self.testrundir)
         self.logger.info("cleaned-up %s", self.testrundir)
 
-    def _avail_tcpport(self):
-        """Find an available port for TCP connection."""
-        sock = socket.socket()
-        try:
-            sock.bind((self.host, 0))
-            port = sock.getsockname()[1]
-        finally:
-            sock.close()
+    def _free_tcpport(self):
+        """Find an available port for TCP connection, without reserving it."""
+        reservation = reserve_port(self.host, self.PORT_REGISTRY)
+        reservation.release()
+        return reservation.port
 
-        self.logger.info("Found available port %d", port)
-        return port
+    def _avail_tcpport(self, preferred=None):
+        """Find an available port for TCP connection, and reserve it.
+
+        :param preferred: A port to reserve if it is still available.
+        """
+        self._release_port()
+        reservation = None
+        if preferred:
+            try:
+                reservation = reserve_port(
+                    self.host, self.PORT_REGISTRY, port=preferred
+                )
+            except RuntimeError:
+                self.logger.info("port %d is not available anymore", preferred)
+        if reservation is None:
+            reservation = reserve_port(self.host, self.PORT_REGISTRY)
+        self._port_reservation = reservation
+        self._port_finalizer = weakref.finalize(self, reservation.release)
+        self.logger.info("Found available port %d", reservation.port)
+        return reservation.port
+
+    def _release_port(self):
+        """Release the TCP port reservation, if any."""
+        if self._port_finalizer is not None:
+            self._port_finalizer()
+            self._port_finalizer = None
+        self._port_reservation = None
+
+    def _set_port(self, port):
+        """Derive the run directory, the server id and the URIs from the TCP port.
+
+        Without TCP port, the run directory is named after the process id and
+        a per-process counter.
+        """
+        self.port = port
+        if port is None:
+            instance_id = next(_INSTANCE_IDS)
+            name = f"{os.getpid()}-{instance_id}"
+            self.server_id = instance_id % 4096
+            self.ldap_uri = None
+        else:
+            name = str(port)
+            self.server_id = port % 4096
+            self.ldap_uri = f"ldap://{self.host}:{port}/"
+        self.testrundir = os.path.join(self.tmpdir, f"{self.datadir_prefix}-{name}")
+        self._slapd_conf = os.path.join(self.testrundir, "slapd.d")
+        self._db_directory = os.path.join(self.testrundir, "openldap-data")
+        have_ldapi = hasattr(socket, "AF_UNIX")
+        if have_ldapi:
+            ldapi_path = os.path.join(self.testrundir, "ldapi")
+            self.ldapi_uri = f"ldapi://{quote_plus(ldapi_path)}"
+            self.default_ldap_uri = self.ldapi_uri
+            # use SASL/EXTERNAL via LDAPI when invoking OpenLDAP CLI tools
+            self.cli_sasl_external = True
+        else:
+            self.ldapi_uri = None
+            self.default_ldap_uri = self.ldap_uri
+            # Use simple bind via LDAP uri
+            self.cli_sasl_external = False
 
     def _gen_config(self):
         """Generate a slapd.conf and returns it as one string.
@@ -301,26 +538,65 @@ class Slapd:
             "cafile": self.cafile,
             "servercert": self.servercert,
             "serverkey": self.serverkey,
+            "tool_threads": self.TOOL_THREADS,
         }
+        config_dict.update(self._tuning_options())
         return self.configuration_template % config_dict
 
+    def _tuning_options(self):
+        """Return the tuning placeholders of the configuration template, validating them."""
+        if (
+            isinstance(self.db_max_size, bool)
+            or not isinstance(self.db_max_size, int)
+            or self.db_max_size <= 0
+        ):
+            raise ValueError(f"Invalid db_max_size {self.db_max_size!r}.")
+        return {
+            "db_max_size": self.db_max_size,
+            "global_options": global_options(
+                threads=self.threads,
+                listener_threads=self.listener_threads,
+                conn_max_pending=self.conn_max_pending,
+                conn_max_pending_auth=self.conn_max_pending_auth,
+            ),
+            "database_options": database_options(
+                indexes=self.indexes,
+                env_flags=self.db_env_flags,
+                no_sync=self.db_no_sync,
+                checkpoint=self.db_checkpoint,
+                max_readers=self.db_max_readers,
+                size_limit=self.size_limit,
+                time_limit=self.time_limit,
+            ),
+        }
+
+    def _schema_path(self, schema):
+        """Return the path of a schema, given as a path or a name in `SCHEMADIR`."""
+        return (
+            schema if os.path.exists(schema) else os.path.join(self.SCHEMADIR, schema)
+        )
+
+    def _schema_paths(self):
+        """Return the paths of the schema files to load at startup."""
+        return [self._schema_path(schema) for schema in self.schemas]
+
+    def _slapd_version(self):
+        """Return the version banner of the slapd binary."""
+        return self.toolchain.version
+
     def _write_config(self):
         """Load the slapd.d configuration."""
         self.logger.debug("importing configuration: %s", self._slapd_conf)
 
         self.slapadd(self._gen_config(), ["-n0"])
-        ldif_paths = [
-            schema if os.path.exists(schema) else os.path.join(self.SCHEMADIR, schema)
-            for schema in self.schemas
-        ]
-        for ldif_path in ldif_paths:
+        for ldif_path in self._schema_paths():
             self.slapadd(None, ["-n0", "-l", ldif_path])
 
         self.logger.debug("import ok: %s", self._slapd_conf)
 
-    def _test_config(self):
-        self.logger.debug("testing config %s", self._slapd_conf)
-        popen_list = [
+    def _test_config_args(self):
+        """Return the command line testing the slapd.d configuration."""
+        return [
             self.PATH_SLAPD,
             "-Ttest",
             "-F",
@@ -330,15 +606,56 @@ class Slapd:
             "-d",
             "config",
         ]
+
+    def _test_config(self):
+        self.logger.debug("testing config %s", self._slapd_conf)
+        popen_list = self._test_config_args()
         p = subprocess.run(popen_list, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
         if p.returncode != 0:
             self.logger.error(p.stdout.decode("utf-8", errors="replace"))
             raise RuntimeError("configuration test failed")
         self.logger.info("config ok: %s", self._slapd_conf)
 
-    def _start_slapd(self):
-        """Spawns/forks the slapd process."""
-        urls = [self.ldap_uri]
+    def _configure(self):
+        """Build the slapd.d configuration, or restore it from the configuration cache."""
+        key = None
+        if (
+            self.config_cache is not None
+            and type(self)._write_config is Slapd._write_config
+        ):
+            key = self.config_cache.key(self)
+
+        if key is not None and self.config_cache.restore(key, self):
+            self.logger.info("config restored from cache: %s", self._slapd_conf)
+            return
+
+        self._phase("write_config")
+        self._phase("test_config")
+        if key is not None:
+            self.config_cache.store(key, self)
+
+    def _load_dataset(self):
+        """Import the dataset with slapadd, or restore it from the dataset store."""
+        key = None
+        if (
+            self.dataset_store is not None
+            and type(self)._write_config is Slapd._write_config
+        ):
+            key = self.dataset_store.key(self, self.dataset)
+
+        if key is not None and self.dataset_store.restore(key, self):
+            self.logger.info("dataset restored from store: %s", key)
+            return
+
+        self.slapadd(None, ["-q", "-l", os.fspath(self.dataset)])
+        if key is not None:
+            self.dataset_store.store(key, self)
+
+    def _slapd_args(self):
+        """Return the command line of the slapd process."""
+        urls = []
+        if self.ldap_uri:
+            urls.append(self.ldap_uri)
         if self.ldapi_uri:
             urls.append(self.ldapi_uri)
         slapd_args = [
@@ -352,38 +669,98 @@ class Slapd:
             self.debug is None and self.logger.isEnabledFor(logging.DEBUG)
         ):
             slapd_args.extend(["-d", "-1"])
+        elif self.log_stats is not None:
+            slapd_args.extend(["-d", LOG_LEVEL])
         else:
             slapd_args.extend(["-d", "0"])
+        return slapd_args
 
+    def _start_slapd(self):
+        """Spawns/forks the slapd process."""
+        slapd_args = self._slapd_args()
         self.logger.info("starting slapd: %r", " ".join(slapd_args))
-        self._proc = subprocess.Popen(slapd_args)
-        deadline = time.monotonic() + 10
+        if self._port_reservation is not None:
+            self._port_reservation.release_socket()
+        started = time.monotonic()
+        if self.log_stats is None:
+            self._proc = subprocess.Popen(slapd_args)
+        else:
+            self._proc = subprocess.Popen(slapd_args, stderr=subprocess.PIPE)
+            self._log_reader = threading.Thread(
+                target=self.log_stats.read,
+                args=(self._proc.stderr, self.logger),
+                daemon=True,
+            )
+            self._log_reader.start()
+        self._wait_ready(started)
+
+    def _wait_ready(self, started):
+        """Wait until slapd answers LDAP requests.
+
+        An anonymous bind is sent on the default URI, with an exponential
+        backoff between the attempts, until slapd answers or exits.
+        """
+        deadline = started + self.START_TIMEOUT
+        delay = self.PROBE_INITIAL_DELAY
+        probes = 0
         while True:
             if self._proc.poll() is not None:  # pragma: no cover
                 self._stopped()
-                raise RuntimeError("slapd exited before opening port")
+                raise SlapdExited("slapd exited before opening port")
+            probes += 1
             try:
-                self.logger.debug("slapd connection check to %s", self.default_ldap_uri)
-                self.ldapwhoami()
-            except RuntimeError:
+                probe(self.default_ldap_uri, timeout=min(1.0, self.START_TIMEOUT))
+            except OSError as exc:
+                self.logger.debug(
+                    "slapd connection check to %s: %s", self.default_ldap_uri, exc
+                )
                 if time.monotonic() >= deadline:  # pragma: no cover
                     break
-                time.sleep(0.2)
+                time.sleep(delay)
+                delay = min(delay * 2, self.PROBE_MAX_DELAY)
             else:
+                elapsed = time.monotonic() - started
+                self.start_timings.append({"ready": elapsed, "probes": probes})
+                self.logger.info(
+                    "slapd ready after %.1f ms and %d probes", elapsed * 1000, probes
+                )
                 return
         raise RuntimeError("slapd did not start properly")  # pragma: no cover
 
-    def start(self):
-        """Start the slapd server process running, and waits for it to come up."""
+    def start(self, dataset=None):
+        """Start the slapd server process running, and waits for it to come up.
+
+        :param dataset: The path of an LDIF file, including the suffix entry,
+            imported in the database before slapd starts. With *dataset_store*,
+            the database is built once and copied by the later starts.
+        """
+        self.wait_teardown()
         if self._proc is not None:
             return
+        self._live_config = None
+        self.tenants = {}
+        self.dataset = dataset
 
         atexit.register(self.stop)
-        self._cleanup_rundir()
-        self._setup_rundir()
-        self._write_config()
-        self._test_config()
-        self._start_slapd()
+        # the content of offline loads made before starting is in the run directory
+        loaded = self._prepared
+        for attempt in range(1, self.START_ATTEMPTS + 1):
+            if not self._prepared:
+                self._prepare()
+            self._prepared = False
+            if self.dataset is not None:
+                self._phase("load_dataset")
+            try:
+                self._phase("start_slapd")
+                break
+            except SlapdExited:
+                if loaded or not self._auto_port or attempt == self.START_ATTEMPTS:
+                    raise
+            # the port may have been taken by another process, try another one
+            self.logger.warning("slapd could not start on port %d", self.port)
+            self._cleanup_rundir()
+            self._set_port(self._avail_tcpport())
+
         self.logger.debug(
             "slapd with pid=%d listening on %s and %s",
             self._proc.pid,
@@ -391,20 +768,222 @@ class Slapd:
             self.ldapi_uri,
         )
 
+    def _prepare(self):
+        """Reserve the TCP port, and build the run directory and the configuration."""
+        if self._auto_port and self._port_reservation is None:
+            # the reservation is released when stopping, keep the port if possible
+            self._set_port(self._avail_tcpport(self.port))
+        self._phase("cleanup_rundir")
+        self._phase("setup_rundir")
+        self._phase("configure")
+        self._prepared = True
+
     def stop(self):
-        """Stop the slapd server, and waits for it to terminate and cleans up."""
+        """Stop the slapd server, and waits for it to terminate and cleans up.
+
+        With *background_teardown*, slapd is only sent a termination signal,
+        and the rest of the teardown happens in a background thread.
+        """
+        if not self.background_teardown:
+            self._teardown()
+            return
+
+        if self._teardown_done is not None:
+            return
         if self._proc is not None:
             self.logger.debug("stopping slapd with pid %d", self._proc.pid)
             self._proc.terminate()
-            self.wait()
-        self._cleanup_rundir()
+        self._teardown_done = threading.Event()
         atexit.unregister(self.stop)
+        REAPER.submit(self._teardown)
 
-    def restart(self):
-        """Restarts the slapd server with same data."""
+    def _teardown(self):
+        """Terminate slapd, and remove its data store."""
+        try:
+            if self._proc is not None:
+                self.logger.debug("stopping slapd with pid %d", self._proc.pid)
+                self._phase("stop_slapd")
+            self._phase("cleanup_rundir")
+            self._release_port()
+            atexit.unregister(self.stop)
+        finally:
+            if self._teardown_done is not None:
+                self._teardown_done.set()
+
+    def wait_teardown(self, timeout=None):
+        """Wait for the end of the background teardown started by :meth:`stop`.
+
+        :param timeout: The maximum duration to wait, in seconds, or `None`
+            to wait until the teardown is over.
+
+        :return: Whether the teardown is over.
+        """
+        done = self._teardown_done
+        if done is None:
+            return True
+        if not done.wait(timeout):
+            return False
+        self._teardown_done = None
+        self._live_config = None
+        return True
+
+    def _measure(self, kind, name):
+        """Measure the execution of the context for the observer."""
+        return measure(self.observer, kind, name)
+
+    def _phase(self, name):
+        """Run and measure a lifecycle phase, implemented by the `_<name>` method."""
+        with self._measure("phase", name):
+            return getattr(self, f"_{name}")()
+
+    def _stop_slapd(self):
+        """Terminate the slapd process and wait for it, killing it after `STOP_TIMEOUT`."""
         self._proc.terminate()
+        try:
+            self._proc.wait(timeout=self.STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.logger.warning(
+                "slapd[%d] did not terminate after %ss, killing it",
+                self._proc.pid,
+                self.STOP_TIMEOUT,
+            )
+            self._proc.kill()
         self.wait()
-        self._start_slapd()
+
+    @classmethod
+    def start_many(cls, n, **kwargs):
+        """Create and start `n` instances in parallel.
+
+        If any instance fails to start, all the instances are stopped.
+
+        :param n: The number of instances.
+        :param kwargs: Arguments passed to the class.
+
+        :return: The list of the started instances.
+        """
+        if n > 1 and kwargs.get("port"):
+            raise ValueError("Several instances cannot listen on the same port.")
+        servers = [cls(**kwargs) for _ in range(n)]
+        with ThreadPoolExecutor(max_workers=min(n, os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(server.start) for server in servers]
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            for server in servers:
+                server.stop()
+            raise errors[0]
+        return servers
+
+    def restart(self):
+        """Restarts the slapd server with same data."""
+        self._phase("stop_slapd")
+        self._phase("start_slapd")
+
+    @contextlib.contextmanager
+    def _paused(self):
+        """Stop the slapd process for the duration of the context, keeping its data."""
+        self._phase("stop_slapd")
+        try:
+            yield
+        finally:
+            self._phase("start_slapd")
+
+    def _entry_csns(self):
+        """Return the entryCSN of each entry of the database, indexed by DN."""
+        proc = self._cli_popen(
+            self.PATH_LDAPSEARCH,
+            extra_args=[
+                "-LLL",
+                "-o",
+                "ldif-wrap=no",
+                "-b",
+                self.suffix,
+                "(objectClass=*)",
+                "entryCSN",
+            ],
+            expected=(0, 32),
+        )
+        return {
+            dn: attributes.get("entryCSN", [None])[0]
+            for dn, attributes in parse_ldif(proc.stdout.splitlines())
+        }
+
+    def snapshot(self):
+        """Record the current state of the database, to restore it later with :meth:`reset`.
+
+        slapd is briefly stopped while the database file is copied.
+
+        :return: A :class:`Snapshot` only valid for this instance, until it is stopped.
+        """
+        # the snapshot files are numbered, and slapd can only be paused once at a time
+        with self._snapshot_lock:
+            entries = self._entry_csns()
+            snapshot_dir = os.path.join(self.testrundir, "snapshots")
+            os.makedirs(snapshot_dir, exist_ok=True)
+            path = os.path.join(snapshot_dir, f"{len(os.listdir(snapshot_dir))}.mdb")
+            with self._paused():
+                clone_file(os.path.join(self._db_directory, "data.mdb"), path)
+        self.logger.debug("snapshot of %d entries in %s", len(entries), path)
+        return Snapshot(path, entries)
+
+    def reset(self, snapshot, strategy=None):
+        """Restore the database to the state recorded by :meth:`snapshot`.
+
+        Two strategies are available:
+
+        - `"delete"` deletes the entries added since the snapshot. It is only
+          possible when the entries of the snapshot have been neither modified
+          nor deleted.
+        - `"swap"` briefly stops slapd and replaces its database file by
+          a copy of the snapshot.
+
+        :param snapshot: A :class:`Snapshot` returned by :meth:`snapshot`.
+        :param strategy: `"delete"`, `"swap"`, or `None` to pick the cheapest
+            strategy, from the number of entries to delete and the size of the
+            database. Default value is `None`.
+
+        :return: The strategy that was used.
+        """
+        if strategy not in (None, "delete", "swap"):
+            raise ValueError(f"Unknown reset strategy: {strategy!r}")
+
+        with self._snapshot_lock:
+            if strategy != "swap":
+                entries = self._entry_csns()
+                normalized = {dn.lower(): csn for dn, csn in entries.items()}
+                unchanged = all(
+                    normalized.get(dn.lower()) == csn
+                    for dn, csn in snapshot.entries.items()
+                )
+                known = {dn.lower() for dn in snapshot.entries}
+                added = [dn for dn in entries if dn.lower() not in known]
+
+                if strategy == "delete" and not unchanged:
+                    raise ValueError(
+                        "Entries of the snapshot were modified or deleted, "
+                        "they cannot be restored by deleting entries."
+                    )
+                ready = self.start_timings[-1]["ready"] if self.start_timings else 0.1
+                swap_cost = ready + snapshot.size / self.RESET_COPY_BANDWIDTH
+                if unchanged and (
+                    strategy == "delete"
+                    or len(added) * self.RESET_DELETE_COST < swap_cost
+                ):
+                    if added:
+                        # children DNs are longer than their parent DN
+                        added.sort(key=len, reverse=True)
+                        self._cli_popen(
+                            self.PATH_LDAPDELETE,
+                            stdin_data="\n".join(added).encode("utf-8"),
+                        )
+                    self.logger.debug("reset by deleting %d entries", len(added))
+                    return "delete"
+
+            data_path = os.path.join(self._db_directory, "data.mdb")
+            with self._paused():
+                clone_file(snapshot.path, f"{data_path}.tmp")
+                os.replace(f"{data_path}.tmp", data_path)
+            self.logger.debug("reset by restoring %s", snapshot.path)
+            return "swap"
 
     def wait(self):
         """Wait for the slapd process to terminate by itself."""
@@ -414,6 +993,12 @@ class Slapd:
 
     def _stopped(self):
         """Is called when the slapd server is known to have terminated."""
+        if self.client is not None:
+            self.client.close()
+        if self._log_reader is not None:
+            # let the reader parse the last lines
+            self._log_reader.join(timeout=5)
+            self._log_reader = None
         if self._proc is not None:
             self.logger.info("slapd[%d] terminated", self._proc.pid)
             self._proc = None
@@ -436,6 +1021,15 @@ class Slapd:
             ]
         return authc_args
 
+    def _cli_args(self, ldapcommand, extra_args=None, ldap_uri=None):
+        """Return the command line of an OpenLDAP tool."""
+        if ldapcommand.split("/")[-1].startswith("ldap"):
+            args = [ldapcommand, "-H", ldap_uri or self.default_ldap_uri]
+            args += self._cli_auth_args()
+        else:
+            args = [ldapcommand, "-F", self._slapd_conf]
+        return args + (extra_args or [])
+
     def _cli_popen(
         self,
         ldapcommand,
@@ -444,21 +1038,34 @@ class Slapd:
         stdin_data=None,
         expected=0,
     ):
-        if isinstance(expected, int):
-            expected = [expected]
-
         if ldap_uri is None:
             ldap_uri = self.default_ldap_uri
+        args = self._cli_args(ldapcommand, extra_args, ldap_uri)
+
+        with self._measure("command", os.path.basename(ldapcommand)) as record:
+            proc = None
+            if self.client is not None and ldapcommand.split("/")[-1].startswith(
+                "ldap"
+            ):
+                self.logger.debug("Run in-process: %r", " ".join(args))
+                proc = self.client.run(
+                    os.path.basename(ldapcommand),
+                    extra_args or [],
+                    ldap_uri,
+                    stdin_data,
+                )
+            if proc is None:
+                self.logger.debug("Run command: %r", " ".join(args))
+                proc = subprocess.run(args, input=stdin_data, capture_output=True)
+            record.bytes_in = len(stdin_data or b"")
+            record.bytes_out = len(proc.stdout or b"") + len(proc.stderr or b"")
+            return self._cli_result(proc, args, stdin_data, expected)
+
+    def _cli_result(self, proc, args, stdin_data, expected):
+        """Log the execution of an OpenLDAP tool, and check its return code."""
+        if isinstance(expected, int):
+            expected = [expected]
 
-        if ldapcommand.split("/")[-1].startswith("ldap"):
-            args = [ldapcommand, "-H", ldap_uri] + self._cli_auth_args()
-        else:
-            args = [ldapcommand, "-F", self._slapd_conf]
-
-        args += extra_args or []
-
-        self.logger.debug("Run command: %r", " ".join(args))
-        proc = subprocess.run(args, input=stdin_data, capture_output=True)
         self.logger.debug(
             "stdin_data=%s",
             stdin_data.decode("utf-8", errors="replace") if stdin_data else stdin_data,
@@ -482,6 +1089,35 @@ class Slapd:
             )
         return proc
 
+    def _cli_entries(self, ldapcommand, extra_args=None, attributes=None, expected=0):
+        """Run an OpenLDAP tool and parse its LDIF output while it is read.
+
+        The tool is always executed, even with the `ldap` engine. Its error
+        output is spooled to a temporary file. If the generator is closed
+        before the end of the output, the tool is killed and its return code
+        is not checked.
+        """
+        args = self._cli_args(ldapcommand, extra_args)
+        self.logger.debug("Run command: %r", " ".join(args))
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=stderr)
+            complete = False
+            try:
+                yield from ldif_entries(proc.stdout, attributes)
+                complete = True
+            finally:
+                if not complete:
+                    proc.kill()
+                proc.stdout.close()
+                proc.wait()
+            stderr.seek(0)
+            self._cli_result(
+                subprocess.CompletedProcess(args, proc.returncode, None, stderr.read()),
+                args,
+                None,
+                expected,
+            )
+
     def ldapwhoami(self, extra_args=None, expected=0):
         """Run ldapwhoami on this slapd instance.
 
@@ -529,6 +1165,24 @@ class Slapd:
             expected=expected,
         )
 
+    def batch(self, continue_on_error=False, max_records=1000, expected=0):
+        """Collect write operations, and send them with as few *ldapmodify* as possible.
+
+        The result can be used as a context manager, that sends the pending
+        operations when exiting without error.
+
+        :param continue_on_error: Whether to go on with the next operations
+            when one fails. Default value is `False`.
+        :param max_records: The number of pending operations triggering a
+            *ldapmodify* execution. Default value is `1000`.
+        :param expected: Expected return code of each *ldapmodify* execution.
+            Defaults to `0`.
+        :type expected: An integer or a list of integers
+
+        :return: A :class:`slapd.batch.Batch`.
+        """
+        return Batch(self, continue_on_error, max_records, expected)
+
     def ldapdelete(self, dn, recursive=False, extra_args=None, expected=0):
         """Run ldapdelete on this slapd instance, deleting 'dn'.
 
@@ -601,22 +1255,182 @@ class Slapd:
             expected=expected,
         )
 
+    def bulk_load(
+        self, source, offline=False, extra_args=None, progress=None, expected=0
+    ):
+        """Load a large amount of LDIF content, with constant memory usage.
+
+        The content is streamed in chunks to the standard input of *ldapadd*,
+        or of *slapadd -q* for offline loads. Offline loads are much faster,
+        and use the `olcToolThreads` threads to build the indexes, but slapd
+        is stopped while they run.
+
+        Offline loads are also possible before :meth:`start`: the run
+        directory and the configuration are built, and the loaded content is
+        kept for the next start. They are removed by :meth:`stop`.
+
+        :param source: The LDIF content, as accepted by :func:`slapd.bulk.iter_chunks`:
+            a :class:`str`, a :class:`bytes`, a :class:`pathlib.Path`, a file
+            object or an iterable of LDIF pieces.
+        :param offline: Whether to load the content with *slapadd* while slapd
+            is stopped. Default value is `False`.
+        :param extra_args: Extra argument to pass to *ldapadd* or *slapadd*.
+        :param progress: A callable regularly called with a
+            :class:`slapd.bulk.LoadReport` during the load.
+        :param expected: Expected return code. Defaults to `0`.
+        :type expected: An integer or a list of integers
+
+        :return: A :class:`slapd.bulk.LoadReport`.
+        """
+        extra_args = list(extra_args or [])
+        if offline and self._proc is None and not self._prepared:
+            atexit.register(self.stop)
+            self._prepare()
+        if offline:
+            command = self.PATH_SLAPADD
+            extra_args = ["-q", *extra_args]
+        else:
+            command = self.PATH_LDAPADD
+        args = self._cli_args(command, extra_args)
+        self.logger.debug("Stream to command: %r", " ".join(args))
+
+        with self._measure("command", os.path.basename(command)) as record:
+            if offline and self._proc is not None:
+                with self._paused():
+                    report = stream(args, iter_chunks(source), progress)
+            else:
+                report = stream(args, iter_chunks(source), progress)
+
+            self.logger.info("bulk load: %r", report)
+            record.bytes_in = report.bytes
+            record.bytes_out = len(report.process.stdout) + len(report.process.stderr)
+            self._cli_result(report.process, args, None, expected)
+            return report
+
+    def iter_ldapsearch(
+        self, filter, searchbase=None, attributes=None, extra_args=None, expected=0
+    ):
+        """Run search on this slapd instance and yield the entries as they are read.
+
+        Unlike :meth:`ldapsearch`, the output is never held in memory.
+
+        :param filter: The search filter.
+        :param searchbase: The search base. Defaults to :attr:`suffix`.
+        :param attributes: The names of the attributes to request. If `None`,
+            all the user attributes are returned.
+        :param extra_args: Extra argument to pass to *ldapsearch*.
+        :param expected: Expected return code. Defaults to `0`.
+        :type expected: An integer or a list of integers
+
+        :return: A generator of :class:`slapd.ldif.Entry` objects.
+        """
+        args = [
+            "-LLL",
+            "-o",
+            "ldif-wrap=no",
+            *(extra_args or []),
+            "-b",
+            searchbase or self.suffix,
+            filter,
+        ]
+        if attributes is not None:
+            args.extend(attributes or ["1.1"])
+        return self._cli_entries(
+            self.PATH_LDAPSEARCH, args, attributes=attributes, expected=expected
+        )
+
+    def iter_slapcat(self, attributes=None, extra_args=None, expected=0):
+        """Run slapcat on this slapd instance and yield the entries as they are read.
+
+        Unlike :meth:`slapcat`, the output is never held in memory.
+
+        :param attributes: The names of the attributes to keep. If `None`,
+            all the attributes, including the operational ones, are kept.
+        :param extra_args: Extra argument to pass to *slapcat*.
+        :param expected: Expected return code. Defaults to `0`.
+        :type expected: An integer or a list of integers
+
+        :return: A generator of :class:`slapd.ldif.Entry` objects.
+        """
+        return self._cli_entries(
+            self.PATH_SLAPCAT,
+            extra_args,
+            attributes=attributes,
+            expected=expected,
+        )
+
+    def _init_tree_ldif(self):
+        """Return the LDIF of the organization and applicationProcess object."""
+        return init_tree_ldif(self.suffix, self.root_cn)
+
     def init_tree(self):
         """Create the organization and applicationProcess object."""
-        suffix_dc = self.suffix.split(",")[0][3:]
-        return self.ldapadd(
-            "\n".join(
-                [
-                    "dn: " + self.suffix,
-                    "objectClass: dcObject",
-                    "objectClass: organization",
-                    "dc: " + suffix_dc,
-                    "o: " + suffix_dc,
-                    "",
-                    "dn: " + self.root_dn,
-                    "objectClass: applicationProcess",
-                    "cn: " + self.root_cn,
-                ]
-            )
-            + "\n"
-        )
+        return self.ldapadd(self._init_tree_ldif())
+
+    def resource_usage(self):
+        """Return the resources used by the slapd process and its database.
+
+        The process measures are read in `/proc`, and are only available on
+        Linux while slapd is running.
+
+        :return: A dictionary of the :func:`slapd.resources.process_usage`
+            and :func:`slapd.resources.mdb_usage` measures.
+        """
+        usage = process_usage(self._proc.pid) if self._proc is not None else {}
+        usage.update(mdb_usage(self._db_directory))
+        return usage
+
+    def sampler(self, interval=1.0):
+        """Record the resource usage periodically, as time series.
+
+        :param interval: The delay between two samples, in seconds.
+            Default value is `1.0`.
+
+        :return: A :class:`slapd.resources.ResourceSampler`, to be started.
+        """
+        return ResourceSampler(self, interval)
+
+    def add_tenant(
+        self, name=None, suffix=None, root_cn="Manager", root_pw=None, indexes=None
+    ):
+        """Add an isolated database to the running instance.
+
+        :param name: The tenant name. Defaults to `tenant-<n>`.
+        :param suffix: The tenant suffix. Defaults to `dc=<name>`.
+        :param root_cn: The tenant root user common name. The default value is `Manager`.
+        :param root_pw: The tenant root user password. Defaults to *root_pw*.
+        :param indexes: The tenant MDB attribute indexes, like *indexes*.
+
+        :return: A :class:`slapd.tenant.Tenant`, also available in the
+            `tenants` dictionary until it is removed.
+        """
+        name = name or f"tenant-{next(self._tenant_ids)}"
+        if name in self.tenants:
+            raise ValueError(f"Tenant {name!r} already exists.")
+        tenant = Tenant(self, name, suffix, root_cn, root_pw, indexes).add()
+        self.tenants[name] = tenant
+        return tenant
+
+
+class SlapdExited(RuntimeError):
+    """Raised when slapd exits before being ready."""
+
+
+class Snapshot:
+    """A recorded state of the database of a :class:`Slapd` instance.
+
+    :ivar path: The path of the copy of the database file.
+    :ivar entries: The `entryCSN` of each entry of the database, indexed by DN.
+    :ivar size: The size of the database file in bytes.
+    """
+
+    def __init__(self, path, entries):
+        self.path = path
+        self.entries = entries
+        self.size = os.path.getsize(path)
+
+
+# helpers built on top of the Slapd class
+from slapd.aio import AsyncSlapd as AsyncSlapd  # noqa: E402
+from slapd.cluster import SlapdCluster as SlapdCluster  # noqa: E402
+from slapd.pool import SlapdPool as SlapdPool  # noqa: E402
@@ -0,0 +1,426 @@
+import asyncio
+import atexit
+import os
+import signal
+import subprocess
+import time
+
+from slapd import Slapd
+from slapd import SlapdExited
+from slapd.probe import async_probe
+
+
+def _reaped(pid):
+    """Reap the child process `pid` if it has terminated, and return whether it has."""
+    try:
+        return os.waitpid(pid, os.WNOHANG)[0] != 0
+    except ChildProcessError:
+        # the event loop child watcher reaped it
+        return True
+
+
+class AsyncSlapd:
+    """:mod:`asyncio` controller class for a slapd instance.
+
+    This is the asynchronous counterpart of :class:`~slapd.Slapd`. The slapd
+    process and the OpenLDAP tools are run with
+    :func:`asyncio.create_subprocess_exec`, and the readiness of the server
+    is awaited without blocking the event loop, so many instances can be
+    started and driven concurrently.
+
+    The attributes of the underlying :class:`~slapd.Slapd` object listed in
+    :attr:`SHARED_ATTRIBUTES`, such as `ldap_uri`, `ldapi_uri`, `suffix` or
+    `root_dn`, are available on the instance. Its other methods are
+    synchronous, and would not see the process started by this class, so
+    they are not.
+
+    An instance can be used as an asynchronous context manager. When exiting
+    the context manager, the slapd server is shut down and the temporary data
+    store is removed.
+
+    :param kwargs: Arguments passed to :class:`~slapd.Slapd`.
+    """
+
+    SHARED_ATTRIBUTES = frozenset(
+        {
+            "cafile",
+            "clientcert",
+            "clientkey",
+            "database",
+            "dataset",
+            "debug",
+            "default_ldap_uri",
+            "host",
+            "indexes",
+            "ldap_uri",
+            "ldapi_uri",
+            "log_stats",
+            "logger",
+            "observer",
+            "port",
+            "root_cn",
+            "root_dn",
+            "root_pw",
+            "schemas",
+            "server_id",
+            "servercert",
+            "serverkey",
+            "start_timings",
+            "suffix",
+            "testrundir",
+            "toolchain",
+        }
+    )
+
+    def __init__(self, **kwargs):
+        self.server = Slapd(**kwargs)
+        self._proc = None
+        self._log_reader = None
+
+    def __getattr__(self, name):
+        if name in self.SHARED_ATTRIBUTES:
+            return getattr(self.server, name)
+        raise AttributeError(
+            f"{type(self).__name__!r} object has no attribute {name!r}"
+        )
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+
+    async def _exec(self, args, stdin_data=None):
+        """Run a command and return a :class:`subprocess.CompletedProcess`."""
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=subprocess.PIPE if stdin_data is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        stdout, stderr = await proc.communicate(stdin_data)
+        return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+
+    async def _configure(self):
+        """Build the slapd.d configuration, or restore it from the configuration cache."""
+        server = self.server
+        key = None
+        if (
+            server.config_cache is not None
+            and type(server)._write_config is Slapd._write_config
+        ):
+            key = await asyncio.to_thread(server.config_cache.key, server)
+
+        if key is not None and await asyncio.to_thread(
+            server.config_cache.restore, key, server
+        ):
+            server.logger.info("config restored from cache: %s", server._slapd_conf)
+            return
+
+        server.logger.debug("importing configuration: %s", server._slapd_conf)
+        await self.slapadd(server._gen_config(), ["-n0"])
+        for ldif_path in server._schema_paths():
+            await self.slapadd(None, ["-n0", "-l", ldif_path])
+
+        server.logger.debug("testing config %s", server._slapd_conf)
+        p = await self._exec(server._test_config_args())
+        if p.returncode != 0:
+            server.logger.error((p.stdout + p.stderr).decode("utf-8", errors="replace"))
+            raise RuntimeError("configuration test failed")
+        server.logger.info("config ok: %s", server._slapd_conf)
+
+        if key is not None:
+            await asyncio.to_thread(server.config_cache.store, key, server)
+
+    async def _start_slapd(self):
+        """Spawn the slapd process."""
+        slapd_args = self.server._slapd_args()
+        self.server.logger.info("starting slapd: %r", " ".join(slapd_args))
+        if self.server._port_reservation is not None:
+            self.server._port_reservation.release_socket()
+        started = time.monotonic()
+        if self.server.log_stats is None:
+            self._proc = await asyncio.create_subprocess_exec(*slapd_args)
+        else:
+            self._proc = await asyncio.create_subprocess_exec(
+                *slapd_args, stderr=subprocess.PIPE
+            )
+            self._log_reader = asyncio.ensure_future(self._read_log(self._proc.stderr))
+        await self._wait_ready(started)
+
+    async def _read_log(self, stream):
+        """Parse the slapd logs, like :meth:`slapd.logs.LogStats.read`."""
+        while line := await stream.readline():
+            self.server.log_stats.feed(line, self.server.logger)
+
+    async def _wait_ready(self, started):
+        """Wait until slapd answers LDAP requests, like :meth:`Slapd._wait_ready`."""
+        server = self.server
+        deadline = started + server.START_TIMEOUT
+        delay = server.PROBE_INITIAL_DELAY
+        probes = 0
+        while True:
+            if self._proc.returncode is not None:  # pragma: no cover
+                self._stopped()
+                raise SlapdExited("slapd exited before opening port")
+            probes += 1
+            try:
+                await async_probe(
+                    server.default_ldap_uri, timeout=min(1.0, server.START_TIMEOUT)
+                )
+            except OSError as exc:
+                server.logger.debug(
+                    "slapd connection check to %s: %s", server.default_ldap_uri, exc
+                )
+                if time.monotonic() >= deadline:  # pragma: no cover
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, server.PROBE_MAX_DELAY)
+            else:
+                elapsed = time.monotonic() - started
+                server.start_timings.append({"ready": elapsed, "probes": probes})
+                server.logger.info(
+                    "slapd ready after %.1f ms and %d probes", elapsed * 1000, probes
+                )
+                return
+        raise RuntimeError("slapd did not start properly")  # pragma: no cover
+
+    def _terminate(self):
+        """Terminate slapd at interpreter exit, when the event loop may be gone.
+
+        Like :meth:`Slapd._stop_slapd`, slapd is killed if it has not
+        terminated after `STOP_TIMEOUT`, and its data store is only removed
+        once it has.
+        """
+        if self._proc is not None and self._proc.returncode is None:
+            server = self.server
+            pid = self._proc.pid
+            try:
+                os.kill(pid, signal.SIGTERM)
+                deadline = time.monotonic() + server.STOP_TIMEOUT
+                delay = server.PROBE_INITIAL_DELAY
+                while not _reaped(pid):
+                    if time.monotonic() >= deadline:
+                        server.logger.warning(
+                            "slapd[%d] did not terminate after %ss, killing it",
+                            pid,
+                            server.STOP_TIMEOUT,
+                        )
+                        os.kill(pid, signal.SIGKILL)
+                        os.waitpid(pid, 0)
+                        break
+                    time.sleep(delay)
+                    delay = min(delay * 2, server.PROBE_MAX_DELAY)
+            except (ProcessLookupError, ChildProcessError):  # pragma: no cover
+                # the event loop child watcher reaped it
+                pass
+        self.server._cleanup_rundir()
+
+    async def start(self, dataset=None):
+        """Start the slapd server process running, and waits for it to come up.
+
+        :param dataset: The path of an LDIF file imported before slapd starts,
+            like the *dataset* of :meth:`slapd.Slapd.start`.
+        """
+        if self._proc is not None:
+            return
+
+        server = self.server
+        server.dataset = dataset
+        if server._auto_port and server._port_reservation is None:
+            server._set_port(server._avail_tcpport(server.port))
+        atexit.register(self._terminate)
+        # the content of offline loads made before starting is in the run directory
+        loaded = server._prepared
+        for attempt in range(1, server.START_ATTEMPTS + 1):
+            if not server._prepared:
+                with server._measure("phase", "cleanup_rundir"):
+                    await asyncio.to_thread(server._cleanup_rundir)
+                with server._measure("phase", "setup_rundir"):
+                    await asyncio.to_thread(server._setup_rundir)
+                with server._measure("phase", "configure"):
+                    await self._configure()
+            server._prepared = False
+            if dataset is not None:
+                with server._measure("phase", "load_dataset"):
+                    await asyncio.to_thread(server._load_dataset)
+            try:
+                with server._measure("phase", "start_slapd"):
+                    await self._start_slapd()
+                break
+            except SlapdExited:
+                if loaded or not server._auto_port or attempt == server.START_ATTEMPTS:
+                    raise
+            server.logger.warning("slapd could not start on port %d", server.port)
+            await asyncio.to_thread(server._cleanup_rundir)
+            server._set_port(server._avail_tcpport())
+        self.server.logger.debug(
+            "slapd with pid=%d listening on %s and %s",
+            self._proc.pid,
+            self.server.ldap_uri,
+            self.server.ldapi_uri,
+        )
+
+    async def stop(self):
+        """Stop the slapd server, and waits for it to terminate and cleans up."""
+        if self._proc is not None:
+            self.server.logger.debug("stopping slapd with pid %d", self._proc.pid)
+            with self.server._measure("phase", "stop_slapd"):
+                await self._stop_slapd()
+        with self.server._measure("phase", "cleanup_rundir"):
+            await asyncio.to_thread(self.server._cleanup_rundir)
+        self.server._release_port()
+        atexit.unregister(self._terminate)
+
+    async def restart(self):
+        """Restarts the slapd server with same data."""
+        await self._stop_slapd()
+        await self._start_slapd()
+
+    async def _stop_slapd(self):
+        """Terminate slapd, like :meth:`Slapd._stop_slapd`."""
+        self._proc.terminate()
+        try:
+            await asyncio.wait_for(self._proc.wait(), self.server.STOP_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.server.logger.warning(
+                "slapd[%d] did not terminate after %ss, killing it",
+                self._proc.pid,
+                self.server.STOP_TIMEOUT,
+            )
+            self._proc.kill()
+        await self.wait()
+
+    async def wait(self):
+        """Wait for the slapd process to terminate by itself."""
+        if self._proc:
+            await self._proc.wait()
+            if self._log_reader is not None:
+                # let the reader parse the last lines
+                await self._log_reader
+                self._log_reader = None
+            self._stopped()
+
+    def _stopped(self):
+        """Is called when the slapd server is known to have terminated."""
+        if self.server.client is not None:
+            self.server.client.close()
+        if self._proc is not None:
+            self.server.logger.info("slapd[%d] terminated", self._proc.pid)
+            self._proc = None
+
+    async def _cli_popen(
+        self,
+        ldapcommand,
+        extra_args=None,
+        ldap_uri=None,
+        stdin_data=None,
+        expected=0,
+    ):
+        server = self.server
+        if ldap_uri is None:
+            ldap_uri = server.default_ldap_uri
+        args = server._cli_args(ldapcommand, extra_args, ldap_uri)
+
+        with server._measure("command", os.path.basename(ldapcommand)) as record:
+            proc = None
+            if server.client is not None and os.path.basename(ldapcommand).startswith(
+                "ldap"
+            ):
+                server.logger.debug("Run in-process: %r", " ".join(args))
+                proc = await asyncio.to_thread(
+                    server.client.run,
+                    os.path.basename(ldapcommand),
+                    extra_args or [],
+                    ldap_uri,
+                    stdin_data,
+                )
+            if proc is None:
+                server.logger.debug("Run command: %r", " ".join(args))
+                proc = await self._exec(args, stdin_data)
+            record.bytes_in = len(stdin_data or b"")
+            record.bytes_out = len(proc.stdout or b"") + len(proc.stderr or b"")
+            return server._cli_result(proc, args, stdin_data, expected)
+
+    async def ldapwhoami(self, extra_args=None, expected=0):
+        """Run ldapwhoami on this slapd instance, like :meth:`Slapd.ldapwhoami`."""
+        return await self._cli_popen(
+            self.server.PATH_LDAPWHOAMI, extra_args=extra_args, expected=expected
+        )
+
+    async def ldapadd(self, ldif, extra_args=None, expected=0):
+        """Run ldapadd on this slapd instance, like :meth:`Slapd.ldapadd`."""
+        return await self._cli_popen(
+            self.server.PATH_LDAPADD,
+            extra_args=extra_args,
+            stdin_data=ldif.encode("utf-8") if ldif else None,
+            expected=expected,
+        )
+
+    async def ldapmodify(self, ldif, extra_args=None, expected=0):
+        """Run ldapmodify on this slapd instance, like :meth:`Slapd.ldapmodify`."""
+        return await self._cli_popen(
+            self.server.PATH_LDAPMODIFY,
+            extra_args=extra_args,
+            stdin_data=ldif.encode("utf-8") if ldif else None,
+            expected=expected,
+        )
+
+    async def ldapdelete(self, dn, recursive=False, extra_args=None, expected=0):
+        """Run ldapdelete on this slapd instance, like :meth:`Slapd.ldapdelete`."""
+        if extra_args is None:
+            extra_args = []
+        if recursive:
+            extra_args.append("-r")
+        extra_args.append(dn)
+        return await self._cli_popen(
+            self.server.PATH_LDAPDELETE, extra_args=extra_args, expected=expected
+        )
+
+    async def ldapsearch(self, filter, searchbase=None, extra_args=None, expected=0):
+        """Run search on this slapd instance, like :meth:`Slapd.ldapsearch`."""
+        if extra_args is None:
+            extra_args = []
+        if searchbase:
+            extra_args.extend(["-b", searchbase])
+        extra_args.append(filter)
+        return await self._cli_popen(
+            self.server.PATH_LDAPSEARCH, extra_args=extra_args, expected=expected
+        )
+
+    async def slapadd(self, ldif, extra_args=None, expected=0):
+        """Run slapadd on this slapd instance, like :meth:`Slapd.slapadd`."""
+        return await self._cli_popen(
+            self.server.PATH_SLAPADD,
+            stdin_data=ldif.encode("utf-8") if ldif else None,
+            extra_args=extra_args,
+            expected=expected,
+        )
+
+    async def slapcat(self, extra_args=None, expected=0):
+        """Run slapcat on this slapd instance, like :meth:`Slapd.slapcat`."""
+        return await self._cli_popen(
+            self.server.PATH_SLAPCAT,
+            extra_args=extra_args,
+            expected=expected,
+        )
+
+    async def bulk_load(
+        self, source, offline=False, extra_args=None, progress=None, expected=0
+    ):
+        """Load a large amount of LDIF content, like :meth:`Slapd.bulk_load`."""
+        paused = offline and self._proc is not None
+        if paused:
+            await self._stop_slapd()
+        try:
+            return await asyncio.to_thread(
+                self.server.bulk_load, source, offline, extra_args, progress, expected
+            )
+        finally:
+            if paused:
+                await self._start_slapd()
+
+    async def init_tree(self):
+        """Create the organization and applicationProcess object."""
+        return await self.ldapadd(self.server._init_tree_ldif())
@@ -0,0 +1,175 @@
+import os
+import re
+import tempfile
+
+from slapd import ldif
+
+_ERROR = re.compile(r"^# Error: (?P<message>.*?) \((?P<code>-?\d+)\)")
+
+
+class Batch:
+    """Collect LDAP write operations, and send them with a single *ldapmodify*.
+
+    The operations are formatted as LDIF change records, and sent when
+    :meth:`flush` is called, when more than *max_records* are pending, and
+    when the batch is used as a context manager and the context exits
+    without error.
+
+    Records rejected by slapd are listed in :attr:`errors`, with the
+    *ldapmodify* `-S` option.
+
+    :param server: The :class:`~slapd.Slapd` instance.
+    :param continue_on_error: Whether to go on with the next records when
+        one fails, with the *ldapmodify* `-c` option. Default value is `False`.
+    :param max_records: The number of pending records triggering a flush.
+        Default value is `1000`.
+    :param expected: Expected return code of each *ldapmodify* execution,
+        as in :meth:`~slapd.Slapd.ldapmodify`. Defaults to `0`.
+
+    :ivar errors: The rejected records, as `(dn, changetype, code, message)` tuples.
+    :ivar results: The :class:`subprocess.CompletedProcess` of each flush.
+    """
+
+    def __init__(self, server, continue_on_error=False, max_records=1000, expected=0):
+        if max_records < 1:
+            raise ValueError("max_records must be at least 1.")
+        self.server = server
+        self.continue_on_error = continue_on_error
+        self.max_records = max_records
+        self.expected = expected
+        self.errors = []
+        self.results = []
+        self._records = []
+
+    def __len__(self):
+        return len(self._records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self._records.clear()
+
+    def _append(self, dn, changetype, lines):
+        self._records.append(
+            ldif.format_line("dn", dn)
+            + f"changetype: {changetype}\n"
+            + "".join(lines)
+            + "\n"
+        )
+        if len(self._records) >= self.max_records:
+            self.flush()
+
+    def add(self, dn, attributes):
+        """Add an entry.
+
+        :param dn: The DN of the entry.
+        :param attributes: A dictionary of attribute names and lists of values.
+        """
+        self._append(
+            dn,
+            "add",
+            [
+                ldif.format_line(attribute, value)
+                for attribute, values in attributes.items()
+                for value in values
+            ],
+        )
+
+    def modify(self, dn, changes):
+        """Modify an entry.
+
+        :param dn: The DN of the entry.
+        :param changes: A list of `(operation, attribute, values)` tuples, where
+            *operation* is `add`, `delete`, `replace` or `increment`, like
+            :func:`slapd.ldif.parse_changes` returns.
+        """
+        lines = []
+        for operation, attribute, values in changes:
+            if operation not in ldif.MODIFY_OPERATIONS:
+                raise ValueError(f"Invalid modify operation {operation!r}")
+            lines.append(f"{operation}: {attribute}\n")
+            lines.extend(ldif.format_line(attribute, value) for value in values)
+            lines.append("-\n")
+        self._append(dn, "modify", lines)
+
+    def delete(self, dn):
+        """Delete an entry."""
+        self._append(dn, "delete", [])
+
+    def modrdn(self, dn, newrdn, deleteoldrdn=True, newsuperior=None):
+        """Rename or move an entry.
+
+        :param dn: The DN of the entry.
+        :param newrdn: The new RDN of the entry.
+        :param deleteoldrdn: Whether the old RDN values are removed from the entry.
+        :param newsuperior: The DN of the new parent of the entry, if it moves.
+        """
+        lines = [
+            ldif.format_line("newrdn", newrdn),
+            f"deleteoldrdn: {int(deleteoldrdn)}\n",
+        ]
+        if newsuperior is not None:
+            lines.append(ldif.format_line("newsuperior", newsuperior))
+        self._append(dn, "modrdn", lines)
+
+    def flush(self):
+        """Send the pending records.
+
+        :return: The :class:`subprocess.CompletedProcess` of *ldapmodify*, or
+            `None` if no record was pending.
+        """
+        if not self._records:
+            return None
+        records, self._records = self._records, []
+
+        fd, reject_path = tempfile.mkstemp(
+            prefix="rejects-", suffix=".ldif", dir=self.server.testrundir
+        )
+        os.close(fd)
+        extra_args = ["-S", reject_path]
+        if self.continue_on_error:
+            extra_args.append("-c")
+        try:
+            result = self.server._cli_popen(
+                self.server.PATH_LDAPMODIFY,
+                extra_args=extra_args,
+                stdin_data="".join(records).encode("utf-8"),
+                expected=self.expected,
+            )
+        finally:
+            with open(reject_path, encoding="utf-8") as rejects:
+                self.errors.extend(parse_rejects(rejects))
+            os.remove(reject_path)
+        self.results.append(result)
+        return result
+
+
+def parse_rejects(lines):
+    """Parse the rejected records written by *ldapmodify -S*.
+
+    :return: A generator of `(dn, changetype, code, message)` tuples.
+    """
+    record = []
+    error = None
+
+    def rejected():
+        for dn, changetype, _ in ldif.parse_changes(record, "add"):
+            yield dn, changetype, *error
+
+    for line in lines:
+        match = _ERROR.match(line)
+        if match:
+            error = (int(match["code"]), match["message"])
+        elif line.strip():
+            record.append(line)
+        elif record:
+            if error is not None:
+                yield from rejected()
+            record = []
+            error = None
+    if record and error is not None:
+        yield from rejected()
@@ -0,0 +1,214 @@
+"""Benchmarks of the slapd lifecycle and of the command line helpers.
+
+Run them with `python -m slapd.benchmark --output results.json`, and compare
+two runs with `python -m slapd.benchmark --compare baseline.json`.
+The same measures are available as pytest-benchmark tests in `tests/perf`.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import slapd
+from slapd.toolchain import Toolchain
+
+PAYLOAD_SIZES = (16, 1024, 64 * 1024)
+
+
+def start_phases(server):
+    """Start `server` phase by phase, like :meth:`slapd.Slapd.start` does.
+
+    The configuration cache is not used, so the full configuration is measured.
+
+    :return: A dictionary of the phase durations, in seconds.
+    """
+    timings = {}
+    atexit.register(server.stop)
+    for phase in (
+        server._cleanup_rundir,
+        server._setup_rundir,
+        server._write_config,
+        server._test_config,
+        server._start_slapd,
+    ):
+        started = time.perf_counter()
+        phase()
+        timings[phase.__name__.lstrip("_")] = time.perf_counter() - started
+    return timings
+
+
+def entry_ldif(server, index, payload_size):
+    """Return the LDIF of a test entry with a `payload_size` bytes description."""
+    return (
+        f"dn: cn=bench{index},{server.suffix}\n"
+        "objectClass: applicationProcess\n"
+        f"cn: bench{index}\n"
+        f"description: {'x' * payload_size}\n"
+    )
+
+
+def modify_ldif(server, index, payload_size):
+    """Return the LDIF replacing the description of a test entry."""
+    return (
+        f"dn: cn=bench{index},{server.suffix}\n"
+        "changetype: modify\n"
+        "replace: description\n"
+        f"description: {'y' * payload_size}\n"
+    )
+
+
+def _stats(samples):
+    mean = statistics.mean(samples)
+    return {
+        "rounds": len(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "mean": mean,
+        "median": statistics.median(samples),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops": 1 / mean if mean else 0.0,
+    }
+
+
+def run(rounds=5, operations=50, payload_sizes=PAYLOAD_SIZES, **kwargs):
+    """Run the benchmarks.
+
+    :param rounds: The number of start, restart and stop measures.
+    :param operations: The number of operations measured per helper and payload size.
+    :param payload_sizes: The sizes of the entries description, in bytes.
+    :param kwargs: Arguments passed to :class:`slapd.Slapd`.
+
+    :return: A dictionary of benchmark names and statistics, in seconds.
+    """
+    samples = {}
+
+    def record(name, duration):
+        samples.setdefault(name, []).append(duration)
+
+    for _ in range(rounds):
+        server = slapd.Slapd(**kwargs)
+        started = time.perf_counter()
+        for phase, duration in start_phases(server).items():
+            record(f"start.{phase}", duration)
+        record("start", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        server.restart()
+        record("restart", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        server.stop()
+        server.wait_teardown()
+        record("stop", time.perf_counter() - started)
+
+    with slapd.Slapd(**kwargs) as server:
+        server.init_tree()
+        index = 0
+        for size in payload_sizes:
+            for _ in range(operations):
+                index += 1
+                started = time.perf_counter()
+                server.ldapadd(entry_ldif(server, index, size))
+                record(f"ldapadd.{size}", time.perf_counter() - started)
+
+                started = time.perf_counter()
+                server.ldapsearch(f"(cn=bench{index})", server.suffix)
+                record(f"ldapsearch.{size}", time.perf_counter() - started)
+
+                started = time.perf_counter()
+                server.ldapmodify(modify_ldif(server, index, size))
+                record(f"ldapmodify.{size}", time.perf_counter() - started)
+
+    return {name: _stats(values) for name, values in samples.items()}
+
+
+def machine_info(toolchain):
+    """Describe the environment the benchmarks ran in, with the slapd of `toolchain`."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "slapd": toolchain.version,
+    }
+
+
+def compare(baseline, results, threshold=0.1):
+    """Compare the benchmark results with a baseline.
+
+    :param baseline: Results loaded from a previous run JSON file.
+    :param results: The current results.
+    :param threshold: The relative slowdown of the median above which a
+        benchmark is considered as a regression.
+
+    :return: A list of `(name, baseline median, median, ratio, regression)` tuples.
+    """
+    rows = []
+    for name, stats in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None or not previous["median"]:
+            continue
+        ratio = stats["median"] / previous["median"]
+        rows.append(
+            (name, previous["median"], stats["median"], ratio, ratio > 1 + threshold)
+        )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m slapd.benchmark")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--operations", type=int, default=50)
+    parser.add_argument(
+        "--payload-sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=PAYLOAD_SIZES,
+        help="comma separated sizes in bytes",
+    )
+    parser.add_argument("--engine", default="cli", choices=("cli", "ldap"))
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare the results with this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    results = {
+        "machine": machine_info(
+            Toolchain.get(slapd.Slapd.BIN_PATH, slapd.Slapd.SBIN_PATH)
+        ),
+        "benchmarks": run(
+            args.rounds, args.operations, args.payload_sizes, engine=args.engine
+        ),
+    }
+    if args.output:
+        with open(args.output, "w") as fd:
+            json.dump(results, fd, indent=2)
+
+    for name, stats in results["benchmarks"].items():
+        print(
+            f"{name:24} median {stats['median'] * 1000:9.3f} ms "
+            f"{stats['ops']:9.1f} ops/s"
+        )
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as fd:
+        baseline = json.load(fd)
+    regressions = 0
+    print()
+    for name, before, after, ratio, regression in compare(
+        baseline, results, args.threshold
+    ):
+        regressions += regression
+        print(
+            f"{name:24} {before * 1000:9.3f} ms -> {after * 1000:9.3f} ms "
+            f"x{ratio:.2f}{' REGRESSION' if regression else ''}"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import argparse
+import contextlib
+import itertools
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+
+import slapd
+
+
+def default_socket_path():
+    """Return the broker socket path.
+
+    It is read from the `SLAPD_BROKER_SOCKET` environment variable, and
+    defaults to a per-user path in the temporary directory.
+    """
+    return os.environ.get(
+        "SLAPD_BROKER_SOCKET",
+        os.path.join(tempfile.gettempdir(), f"slapd-broker-{os.getuid()}.sock"),
+    )
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Serve the requests of a client connection, one JSON object per line."""
+
+    def handle(self):
+        broker = self.server.broker
+        leases = {}
+        try:
+            for line in self.rfile:
+                try:
+                    response = broker._dispatch(json.loads(line), leases)
+                except Exception as exc:
+                    response = {"error": str(exc), "type": type(exc).__name__}
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        except OSError as exc:
+            broker.logger.warning("slapd broker client connection lost: %s", exc)
+        finally:
+            # the leases are scoped to the connection, crashed clients give them back
+            for server in leases.values():
+                broker._release(server)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class Broker:
+    """Lease the instances of a :class:`~slapd.SlapdPool` to other processes.
+
+    The broker listens on a Unix domain socket, and answers requests made
+    of one JSON object per line, like `{"op": "lease", "timeout": 10}`,
+    `{"op": "release", "lease": "1"}` or `{"op": "status"}`. Leased
+    instances are described by their URIs, suffix and root credentials,
+    and are given back to the pool, that resets them, when they are
+    released or when the client connection is closed.
+
+    :param pool: The :class:`~slapd.SlapdPool` of the leased instances.
+    :param path: The socket path. Defaults to :func:`default_socket_path`.
+    """
+
+    def __init__(self, pool, path=None):
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("The broker needs Unix domain sockets support.")
+        self.pool = pool
+        self.path = path or default_socket_path()
+        self.logger = logging.getLogger("python-ldap-test")
+        self._lease_ids = itertools.count(1)
+        self._leases = 0
+        self._lock = threading.Lock()
+
+        self._remove_stale_socket()
+        umask = os.umask(0o177)
+        try:
+            self._server = _Server(self.path, _Handler)
+        finally:
+            os.umask(umask)
+        self._server.broker = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.path)
+            except OSError:
+                os.unlink(self.path)
+                return
+        raise RuntimeError(f"A broker is already listening on {self.path}.")
+
+    def _dispatch(self, request, leases):
+        operation = request.get("op")
+        if operation == "lease":
+            server = self.pool.lease(request.get("timeout"))
+            lease_id = str(next(self._lease_ids))
+            leases[lease_id] = server
+            with self._lock:
+                self._leases += 1
+            self.logger.info("slapd broker leased %s as %s", server.ldap_uri, lease_id)
+            return {
+                "lease": lease_id,
+                "ldap_uri": server.ldap_uri,
+                "ldapi_uri": server.ldapi_uri,
+                "suffix": server.suffix,
+                "root_dn": server.root_dn,
+                "root_pw": server.root_pw,
+            }
+        if operation == "release":
+            server = leases.pop(request.get("lease"), None)
+            if server is None:
+                raise ValueError(f"Unknown lease {request.get('lease')!r}.")
+            self._release(server)
+            return {"released": request["lease"]}
+        if operation == "status":
+            with self._lock:
+                return {"instances": len(self.pool), "leased": self._leases}
+        raise ValueError(f"Unknown operation {operation!r}.")
+
+    def _release(self, server):
+        with self._lock:
+            self._leases -= 1
+        self.pool.release(server)
+
+    def serve_forever(self):
+        """Serve the clients until :meth:`shutdown` is called."""
+        self.logger.info("slapd broker listening on %s", self.path)
+        self._server.serve_forever()
+
+    def shutdown(self):
+        """Stop :meth:`serve_forever`, from another thread."""
+        self._server.shutdown()
+
+    def close(self):
+        """Close the socket. The pool is left open."""
+        self._server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+
+
+class Lease:
+    """An instance leased from a :class:`Broker`.
+
+    It has the connection attributes of a :class:`~slapd.Slapd` instance:
+    `ldap_uri`, `ldapi_uri`, `suffix`, `root_dn` and `root_pw`.
+    """
+
+    __slots__ = ("lease_id", "ldap_uri", "ldapi_uri", "suffix", "root_dn", "root_pw")
+
+    def __init__(self, lease_id, ldap_uri, ldapi_uri, suffix, root_dn, root_pw):
+        self.lease_id = lease_id
+        self.ldap_uri = ldap_uri
+        self.ldapi_uri = ldapi_uri
+        self.suffix = suffix
+        self.root_dn = root_dn
+        self.root_pw = root_pw
+
+    def __repr__(self):
+        return f"<Lease {self.lease_id} {self.ldap_uri or self.ldapi_uri}>"
+
+
+class BrokerClient:
+    """Lease instances from a :class:`Broker` running in another process.
+
+    The leases are held by the connection: they are given back when it is
+    closed, including when the client process dies. The client can be used
+    as a context manager, that closes the connection at exit.
+
+    :param path: The broker socket path. Defaults to :func:`default_socket_path`.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_socket_path()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.connect(self.path)
+        except OSError:
+            self._sock.close()
+            raise
+        self._file = self._sock.makefile("rwb")
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _request(self, **request):
+        with self._lock:
+            self._file.write(json.dumps(request).encode("utf-8") + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise RuntimeError("The broker closed the connection.")
+        response = json.loads(line)
+        if "error" in response:
+            if response.get("type") == "TimeoutError":
+                raise TimeoutError(response["error"])
+            raise RuntimeError(response["error"])
+        return response
+
+    def lease(self, timeout=None):
+        """Lease an instance, waiting for one if needed.
+
+        :param timeout: The maximum number of seconds to wait. `None` means no limit.
+
+        :return: A :class:`Lease`.
+        :raises TimeoutError: If no instance was ready in time.
+        """
+        response = self._request(op="lease", timeout=timeout)
+        return Lease(response.pop("lease"), **response)
+
+    def release(self, lease):
+        """Give back a leased instance, that is reset before being leased again."""
+        self._request(op="release", lease=lease.lease_id)
+
+    @contextlib.contextmanager
+    def leased(self, timeout=None):
+        """Context manager leasing an instance, and releasing it at exit."""
+        lease = self.lease(timeout)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def status(self):
+        """Return the number of pool `instances` and of `leased` ones."""
+        return self._request(op="status")
+
+    def close(self):
+        """Close the connection, giving back the leased instances."""
+        self._file.close()
+        self._sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="slapd-broker",
+        description="Lease pre-started slapd instances to other processes.",
+    )
+    parser.add_argument("--socket", default=default_socket_path())
+    parser.add_argument("--size", type=int, default=4)
+    parser.add_argument("--max-instances", type=int)
+    parser.add_argument(
+        "--schema", action="append", help="schema to load, may be repeated"
+    )
+    parser.add_argument(
+        "--init-tree", action="store_true", help="create the suffix entries"
+    )
+    parser.add_argument("--ephemeral", action="store_true")
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+
+    pool = slapd.SlapdPool(
+        size=args.size,
+        max_instances=args.max_instances,
+        setup=slapd.Slapd.init_tree if args.init_tree else None,
+        schemas=args.schema,
+        ephemeral=args.ephemeral,
+    )
+    try:
+        with Broker(pool, args.socket) as broker:
+            # shutdown waits for serve_forever, so it cannot run in the main thread
+            signal.signal(
+                signal.SIGTERM,
+                lambda signum, frame: threading.Thread(target=broker.shutdown).start(),
+            )
+            with contextlib.suppress(KeyboardInterrupt):
+                broker.serve_forever()
+    finally:
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import collections
+import os
+import subprocess
+import threading
+import time
+
+CHUNK_SIZE = 64 * 1024
+OUTPUT_LIMIT = 1024 * 1024
+
+
+def iter_chunks(source, chunk_size=CHUNK_SIZE):
+    """Read LDIF content from `source` and yield it as :class:`bytes` chunks.
+
+    :param source: The LDIF content, either as a :class:`str` or :class:`bytes`
+        object, an :class:`os.PathLike` path of a LDIF file, a file object opened
+        in text or binary mode, or an iterable of :class:`str` or :class:`bytes`
+        pieces like lines or records, for instance a generator of
+        :func:`slapd.ldif.format_record` results.
+    :param chunk_size: The approximate size of the chunks.
+    """
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if isinstance(source, bytes):
+        for i in range(0, len(source), chunk_size):
+            yield source[i : i + chunk_size]
+        return
+
+    if isinstance(source, os.PathLike):
+        with open(source, "rb") as fd:
+            yield from iter_chunks(fd, chunk_size)
+        return
+
+    if hasattr(source, "read"):
+        while True:
+            data = source.read(chunk_size)
+            if not data:
+                return
+            yield data.encode("utf-8") if isinstance(data, str) else data
+
+    buffer = []
+    size = 0
+    for piece in source:
+        if isinstance(piece, str):
+            piece = piece.encode("utf-8")
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+class LoadReport:
+    """Progress and throughput of a bulk load.
+
+    :ivar entries: The number of LDIF records sent to the tool.
+    :ivar bytes: The number of LDIF bytes sent to the tool.
+    :ivar elapsed: The duration of the load so far, in seconds.
+    :ivar process: The :class:`subprocess.CompletedProcess` of the tool, once
+        it has terminated. Only the end of its output is kept.
+    """
+
+    def __init__(self):
+        self.entries = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+        self.process = None
+
+    @property
+    def entries_per_second(self):
+        return self.entries / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (
+            f"<LoadReport {self.entries} entries, {self.bytes} bytes "
+            f"in {self.elapsed:.2f}s ({self.entries_per_second:.0f} entries/s)>"
+        )
+
+
+def _drain(stream, output):
+    """Read a process output until its end, keeping the last bytes only."""
+    size = 0
+    for data in iter(lambda: stream.read1(CHUNK_SIZE), b""):
+        output.append(data)
+        size += len(data)
+        while size - len(output[0]) >= OUTPUT_LIMIT:
+            size -= len(output.popleft())
+    stream.close()
+
+
+def stream(args, chunks, progress=None, progress_interval=1.0):
+    """Run a command and stream `chunks` of LDIF content to its standard input.
+
+    The command output is read by background threads while the input is
+    written, so memory stays constant whatever the size of the content.
+
+    :param args: The command line.
+    :param chunks: An iterable of :class:`bytes`, like :func:`iter_chunks` returns.
+    :param progress: A callable called with the :class:`LoadReport` about every
+        `progress_interval` seconds, and when the load is over.
+    :param progress_interval: The delay between two `progress` calls, in seconds.
+
+    :return: A :class:`LoadReport`.
+    """
+    report = LoadReport()
+    started = time.monotonic()
+    last_progress = started
+    # the last bytes of the previous chunk, to find "dn:" lines across chunks
+    tail = b"\n"
+
+    proc = subprocess.Popen(
+        args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    outputs = (collections.deque(), collections.deque())
+    drains = [
+        threading.Thread(target=_drain, args=(stream, output), daemon=True)
+        for stream, output in zip((proc.stdout, proc.stderr), outputs)
+    ]
+    for drain in drains:
+        drain.start()
+
+    try:
+        for chunk in chunks:
+            try:
+                proc.stdin.write(chunk)
+            except BrokenPipeError:
+                # the tool exited, its return code tells why
+                break
+            report.bytes += len(chunk)
+            report.entries += (tail + chunk).count(b"\ndn:")
+            tail = (tail + chunk)[-3:]
+            now = time.monotonic()
+            if progress is not None and now - last_progress >= progress_interval:
+                report.elapsed = now - started
+                progress(report)
+                last_progress = now
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        proc.wait()
+        for drain in drains:
+            drain.join()
+
+    report.elapsed = time.monotonic() - started
+    report.process = subprocess.CompletedProcess(
+        args, proc.returncode, b"".join(outputs[0]), b"".join(outputs[1])
+    )
+    if progress is not None:
+        progress(report)
+    return report
@@ -0,0 +1,327 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+#: Placeholders written in cached ``slapd.d`` trees in place of the values
+#: that depend on the instance that built them.
+SERVERID_PLACEHOLDER = "@SLAPD_SERVERID@"
+DIRECTORY_PLACEHOLDER = "@SLAPD_DIRECTORY@"
+
+# ioctl request cloning a file on filesystems supporting reflinks (btrfs, xfs...)
+FICLONE = 0x40049409
+
+_HEADER = "# AUTO-GENERATED FILE - DO NOT EDIT!! Use ldapmodify.\n"
+
+
+def clone_file(src, dst):
+    """Copy a file, sharing its blocks with a reflink when the filesystem allows it."""
+    with open(src, "rb") as src_fd, open(dst, "wb") as dst_fd:
+        try:
+            if fcntl is None:  # pragma: no cover
+                raise OSError("reflinks are not supported")
+            fcntl.ioctl(dst_fd.fileno(), FICLONE, src_fd.fileno())
+        except OSError:
+            shutil.copyfileobj(src_fd, dst_fd, 1024 * 1024)
+    shutil.copymode(src, dst)
+
+
+def _unfold(lines):
+    """Join LDIF continuation lines with the line they continue."""
+    unfolded = []
+    for line in lines:
+        if line.startswith(" ") and unfolded:
+            unfolded[-1] += line[1:]
+        else:
+            unfolded.append(line)
+    return unfolded
+
+
+def _rewrite_ldif(path, rewrite):
+    """Apply `rewrite` to each unfolded line of a slapd.d LDIF file.
+
+    The file is only written back if a line changed. In that case the file
+    is replaced instead of being modified in place, and the CRC32 header
+    that slapd checks when reading its configuration is recomputed.
+    """
+    with open(path, encoding="utf-8") as fd:
+        content = fd.read()
+
+    lines = content.splitlines()
+    if lines and lines[0].startswith("# AUTO-GENERATED"):
+        lines = lines[2:]
+    lines = _unfold(lines)
+    new_lines = [rewrite(line) for line in lines]
+    if new_lines == lines:
+        return
+
+    body = "\n".join(new_lines) + "\n"
+    crc = zlib.crc32(body.encode("utf-8")) & 0xFFFFFFFF
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+        tmp.write(f"{_HEADER}# CRC32 {crc:08x}\n{body}")
+    os.replace(tmp_path, path)
+
+
+def _ldif_files(root):
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(".ldif"):
+                yield os.path.join(dirpath, filename)
+
+
+def config_key(slapd):
+    """Compute a hash of the configuration of a :class:`~slapd.Slapd` instance.
+
+    The hash covers the generated configuration, without the server id and
+    the database directory, the schema file contents and the slapd version.
+
+    :return: A hexadecimal digest, or `None` if the configuration depends on
+        the instance run directory.
+    """
+    serverids = (hex(slapd.server_id), str(slapd.server_id))
+    lines = []
+    for line in _unfold(slapd._gen_config().splitlines()):
+        attribute, _, value = line.partition(":")
+        if attribute == "olcServerID" and value.strip() in serverids:
+            line = f"olcServerID: {SERVERID_PLACEHOLDER}"
+        elif attribute == "olcDbDirectory" and value.strip() == slapd._db_directory:
+            line = f"olcDbDirectory: {DIRECTORY_PLACEHOLDER}"
+        elif slapd.testrundir in line:
+            return None
+        lines.append(line)
+
+    digest = hashlib.sha256()
+    digest.update(slapd._slapd_version().encode("utf-8"))
+    digest.update(b"\0")
+    digest.update("\n".join(lines).encode("utf-8"))
+    for schema_path in slapd._schema_paths():
+        digest.update(b"\0")
+        with open(schema_path, "rb") as fd:
+            digest.update(fd.read())
+    return digest.hexdigest()
+
+
+class ConfigCache:
+    """Content-addressed cache of validated ``slapd.d`` configuration directories.
+
+    Building a ``slapd.d`` directory takes one *slapadd* run for the generated
+    configuration, one per schema, and a *slapd -Ttest* run. The cache stores
+    the result of those runs, keyed by a hash of the generated configuration,
+    the schema file contents and the slapd version, so that later instances
+    with the same configuration only need a directory copy.
+
+    The server id and the database directory depend on the instance, so they
+    are replaced by placeholders in the cached trees and rewritten when a tree
+    is restored. Configurations that reference the instance run directory
+    anywhere else are not cached.
+
+    :param path: The directory where the configuration trees are stored.
+        It is created if it does not exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def key(self, slapd):
+        """Compute the cache key of the configuration of a :class:`~slapd.Slapd` instance.
+
+        :return: A hexadecimal digest, or `None` if the configuration cannot be cached.
+        """
+        return config_key(slapd)
+
+    def restore(self, key, slapd):
+        """Copy the cached configuration tree for `key` in the instance ``slapd.d`` directory.
+
+        :return: `True` if the tree was found in the cache, `False` otherwise.
+        """
+        cached = os.path.join(self.path, key, "slapd.d")
+        if not os.path.isdir(cached):
+            return False
+
+        shutil.copytree(cached, slapd._slapd_conf, dirs_exist_ok=True)
+        serverid = hex(slapd.server_id)
+
+        def rewrite(line):
+            if line == f"olcServerID: {SERVERID_PLACEHOLDER}":
+                return f"olcServerID: {serverid}"
+            if line == f"olcDbDirectory: {DIRECTORY_PLACEHOLDER}":
+                return f"olcDbDirectory: {slapd._db_directory}"
+            return line
+
+        for path in _ldif_files(slapd._slapd_conf):
+            _rewrite_ldif(path, rewrite)
+        return True
+
+    def store(self, key, slapd):
+        """Store the instance ``slapd.d`` directory in the cache under `key`.
+
+        Concurrent stores of the same key are safe: the tree is prepared in a
+        temporary directory and renamed, and the first rename wins.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.path, prefix=".tmp-")
+        try:
+            cached = os.path.join(tmp_dir, "slapd.d")
+            shutil.copytree(slapd._slapd_conf, cached)
+            serverids = (hex(slapd.server_id), str(slapd.server_id))
+
+            def rewrite(line):
+                attribute, _, value = line.partition(":")
+                if attribute == "olcServerID" and value.strip() in serverids:
+                    return f"olcServerID: {SERVERID_PLACEHOLDER}"
+                if (
+                    attribute == "olcDbDirectory"
+                    and value.strip() == slapd._db_directory
+                ):
+                    return f"olcDbDirectory: {DIRECTORY_PLACEHOLDER}"
+                return line
+
+            for path in _ldif_files(cached):
+                _rewrite_ldif(path, rewrite)
+                with open(path, encoding="utf-8") as fd:
+                    if slapd.testrundir in "".join(_unfold(fd.read().splitlines())):
+                        slapd.logger.debug(
+                            "not caching configuration, %s references %s",
+                            path,
+                            slapd.testrundir,
+                        )
+                        return
+
+            try:
+                os.rename(tmp_dir, os.path.join(self.path, key))
+            except OSError:
+                # another instance stored the same configuration first
+                return
+            slapd.logger.debug("configuration cached as %s", key)
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+
+
+class DatasetStore:
+    """Prebuilt MDB databases of LDIF datasets, shared between instances and runs.
+
+    Importing a large LDIF file takes a *slapadd* run for each new instance.
+    The store keeps the `data.mdb` file built by *slapadd -q*, keyed by a hash
+    of the LDIF content and of the instance configuration, as computed by
+    :func:`config_key`, so later instances with the same dataset and
+    configuration only need a file copy, or a reflink when the filesystem
+    supports it.
+
+    The least recently used databases are removed when the store grows
+    above *budget*.
+
+    :param path: The directory where the databases are stored.
+        It is created if it does not exist.
+    :param budget: The maximum disk usage of the store, in bytes.
+        The default value is `None`, meaning no limit.
+    """
+
+    def __init__(self, path, budget=None):
+        self.path = path
+        self.budget = budget
+
+    def key(self, slapd, dataset):
+        """Compute the store key of an LDIF file loaded in a :class:`~slapd.Slapd` instance.
+
+        :return: A hexadecimal digest, or `None` if the dataset cannot be stored.
+        """
+        config = config_key(slapd)
+        if config is None:
+            return None
+        digest = hashlib.sha256(config.encode("utf-8"))
+        digest.update(b"\0")
+        with open(dataset, "rb") as fd:
+            for chunk in iter(lambda: fd.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def restore(self, key, slapd):
+        """Copy the database stored under `key` in the instance database directory.
+
+        :return: `True` if the database was found in the store, `False` otherwise.
+        """
+        entry = os.path.join(self.path, key)
+        destination = os.path.join(slapd._db_directory, "data.mdb")
+        try:
+            # the modification time orders the evictions, touching the entry
+            # first keeps it from being evicted while it is copied
+            os.utime(entry)
+            clone_file(os.path.join(entry, "data.mdb"), destination)
+        except BaseException as exc:
+            # do not leave a partial database behind, it would be loaded again
+            try:
+                os.remove(destination)
+            except FileNotFoundError:
+                pass
+            if isinstance(exc, FileNotFoundError):
+                return False
+            raise
+        return True
+
+    def store(self, key, slapd):
+        """Store the instance database under `key`, then evict old databases.
+
+        Concurrent stores of the same key are safe: the database is copied in
+        a temporary directory and renamed, and the first rename wins.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.path, prefix=".tmp-")
+        try:
+            clone_file(
+                os.path.join(slapd._db_directory, "data.mdb"),
+                os.path.join(tmp_dir, "data.mdb"),
+            )
+            try:
+                os.rename(tmp_dir, os.path.join(self.path, key))
+            except OSError:
+                # another instance stored the same dataset first
+                return
+            slapd.logger.debug("dataset stored as %s", key)
+        finally:
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+        self.evict(keep=key)
+
+    def entries(self):
+        """Return the stored databases.
+
+        :return: A list of `(last use time, disk usage, key)` tuples, the least
+            recently used first.
+        """
+        entries = []
+        for key in os.listdir(self.path) if os.path.isdir(self.path) else ():
+            if key.startswith("."):
+                continue
+            entry = os.path.join(self.path, key)
+            try:
+                mtime = os.stat(entry).st_mtime
+                stat = os.stat(os.path.join(entry, "data.mdb"))
+            except OSError:
+                continue
+            entries.append((mtime, getattr(stat, "st_blocks", 0) * 512, key))
+        return sorted(entries)
+
+    def evict(self, keep=None):
+        """Remove the least recently used databases until the store fits in the budget.
+
+        :param keep: A key that is not removed.
+        """
+        if self.budget is None:
+            return
+        entries = self.entries()
+        usage = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if usage <= self.budget:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+            usage -= size
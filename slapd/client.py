@@ -0,0 +1,368 @@
+import subprocess
+import threading
+
+from slapd import ldif
+
+try:
+    import ldap
+except ImportError:  # pragma: no cover
+    ldap = None
+
+# python-ldap reports client side errors with negative result codes, while
+# the OpenLDAP tools exit with the result code truncated to a byte.
+PARAM_ERROR = -9
+
+SCOPES = {"base": 0, "one": 1, "sub": 2, "children": 3}
+
+
+class Unsupported(Exception):
+    """Raised when a command line cannot be emulated in-process."""
+
+
+class LDAPClient:
+    """Run LDAP operations in-process, on persistent python-ldap connections.
+
+    The client emulates the OpenLDAP command line tools: it accepts their
+    arguments and input, and returns :class:`subprocess.CompletedProcess`
+    objects with a similar output and return code. Only a subset of the
+    tools options is supported, :meth:`run` returns `None` for the others.
+
+    One connection is kept per URI. Connections are bound with SASL/EXTERNAL
+    or with the root DN credentials, like the command line tools, and are
+    re-established if slapd has been restarted.
+
+    :param server: The :class:`~slapd.Slapd` instance to connect to.
+    """
+
+    def __init__(self, server):
+        if ldap is None:
+            raise ValueError(
+                "The in-process LDAP engine needs the python-ldap package."
+            )
+        self.server = server
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, uri):
+        conn = ldap.initialize(uri)
+        conn.set_option(ldap.OPT_PROTOCOL_VERSION, 3)
+        if self.server.cli_sasl_external:
+            conn.sasl_non_interactive_bind_s("EXTERNAL")
+        else:
+            conn.simple_bind_s(self.server.root_dn, self.server.root_pw)
+        return conn
+
+    def connection(self, uri):
+        """Return the connection to `uri`, opening it if needed."""
+        with self._lock:
+            if uri not in self._connections:
+                self._connections[uri] = self._connect(uri)
+            return self._connections[uri]
+
+    def close(self):
+        """Close all the connections."""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.unbind_s()
+            except ldap.LDAPError:
+                pass
+
+    def _call(self, uri, method, *args, **kwargs):
+        """Call a connection method, reconnecting once if the server went away."""
+        try:
+            return getattr(self.connection(uri), method)(*args, **kwargs)
+        except ldap.SERVER_DOWN:
+            with self._lock:
+                self._connections.pop(uri, None)
+            return getattr(self.connection(uri), method)(*args, **kwargs)
+
+    def run(self, tool, args, uri, stdin_data=None):
+        """Run an OpenLDAP client tool in-process.
+
+        :param tool: The tool name, like `ldapadd`.
+        :param args: The tool arguments, without the connection and authentication ones.
+        :param uri: The URI of the server.
+        :param stdin_data: The tool standard input, as :class:`bytes`.
+
+        :return: A :class:`subprocess.CompletedProcess`, or `None` if the
+            tool or its arguments are not supported.
+        """
+        handlers = {
+            "ldapwhoami": self._whoami,
+            "ldapadd": self._modify,
+            "ldapmodify": self._modify,
+            "ldapdelete": self._delete,
+            "ldapsearch": self._search,
+        }
+        if tool not in handlers:
+            return None
+
+        out = []
+        err = []
+        try:
+            returncode = handlers[tool](tool, list(args), uri, stdin_data, out, err)
+        except Unsupported:
+            return None
+        return subprocess.CompletedProcess(
+            [tool, *args],
+            returncode & 0xFF,
+            "".join(out).encode("utf-8"),
+            "".join(err).encode("utf-8"),
+        )
+
+    @staticmethod
+    def _options(args, flags, options):
+        """Split tool arguments into flags, options with a value, and operands."""
+        found = {}
+        operands = []
+        while args:
+            arg = args.pop(0)
+            if arg == "-o" and args and args[0].startswith("ldif-wrap="):
+                found["ldif-wrap"] = args.pop(0).split("=", 1)[1]
+            elif arg in options and args:
+                found[arg] = args.pop(0)
+            elif arg in flags:
+                found[arg] = found.get(arg, 0) + 1
+            elif arg.startswith("-L") and set(arg[1:]) == {"L"} and "-L" in flags:
+                found["-L"] = len(arg) - 1
+            elif arg.startswith("-"):
+                raise Unsupported(arg)
+            else:
+                operands.append(arg)
+        return found, operands
+
+    @staticmethod
+    def _error(err, operation, exc):
+        info = exc.args[0] if exc.args and isinstance(exc.args[0], dict) else {}
+        code = info.get("result", PARAM_ERROR)
+        err.append(f"{operation}: {info.get('desc', exc)} ({code})\n")
+        if info.get("matched"):
+            err.append(f"\tmatched DN: {info['matched']}\n")
+        if info.get("info"):
+            err.append(f"\tadditional info: {info['info']}\n")
+        return code
+
+    @staticmethod
+    def _values(values):
+        return [v.encode("utf-8") if isinstance(v, str) else v for v in values]
+
+    def _whoami(self, tool, args, uri, stdin_data, out, err):
+        options, operands = self._options(args, ("-v",), ())
+        if operands:
+            raise Unsupported(operands)
+        try:
+            authzid = self._call(uri, "whoami_s")
+        except ldap.LDAPError as exc:
+            return self._error(err, "ldap_whoami", exc)
+        out.append(f"{authzid or 'anonymous'}\n")
+        return 0
+
+    def _modify(self, tool, args, uri, stdin_data, out, err):
+        options, operands = self._options(args, ("-a", "-c", "-v"), ("-f", "-S"))
+        if operands:
+            raise Unsupported(operands)
+        if "-f" in options:
+            with open(options["-f"], "rb") as fd:
+                stdin_data = fd.read()
+        default = "add" if tool == "ldapadd" or "-a" in options else None
+        reject = []
+        returncode = 0
+
+        try:
+            records = list(
+                ldif.parse_changes((stdin_data or b"").splitlines(), default)
+            )
+        except ValueError as exc:
+            err.append(f"{tool}: invalid format: {exc}\n")
+            return PARAM_ERROR
+
+        for dn, changetype, changes in records:
+            try:
+                if changetype == "add":
+                    out.append(f'adding new entry "{dn}"\n')
+                    operation = "ldap_add"
+                    self._call(
+                        uri,
+                        "add_s",
+                        dn,
+                        [(k, self._values(v)) for k, v in changes.items()],
+                    )
+                elif changetype == "delete":
+                    out.append(f'deleting entry "{dn}"\n')
+                    operation = "ldap_delete"
+                    self._call(uri, "delete_s", dn)
+                elif changetype == "modify":
+                    out.append(f'modifying entry "{dn}"\n')
+                    operation = "ldap_modify"
+                    modlist = [
+                        (
+                            getattr(ldap, f"MOD_{op.upper()}"),
+                            attribute,
+                            self._values(values) or None,
+                        )
+                        for op, attribute, values in changes
+                    ]
+                    self._call(uri, "modify_s", dn, modlist)
+                else:
+                    out.append(f'modifying rdn of entry "{dn}"\n')
+                    operation = "ldap_rename"
+                    self._call(
+                        uri,
+                        "rename_s",
+                        dn,
+                        changes["newrdn"],
+                        changes["newsuperior"],
+                        int(changes["deleteoldrdn"]),
+                    )
+            except ldap.LDAPError as exc:
+                returncode = self._error(err, operation, exc)
+                reject.append((dn, changetype, changes, exc))
+                if "-c" not in options:
+                    break
+            out.append("\n")
+
+        if "-S" in options:
+            self._write_rejects(options["-S"], reject)
+        return returncode
+
+    @staticmethod
+    def _write_rejects(path, rejects):
+        """Write the rejected records like *ldapmodify -S* does."""
+        with open(path, "w", encoding="utf-8") as fd:
+            for dn, changetype, changes, exc in rejects:
+                info = exc.args[0] if exc.args and isinstance(exc.args[0], dict) else {}
+                fd.write(f"# Error: {info.get('desc', exc)} ({info.get('result')})")
+                if info.get("info"):
+                    fd.write(f", additional info: {info['info']}")
+                fd.write("\n")
+                fd.write(ldif.format_line("dn", dn))
+                fd.write(f"changetype: {changetype}\n")
+                if changetype == "add":
+                    for attribute, values in changes.items():
+                        fd.writelines(ldif.format_line(attribute, v) for v in values)
+                elif changetype == "modify":
+                    for op, attribute, values in changes:
+                        fd.write(f"{op}: {attribute}\n")
+                        fd.writelines(ldif.format_line(attribute, v) for v in values)
+                        fd.write("-\n")
+                elif changetype in ("modrdn", "moddn"):
+                    fd.write(ldif.format_line("newrdn", changes["newrdn"]))
+                    fd.write(f"deleteoldrdn: {int(changes['deleteoldrdn'])}\n")
+                    if changes["newsuperior"]:
+                        fd.write(
+                            ldif.format_line("newsuperior", changes["newsuperior"])
+                        )
+                fd.write("\n")
+
+    def _subtree(self, uri, dn):
+        """Return the DNs of the entries below `dn`, children first."""
+        results = self._call(
+            uri, "search_ext_s", dn, ldap.SCOPE_ONELEVEL, "(objectClass=*)", ["1.1"]
+        )
+        dns = []
+        for child, _ in results:
+            if child is not None:
+                dns.extend(self._subtree(uri, child))
+                dns.append(child)
+        return dns
+
+    def _delete(self, tool, args, uri, stdin_data, out, err):
+        options, dns = self._options(args, ("-c", "-r", "-v"), ("-f",))
+        if "-f" in options:
+            with open(options["-f"], "rb") as fd:
+                stdin_data = fd.read()
+        if not dns:
+            dns = [
+                line.strip()
+                for line in (stdin_data or b"").decode("utf-8").splitlines()
+                if line.strip()
+            ]
+
+        returncode = 0
+        for dn in dns:
+            try:
+                if "-r" in options:
+                    for child in self._subtree(uri, dn):
+                        self._call(uri, "delete_s", child)
+                self._call(uri, "delete_s", dn)
+            except ldap.LDAPError as exc:
+                returncode = self._error(err, "ldap_delete", exc)
+                if "-c" not in options:
+                    break
+        return returncode
+
+    def _search(self, tool, args, uri, stdin_data, out, err):
+        options, operands = self._options(args, ("-A", "-L"), ("-b", "-s", "-z", "-l"))
+        base = options.get("-b", "")
+        scope = SCOPES.get(options.get("-s", "sub"))
+        if scope is None:
+            raise Unsupported(options["-s"])
+        filterstr = operands[0] if operands else "(objectClass=*)"
+        attrlist = operands[1:] or None
+        level = options.get("-L", 0)
+        wrap = options.get("ldif-wrap", "76")
+        wrap = None if wrap == "no" else int(wrap)
+
+        if level == 0:
+            out.append(
+                "# extended LDIF\n#\n# LDAPv3\n"
+                f"# base <{base}> with scope {options.get('-s', 'subtree')}\n"
+                f"# filter: {filterstr}\n"
+                f"# requesting: {' '.join(attrlist) if attrlist else 'ALL'}\n#\n\n"
+            )
+        elif level < 3:
+            out.append("version: 1\n\n")
+
+        entries = 0
+        msgid = 1
+        info = {}
+        try:
+            msgid = self._call(
+                uri,
+                "search_ext",
+                base,
+                scope,
+                filterstr,
+                attrlist,
+                int("-A" in options),
+                timeout=int(options.get("-l", -1)),
+                sizelimit=int(options.get("-z", 0)),
+            )
+            conn = self.connection(uri)
+            rtype = None
+            while rtype != ldap.RES_SEARCH_RESULT:
+                rtype, results, _, _ = conn.result3(msgid, all=0)
+                for dn, attributes in results:
+                    if dn is None:
+                        continue
+                    entries += 1
+                    if level < 2:
+                        out.append(f"# {dn}\n")
+                    attributes = {
+                        k: [self._text(v) for v in vs] for k, vs in attributes.items()
+                    }
+                    out.append(ldif.format_record(dn, attributes, wrap))
+            code, desc = 0, "Success"
+        except ldap.LDAPError as exc:
+            if exc.args and isinstance(exc.args[0], dict):
+                info = exc.args[0]
+            code, desc = info.get("result", PARAM_ERROR), info.get("desc", str(exc))
+            if code < 0:
+                return self._error(err, "ldap_search_ext", exc)
+
+        if level == 0:
+            out.append(f"# search result\nsearch: {msgid}\nresult: {code} {desc}\n")
+            if info.get("info"):
+                out.append(f"text: {info['info']}\n")
+            out.append(f"\n# numResponses: {entries + 1}\n# numEntries: {entries}\n")
+        return code
+
+    @staticmethod
+    def _text(value):
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            return value
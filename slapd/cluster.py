@@ -0,0 +1,236 @@
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import slapd
+
+TOPOLOGIES = ("provider-consumer", "multi-provider")
+
+
+class SlapdCluster:
+    """A group of :class:`~slapd.Slapd` instances replicating with syncrepl.
+
+    With the `provider-consumer` topology, the first instance is the provider,
+    with the *syncprov* overlay, and the other instances are consumers
+    replicating it in *refreshAndPersist* mode. With the `multi-provider`
+    topology, every instance is a provider replicating all the others.
+
+    The replication is configured through `cn=config` once the instances have
+    started. The cluster can be used as a context manager. When exiting the
+    context manager, all the instances are stopped.
+
+    :param size: The number of instances. The default is `2`.
+
+    :param topology: `provider-consumer` or `multi-provider`.
+        The default is `provider-consumer`.
+
+    :param factory: A callable returning a new, not started, instance.
+        The default is :class:`~slapd.Slapd` called with *kwargs*.
+
+    :param kwargs: Arguments passed to :class:`~slapd.Slapd` by the default *factory*.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, size=2, topology="provider-consumer", factory=None, **kwargs):
+        if size < 2:
+            raise ValueError("A cluster needs at least 2 instances.")
+        if topology not in TOPOLOGIES:
+            raise ValueError(
+                f"Unknown topology {topology!r}, expected one of {', '.join(TOPOLOGIES)}."
+            )
+        factory = factory or (lambda: slapd.Slapd(**kwargs))
+        self.topology = topology
+        self.servers = [factory() for _ in range(size)]
+        self._markers = itertools.count()
+
+        if any(server.ldap_uri is None for server in self.servers):
+            raise ValueError("Replication needs instances listening on TCP.")
+        if len({server.server_id for server in self.servers}) < size:
+            raise ValueError("The instances of a cluster need distinct server ids.")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def provider(self):
+        """The instance writes should be sent to."""
+        return self.servers[0]
+
+    @property
+    def providers(self):
+        """The instances with the *syncprov* overlay."""
+        if self.topology == "multi-provider":
+            return list(self.servers)
+        return self.servers[:1]
+
+    def start(self):
+        """Start the instances in parallel, and configure the replication."""
+        with ThreadPoolExecutor(max_workers=len(self.servers)) as executor:
+            futures = [executor.submit(server.start) for server in self.servers]
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            self.stop()
+            raise errors[0]
+
+        try:
+            for server in self.servers:
+                self._configure_replication(server)
+        except Exception:
+            self.stop()
+            raise
+
+    def stop(self):
+        """Stop all the instances."""
+        for server in self.servers:
+            server.stop()
+
+    def _configure_replication(self, server):
+        """Load syncprov on providers, and add the syncrepl directives to consumers."""
+        database_dn = server._database_dn
+        ldif = (
+            "dn: cn=module{0},cn=config\n"
+            "changetype: modify\n"
+            "add: olcModuleLoad\n"
+            "olcModuleLoad: syncprov\n"
+            "\n"
+            f"dn: {database_dn}\n"
+            "changetype: modify\n"
+            "add: olcDbIndex\n"
+            "olcDbIndex: entryCSN eq\n"
+            "olcDbIndex: entryUUID eq\n"
+        )
+        if server in self.providers:
+            ldif += (
+                "\n"
+                f"dn: olcOverlay=syncprov,{database_dn}\n"
+                "changetype: add\n"
+                "objectClass: olcOverlayConfig\n"
+                "objectClass: olcSyncProvConfig\n"
+                "olcOverlay: syncprov\n"
+                "olcSpCheckpoint: 100 1\n"
+            )
+        server.ldapmodify(ldif)
+
+        remotes = [remote for remote in self.providers if remote is not server]
+        if not remotes:
+            return
+        ldif = f"dn: {database_dn}\nchangetype: modify\nadd: olcSyncrepl\n"
+        for remote in remotes:
+            ldif += (
+                f"olcSyncrepl: rid={self.servers.index(remote) + 1:03d} "
+                f"provider={remote.ldap_uri.rstrip('/')} bindmethod=simple "
+                f'binddn="{remote.root_dn}" credentials={remote.root_pw} '
+                f'searchbase="{remote.suffix}" type=refreshAndPersist '
+                'retry="1 +" timeout=1\n'
+            )
+        if self.topology == "multi-provider":
+            attribute = (
+                "olcMirrorMode"
+                if " 2.4." in server._slapd_version()
+                else "olcMultiProvider"
+            )
+            ldif += f"-\nreplace: {attribute}\n{attribute}: TRUE\n"
+        server.ldapmodify(ldif)
+
+    def context_csns(self, server):
+        """Return the set of `contextCSN` values of the suffix entry of `server`."""
+        entries = server.iter_ldapsearch(
+            "(objectClass=*)",
+            server.suffix,
+            attributes=["contextCSN"],
+            extra_args=["-s", "base"],
+            expected=(0, 32),
+        )
+        return {csn for entry in entries for csn in entry.get("contextCSN", [])}
+
+    def wait_converged(self, timeout=30):
+        """Wait until all the instances have the same `contextCSN` values.
+
+        :param timeout: The maximum duration to wait, in seconds.
+
+        :return: The waiting duration, in seconds.
+        :raises TimeoutError: If the instances did not converge in time.
+        """
+        started = time.monotonic()
+        while True:
+            csns = [self.context_csns(server) for server in self.servers]
+            if csns[0] and all(csn == csns[0] for csn in csns):
+                return time.monotonic() - started
+            if time.monotonic() - started > timeout:
+                raise TimeoutError(f"The cluster did not converge in {timeout}s.")
+            time.sleep(self.POLL_INTERVAL)
+
+    def lag(self, server=None, timeout=30):
+        """Measure the replication lag of a write.
+
+        The `description` of the suffix entry, which must exist, is modified
+        on `server`, and the other instances are polled until they see the
+        new value.
+
+        :param server: The instance the write is sent to. Defaults to :attr:`provider`.
+        :param timeout: The maximum duration to wait, in seconds.
+
+        :return: A dictionary of the lag of each other instance, in seconds,
+            indexed by their `ldap_uri`.
+        :raises TimeoutError: If an instance did not replicate the write in time.
+        """
+        server = server or self.provider
+        marker = f"replication-lag-{id(self)}-{next(self._markers)}"
+        started = time.monotonic()
+        server.ldapmodify(
+            f"dn: {server.suffix}\n"
+            "changetype: modify\n"
+            "replace: description\n"
+            f"description: {marker}\n"
+        )
+        lags = {}
+        waiting = [other for other in self.servers if other is not server]
+        while waiting:
+            for other in list(waiting):
+                entries = other.iter_ldapsearch(
+                    f"(description={marker})",
+                    other.suffix,
+                    attributes=[],
+                    extra_args=["-s", "base"],
+                    expected=(0, 32),
+                )
+                if list(entries):
+                    lags[other.ldap_uri] = time.monotonic() - started
+                    waiting.remove(other)
+            if waiting and time.monotonic() - started > timeout:
+                raise TimeoutError(f"The write was not replicated in {timeout}s.")
+            if waiting:
+                time.sleep(self.POLL_INTERVAL)
+        return lags
+
+    def catch_up(self, source, timeout=300, **kwargs):
+        """Measure the throughput of the replication of a write load.
+
+        The LDIF content is loaded on :attr:`provider` with
+        :meth:`~slapd.Slapd.bulk_load`, then the instances are waited for
+        until they converge.
+
+        :param source: The LDIF content, as accepted by :meth:`~slapd.Slapd.bulk_load`.
+        :param timeout: The maximum convergence duration, in seconds.
+        :param kwargs: Extra arguments passed to :meth:`~slapd.Slapd.bulk_load`.
+
+        :return: A dictionary with the number of loaded `entries`, the `load`
+            and `catch_up` durations in seconds, and the `throughput` of the
+            whole replication in entries per second.
+        """
+        if kwargs.get("offline"):
+            raise ValueError("Offline loads are not replicated.")
+        report = self.provider.bulk_load(source, **kwargs)
+        catch_up = self.wait_converged(timeout)
+        total = report.elapsed + catch_up
+        return {
+            "entries": report.entries,
+            "load": report.elapsed,
+            "catch_up": catch_up,
+            "throughput": report.entries / total if total else 0.0,
+        }
@@ -0,0 +1,201 @@
+import time
+
+from slapd.tuning import database_options
+from slapd.tuning import global_options
+from slapd.tuning import index_lines
+
+MONITOR_DN = "cn=Monitor"
+RUNQUEUE_DN = "cn=Runqueue,cn=Threads,cn=Monitor"
+
+
+class LiveConfig:
+    """Reconfigure a running slapd instance through `cn=config`.
+
+    The changes are sent as modify operations on the `cn=config` database,
+    and take effect without restarting slapd. The indexes, limits and
+    threads changes are also recorded in the instance attributes, so they
+    are kept when the instance is started again. The other changes are lost,
+    as the configuration is generated again at startup.
+
+    :param server: The running :class:`~slapd.Slapd` instance.
+    """
+
+    INDEX_TIMEOUT = 60
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, server):
+        self.server = server
+        self._monitor = None
+
+    def modify(self, dn, changes):
+        """Modify a configuration entry.
+
+        :param dn: The DN of the entry, like `cn=config`.
+        :param changes: A list of `(operation, attribute, values)` tuples, as
+            accepted by :meth:`slapd.batch.Batch.modify`.
+        """
+        with self.server.batch() as batch:
+            batch.modify(dn, changes)
+
+    def load_schema(self, schema):
+        """Load a schema.
+
+        :param schema: A schema name or path, like the *schemas* parameter
+            of :class:`~slapd.Slapd`.
+        """
+        with open(self.server._schema_path(schema), encoding="utf-8") as fd:
+            self.server.ldapadd(fd.read())
+
+    def add_index(self, indexes, wait=True):
+        """Add attribute indexes to the database, and wait for them to be built.
+
+        :param indexes: The indexes, as accepted by the *indexes* parameter
+            of :class:`~slapd.Slapd`.
+        :param wait: Whether to wait until slapd has indexed the existing entries.
+            Default value is `True`.
+        """
+        lines = index_lines(indexes)
+        self.modify(
+            self.server._database_dn,
+            [("add", "olcDbIndex", [line.split(": ", 1)[1].strip() for line in lines])],
+        )
+        self.server.indexes.update(indexes)
+        if wait:
+            self.wait_indexing()
+
+    def set_limits(self, size_limit=None, time_limit=None):
+        """Change the search limits of the database.
+
+        :param size_limit: The maximum number of entries returned by a search,
+            or `unlimited`.
+        :param time_limit: The maximum duration of a search in seconds, or `unlimited`.
+        """
+        options = database_options(size_limit=size_limit, time_limit=time_limit)
+        changes = [
+            ("replace", attribute, [value])
+            for attribute, value in (
+                line.split(": ", 1) for line in options.splitlines()
+            )
+        ]
+        if changes:
+            self.modify(self.server._database_dn, changes)
+        if size_limit is not None:
+            self.server.size_limit = size_limit
+        if time_limit is not None:
+            self.server.time_limit = time_limit
+
+    def set_threads(self, threads):
+        """Change the size of the slapd worker threads pool."""
+        global_options(threads=threads)
+        self.modify("cn=config", [("replace", "olcThreads", [str(threads)])])
+        self.server.threads = threads
+
+    def set_log_level(self, *levels):
+        """Change the slapd log level, like `stats` or `none`."""
+        self.modify("cn=config", [("replace", "olcLogLevel", list(levels))])
+
+    def add_overlay(self, overlay, attributes=None, object_class=None, module=None):
+        """Insert an overlay on the database.
+
+        :param overlay: The overlay name, like `memberof`.
+        :param attributes: A dictionary of the overlay configuration attributes
+            and lists of values.
+        :param object_class: The configuration object class of the overlay,
+            like `olcMemberOf`.
+        :param module: The module to load for the overlay. Defaults to the
+            overlay name. `None` values are not loaded. Modules already loaded,
+            or built in slapd, are ignored.
+
+        :return: The DN of the overlay configuration entry.
+        """
+        module = overlay if module is None else module
+        if module:
+            self._load_module(module)
+        entry = {"objectClass": ["olcOverlayConfig"], "olcOverlay": [overlay]}
+        if object_class:
+            entry["objectClass"].append(object_class)
+        entry.update(attributes or {})
+        dn = f"olcOverlay={overlay},{self.server._database_dn}"
+        with self.server.batch() as batch:
+            batch.add(dn, entry)
+        return dn
+
+    def _load_module(self, module):
+        """Load a dynamic module, like `syncprov` or `back_monitor`, if not built in."""
+        toolchain = self.server.toolchain
+        if module.startswith("back_"):
+            name, static = module[len("back_") :], toolchain.static_backends
+        else:
+            name, static = module, toolchain.static_overlays
+        if static is not None and name in static:
+            return
+        # 20 is "type or value exists". When slapd does not list the built-in
+        # modules, 80 "other" may be returned for one of them.
+        self.server.ldapmodify(
+            "dn: cn=module{0},cn=config\n"
+            "changetype: modify\n"
+            "add: olcModuleLoad\n"
+            f"olcModuleLoad: {module}\n",
+            expected=(0, 20) if static is not None else (0, 20, 80),
+        )
+
+    def _enable_monitor(self):
+        """Make sure the monitor database is available, and return whether it is."""
+        if self._monitor is None:
+            server = self.server
+            entries = server.iter_ldapsearch(
+                "(objectClass=*)",
+                MONITOR_DN,
+                attributes=[],
+                extra_args=["-s", "base"],
+                expected=(0, 32),
+            )
+            self._monitor = bool(list(entries))
+            if not self._monitor and server.toolchain.has_backend("monitor"):
+                self._load_module("back_monitor")
+                result = server.ldapadd(
+                    "dn: olcDatabase=monitor,cn=config\n"
+                    "objectClass: olcDatabaseConfig\n"
+                    "olcDatabase: monitor\n"
+                    f'olcAccess: to * by dn.exact="{server.root_dn}" read by * none\n',
+                    expected=(0, 80),
+                )
+                self._monitor = result.returncode == 0
+            if not self._monitor:
+                server.logger.warning("the slapd monitor database is not available")
+        return self._monitor
+
+    def wait_indexing(self, timeout=None):
+        """Wait until slapd has no indexing task left in its run queue.
+
+        The run queue is read in the monitor database, which is enabled if
+        needed. If it is not available, the method returns immediately.
+
+        :param timeout: The maximum duration to wait, in seconds.
+            Defaults to `INDEX_TIMEOUT`.
+
+        :raises TimeoutError: If the indexing is not over in time.
+        """
+        if not self._enable_monitor():
+            return
+        timeout = self.INDEX_TIMEOUT if timeout is None else timeout
+        started = time.monotonic()
+        while True:
+            entries = self.server.iter_ldapsearch(
+                "(objectClass=*)",
+                RUNQUEUE_DN,
+                attributes=["monitoredInfo"],
+                extra_args=["-s", "base"],
+                expected=(0, 32),
+            )
+            tasks = [
+                task
+                for entry in entries
+                for task in entry.get("monitoredInfo", [])
+                if "index" in task.lower()
+            ]
+            if not tasks:
+                return
+            if time.monotonic() - started > timeout:
+                raise TimeoutError(f"slapd indexing not over after {timeout}s.")
+            time.sleep(self.POLL_INTERVAL)
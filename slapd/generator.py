@@ -0,0 +1,202 @@
+import itertools
+import random
+
+from slapd.ldif import format_record
+
+#: The schemas needed by the generated entries.
+SCHEMAS = ("core.ldif", "cosine.ldif", "inetorgperson.ldif")
+
+#: Indexes for the searches on the generated entries, for :class:`slapd.Slapd`.
+INDEXES = {
+    "objectClass": "eq",
+    "uid": "eq",
+    "cn": "eq,sub",
+    "sn": "eq,sub",
+    "mail": "eq",
+    "member": "eq",
+}
+
+GIVEN_NAMES = (
+    "James Mary Robert Patricia John Jennifer Michael Linda David Elizabeth "
+    "William Barbara Richard Susan Joseph Jessica Thomas Sarah Charles Karen "
+    "Christopher Lisa Daniel Nancy Matthew Betty Anthony Margaret Mark Sandra "
+    "Donald Ashley Steven Kimberly Paul Emily Andrew Donna Joshua Michelle"
+).split()
+SURNAMES = (
+    "Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez "
+    "Hernandez Lopez Gonzalez Wilson Anderson Thomas Taylor Moore Jackson Martin "
+    "Lee Perez Thompson White Harris Sanchez Clark Ramirez Lewis Robinson "
+    "Walker Young Allen King Wright Scott Torres Nguyen Hill Flores"
+).split()
+TITLES = (
+    "Engineer",
+    "Senior Engineer",
+    "Manager",
+    "Director",
+    "Analyst",
+    "Consultant",
+    "Technician",
+    "Administrator",
+)
+
+
+def _zipf_weights(n, exponent):
+    """Return the cumulative weights of a Zipf distribution over `n` ranks."""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(n)))
+
+
+class DirectoryGenerator:
+    """Generate a reproducible directory tree under a suffix.
+
+    The tree contains organizational units, `inetOrgPerson` users spread
+    over the units, and `groupOfNames` groups in `ou=groups`. Names and
+    titles follow a Zipf distribution, so some values are much more frequent
+    than others, like in real directories. Entries are generated on the fly,
+    so the memory usage does not depend on the size of the tree.
+
+    The same parameters and seed always produce the same entries. The
+    entries need the schemas listed in :data:`SCHEMAS`.
+
+    :param suffix: The DN under which the entries are generated,
+        like :attr:`slapd.Slapd.suffix`.
+    :param users: The number of users.
+    :param groups: The number of groups.
+    :param ous: The number of organizational units holding the users.
+    :param group_size: The number of members of each group, or a `(min, max)`
+        tuple to draw it uniformly. Default value is `(1, 20)`.
+    :param skew: The Zipf exponent of the attribute values distribution.
+        `0` makes all the values equally frequent. Default value is `1.0`.
+    :param seed: The random seed. Default value is `0`.
+    :param suffix_entry: Whether to generate the suffix entry itself, for
+        loading into an empty database. Default value is `False`.
+    """
+
+    def __init__(
+        self,
+        suffix,
+        users=1000,
+        groups=100,
+        ous=10,
+        group_size=(1, 20),
+        skew=1.0,
+        seed=0,
+        suffix_entry=False,
+    ):
+        if isinstance(group_size, int):
+            group_size = (group_size, group_size)
+        if users < 0 or groups < 0 or ous < 1:
+            raise ValueError("users and groups must be positive, with at least one ou.")
+        if groups and not 1 <= group_size[0] <= group_size[1] <= users:
+            raise ValueError(f"Invalid group size {group_size!r} for {users} users.")
+
+        self.suffix = suffix
+        self.users = users
+        self.groups = groups
+        self.ous = ous
+        self.group_size = group_size
+        self.skew = skew
+        self.seed = seed
+        self.suffix_entry = suffix_entry
+
+    def __len__(self):
+        return int(self.suffix_entry) + self.ous + 1 + self.users + self.groups
+
+    def ou_dn(self, index):
+        """Return the DN of the organizational unit number `index`."""
+        return f"ou=unit{index},{self.suffix}"
+
+    def user_dn(self, index):
+        """Return the DN of the user number `index`."""
+        return f"uid=user{index},{self.ou_dn(index % self.ous)}"
+
+    def group_dn(self, index):
+        """Return the DN of the group number `index`."""
+        return f"cn=group{index},ou=groups,{self.suffix}"
+
+    def _user(self, rng, index, weights):
+        given_name = rng.choices(GIVEN_NAMES, cum_weights=weights["given"])[0]
+        surname = rng.choices(SURNAMES, cum_weights=weights["surname"])[0]
+        uid = f"user{index}"
+        return {
+            "objectClass": ["inetOrgPerson"],
+            "uid": [uid],
+            "cn": [f"{given_name} {surname}"],
+            "sn": [surname],
+            "givenName": [given_name],
+            "mail": [f"{uid}@example.org"],
+            "employeeNumber": [str(index)],
+            "departmentNumber": [str(index % self.ous)],
+            "title": [rng.choices(TITLES, cum_weights=weights["title"])[0]],
+            "telephoneNumber": [f"+1 555 {rng.randrange(10**7):07d}"],
+        }
+
+    def _group(self, rng, index):
+        size = rng.randint(*self.group_size)
+        return {
+            "objectClass": ["groupOfNames"],
+            "cn": [f"group{index}"],
+            "member": [
+                self.user_dn(i) for i in sorted(rng.sample(range(self.users), size))
+            ],
+        }
+
+    def entries(self):
+        """Generate the entries, parents first.
+
+        :return: A generator of `(dn, attributes)` tuples, like :func:`slapd.ldif.parse`.
+        """
+        if self.suffix_entry:
+            rdn = self.suffix.split(",")[0]
+            attribute, value = rdn.split("=", 1)
+            if attribute.lower() == "dc":
+                yield (
+                    self.suffix,
+                    {
+                        "objectClass": ["dcObject", "organization"],
+                        "dc": [value],
+                        "o": [value],
+                    },
+                )
+            else:
+                yield self.suffix, {"objectClass": ["organization"], "o": [value]}
+
+        for index in range(self.ous):
+            yield (
+                self.ou_dn(index),
+                {
+                    "objectClass": ["organizationalUnit"],
+                    "ou": [f"unit{index}"],
+                },
+            )
+        yield (
+            f"ou=groups,{self.suffix}",
+            {
+                "objectClass": ["organizationalUnit"],
+                "ou": ["groups"],
+            },
+        )
+
+        weights = {
+            "given": _zipf_weights(len(GIVEN_NAMES), self.skew),
+            "surname": _zipf_weights(len(SURNAMES), self.skew),
+            "title": _zipf_weights(len(TITLES), self.skew),
+        }
+        rng = random.Random(f"{self.seed}-users")
+        for index in range(self.users):
+            yield self.user_dn(index), self._user(rng, index, weights)
+
+        rng = random.Random(f"{self.seed}-groups")
+        for index in range(self.groups):
+            yield self.group_dn(index), self._group(rng, index)
+
+    def ldif(self, wrap=76):
+        """Generate the entries as LDIF records.
+
+        The result can be passed to :meth:`slapd.Slapd.bulk_load`.
+
+        :param wrap: The maximum line length, as in :func:`slapd.ldif.format_line`.
+
+        :return: A generator of LDIF records.
+        """
+        for dn, attributes in self.entries():
+            yield format_record(dn, attributes, wrap)
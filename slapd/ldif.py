@@ -0,0 +1,302 @@
+import base64
+
+CHANGE_TYPES = ("add", "delete", "modify", "modrdn", "moddn")
+MODIFY_OPERATIONS = ("add", "delete", "replace", "increment")
+
+_SAFE_INIT_CHARS = set(range(0x01, 0x80)) - {
+    ord("\n"),
+    ord("\r"),
+    ord(" "),
+    ord(":"),
+    ord("<"),
+}
+_SAFE_CHARS = set(range(0x01, 0x80)) - {ord("\n"), ord("\r")}
+
+
+def _logical_line(line):
+    return line.decode("utf-8") if isinstance(line, bytes) else line
+
+
+def _unfolded_lines(lines):
+    """Yield logical LDIF lines, joining folded lines and skipping comments.
+
+    Bytes lines are joined before being decoded, as folding may split a
+    multibyte character.
+    """
+    current = None
+    for line in lines:
+        line = line.rstrip(b"\r\n" if isinstance(line, bytes) else "\r\n")
+        if line[:1] in (" ", b" ") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None and current[:1] not in ("#", b"#"):
+            yield _logical_line(current)
+        current = line
+    if current is not None and current[:1] not in ("#", b"#"):
+        yield _logical_line(current)
+
+
+def parse_line(line):
+    """Split an unfolded LDIF line into an attribute name and a value.
+
+    Base64 values are decoded. Values that are not valid UTF-8 are returned
+    as :class:`bytes`, other values as :class:`str`.
+    """
+    attribute, sep, value = line.partition(":")
+    if not sep:
+        raise ValueError(f"Invalid LDIF line: {line!r}")
+    if value.startswith(":"):
+        raw = base64.b64decode(value[1:].strip())
+        try:
+            return attribute, raw.decode("utf-8")
+        except UnicodeDecodeError:
+            return attribute, raw
+    return attribute, value.lstrip(" ")
+
+
+def _records(lines):
+    """Yield the DN and the list of `(attribute, value)` pairs of each LDIF record.
+
+    The `-` separators of modify records are yielded as `("-", None)` pairs.
+    """
+    dn = None
+    pairs = []
+    for line in _unfolded_lines(lines):
+        if not line:
+            if dn is not None:
+                yield dn, pairs
+            dn = None
+            pairs = []
+            continue
+
+        if line == "-":
+            pairs.append(("-", None))
+            continue
+
+        attribute, value = parse_line(line)
+        if dn is None:
+            if attribute == "version":
+                continue
+            if attribute != "dn":
+                raise ValueError(f"LDIF record does not start with a dn: {line!r}")
+            dn = value
+        else:
+            pairs.append((attribute, value))
+
+    if dn is not None:
+        yield dn, pairs
+
+
+def parse(lines):
+    """Parse LDIF records from an iterable of lines.
+
+    Lines can be :class:`str` or :class:`bytes`, with or without their line
+    terminators, so a file object or a process output can be passed directly.
+    Records are yielded as soon as they are read.
+
+    :return: A generator of `(dn, attributes)` tuples, where *attributes* maps
+        attribute names, as written in the LDIF, to lists of values.
+    """
+    for dn, pairs in _records(lines):
+        attributes = {}
+        for attribute, value in pairs:
+            attributes.setdefault(attribute, []).append(value)
+        yield dn, attributes
+
+
+def parse_changes(lines, default_changetype=None):
+    """Parse LDIF change records from an iterable of lines.
+
+    :param lines: The LDIF lines, as accepted by :func:`parse`.
+    :param default_changetype: The change type of records without a
+        `changetype` line, like *ldapmodify -a* does with `"add"`. If `None`,
+        such records are rejected.
+
+    :return: A generator of `(dn, changetype, changes)` tuples. *changes* is an
+        attributes dictionary for `add` records, a list of `(operation,
+        attribute, values)` tuples for `modify` records, a dictionary with the
+        `newrdn`, `deleteoldrdn` and `newsuperior` keys for `modrdn` records,
+        and `None` for `delete` records.
+    """
+    for dn, pairs in _records(lines):
+        if pairs and pairs[0][0] == "changetype":
+            changetype = pairs.pop(0)[1]
+        elif default_changetype is not None:
+            changetype = default_changetype
+        else:
+            raise ValueError(f"Missing changetype in the LDIF record of {dn!r}")
+
+        if changetype not in CHANGE_TYPES:
+            raise ValueError(f"Invalid changetype {changetype!r} for {dn!r}")
+
+        if changetype == "add":
+            changes = {}
+            for attribute, value in pairs:
+                if attribute == "-":
+                    raise ValueError(f"Unexpected '-' in the add record of {dn!r}")
+                changes.setdefault(attribute, []).append(value)
+
+        elif changetype == "delete":
+            if pairs:
+                raise ValueError(f"Unexpected values in the delete record of {dn!r}")
+            changes = None
+
+        elif changetype == "modify":
+            changes = []
+            operation = None
+            for attribute, value in pairs:
+                if attribute == "-":
+                    operation = None
+                elif operation is None:
+                    if attribute not in MODIFY_OPERATIONS:
+                        raise ValueError(f"Invalid modify operation {attribute!r}")
+                    operation = attribute
+                    changes.append((operation, value, []))
+                elif attribute.lower() != changes[-1][1].lower():
+                    raise ValueError(
+                        f"Attribute {attribute!r} does not match the "
+                        f"{operation} operation on {changes[-1][1]!r}"
+                    )
+                else:
+                    changes[-1][2].append(value)
+
+        else:
+            values = dict(pairs)
+            if "newrdn" not in values or "deleteoldrdn" not in values:
+                raise ValueError(f"Incomplete modrdn record for {dn!r}")
+            changes = {
+                "newrdn": values["newrdn"],
+                "deleteoldrdn": values["deleteoldrdn"] == "1",
+                "newsuperior": values.get("newsuperior"),
+            }
+
+        yield dn, changetype, changes
+
+
+class Entry:
+    """An LDAP entry read from LDIF content.
+
+    :ivar dn: The DN of the entry.
+    :ivar attributes: A dictionary of attribute names, as written in the LDIF,
+        and lists of values.
+    """
+
+    __slots__ = ("dn", "attributes")
+
+    def __init__(self, dn, attributes):
+        self.dn = dn
+        self.attributes = attributes
+
+    def get(self, name, default=None):
+        """Return the values of an attribute, with a case-insensitive name lookup."""
+        name = name.lower()
+        for attribute, values in self.attributes.items():
+            if attribute.lower() == name:
+                return values
+        return default
+
+    def __eq__(self, other):
+        if not isinstance(other, Entry):
+            return NotImplemented
+        return self.dn == other.dn and self.attributes == other.attributes
+
+    def __repr__(self):
+        return f"Entry({self.dn!r}, {self.attributes!r})"
+
+
+def entries(lines, attributes=None):
+    """Parse LDIF records from an iterable of lines, like :func:`parse`.
+
+    :param lines: The LDIF lines, as accepted by :func:`parse`.
+    :param attributes: The names of the attributes to keep, case-insensitively.
+        Attribute options like `;binary` are ignored when matching names.
+        If `None`, all the attributes are kept.
+
+    :return: A generator of :class:`Entry` objects.
+    """
+    if attributes is not None:
+        attributes = {name.lower() for name in attributes}
+    for dn, values in parse(lines):
+        if attributes is not None:
+            values = {
+                name: value
+                for name, value in values.items()
+                if name.split(";", 1)[0].lower() in attributes
+            }
+        yield Entry(dn, values)
+
+
+def _is_safe(value):
+    if not value:
+        return True
+    return (
+        value[0] in _SAFE_INIT_CHARS
+        and value[-1] != ord(" ")
+        and all(char in _SAFE_CHARS for char in value)
+    )
+
+
+def format_line(attribute, value, wrap=76):
+    """Format an LDIF line, base64 encoding the value if needed.
+
+    :param attribute: The attribute name.
+    :param value: The value, as :class:`str` or :class:`bytes`.
+    :param wrap: The maximum line length. Longer lines are folded.
+        `None` disables folding.
+
+    :return: The LDIF line, with its line terminator.
+    """
+    raw = value.encode("utf-8") if isinstance(value, str) else value
+    if _is_safe(raw):
+        line = f"{attribute}: {raw.decode('ascii')}"
+    else:
+        line = f"{attribute}:: {base64.b64encode(raw).decode('ascii')}"
+
+    if wrap is None or len(line) <= wrap:
+        return line + "\n"
+    folded = [line[:wrap]]
+    folded.extend(
+        " " + line[i : i + wrap - 1] for i in range(wrap, len(line), wrap - 1)
+    )
+    return "\n".join(folded) + "\n"
+
+
+def init_tree_ldif(suffix, root_cn="Manager"):
+    """Return the LDIF of the organization and applicationProcess object of `suffix`.
+
+    :param suffix: The suffix, whose first RDN is a `dc`.
+    :param root_cn: The common name of the applicationProcess object.
+    """
+    suffix_dc = suffix.split(",")[0][3:]
+    return (
+        "\n".join(
+            [
+                "dn: " + suffix,
+                "objectClass: dcObject",
+                "objectClass: organization",
+                "dc: " + suffix_dc,
+                "o: " + suffix_dc,
+                "",
+                f"dn: cn={root_cn},{suffix}",
+                "objectClass: applicationProcess",
+                "cn: " + root_cn,
+            ]
+        )
+        + "\n"
+    )
+
+
+def format_record(dn, attributes, wrap=76):
+    """Format an LDIF content record.
+
+    :param dn: The DN of the entry.
+    :param attributes: A dictionary of attribute names and lists of values.
+    :param wrap: The maximum line length, as in :func:`format_line`.
+
+    :return: The LDIF record, ending with an empty line.
+    """
+    lines = [format_line("dn", dn, wrap)]
+    for attribute, values in attributes.items():
+        lines.extend(format_line(attribute, value, wrap) for value in values)
+    lines.append("\n")
+    return "".join(lines)
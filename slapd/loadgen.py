@@ -0,0 +1,414 @@
+import argparse
+import collections
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
+import slapd
+from slapd.client import SCOPES
+from slapd.generator import INDEXES
+from slapd.generator import SCHEMAS
+from slapd.generator import DirectoryGenerator
+
+try:
+    import ldap
+except ImportError:  # pragma: no cover
+    ldap = None
+
+#: The default operations mix, as relative weights.
+MIX = {
+    "search-sub": 40,
+    "search-base": 20,
+    "search-one": 10,
+    "search-unindexed": 5,
+    "modify": 10,
+    "add": 5,
+    "delete": 5,
+    "bind": 5,
+}
+
+#: The percentiles of the latencies in the reports.
+PERCENTILES = {"p50": 0.5, "p99": 0.99, "p999": 0.999}
+
+MOD_REPLACE = 2
+# the pause of the workers before the load starts, so all are connected
+START_DELAY = 0.2
+
+
+def percentile(samples, q):
+    """Return the nearest-rank percentile `q`, between 0 and 1, of sorted samples."""
+    if not samples:
+        return 0.0
+    return samples[max(0, min(len(samples) - 1, math.ceil(q * len(samples)) - 1))]
+
+
+class _Client:
+    """Run the workload operations on a python-ldap connection."""
+
+    def __init__(self, conn, spec, index, rng):
+        self.conn = conn
+        self.spec = spec
+        self.index = index
+        self.rng = rng
+        self.added = []
+        self._ids = itertools.count()
+
+    def _user(self):
+        return self.rng.randrange(self.spec["users"])
+
+    def _user_dn(self, user):
+        return f"uid=user{user},{self._ou_dn(user % self.spec['ous'])}"
+
+    def _ou_dn(self, ou):
+        return f"ou=unit{ou},{self.spec['suffix']}"
+
+    def run(self, name):
+        """Run the operation `name`, and return the name of the operation run.
+
+        Deletions of entries added by the workload are replaced by additions
+        while there are none.
+        """
+        if name == "delete" and not self.added:
+            name = "add"
+        getattr(self, name.replace("-", "_"))()
+        return name
+
+    def bind(self):
+        self.conn.simple_bind_s(self.spec["root_dn"], self.spec["root_pw"])
+
+    def search_base(self):
+        self.conn.search_s(
+            self._user_dn(self._user()), SCOPES["base"], "(objectClass=*)"
+        )
+
+    def search_one(self):
+        user = self._user()
+        self.conn.search_s(
+            self._ou_dn(user % self.spec["ous"]), SCOPES["one"], f"(uid=user{user})"
+        )
+
+    def search_sub(self):
+        self.conn.search_s(
+            self.spec["suffix"], SCOPES["sub"], f"(uid=user{self._user()})"
+        )
+
+    def search_unindexed(self):
+        self.conn.search_s(
+            self.spec["suffix"], SCOPES["sub"], f"(employeeNumber={self._user()})"
+        )
+
+    def modify(self):
+        self.conn.modify_s(
+            self._user_dn(self._user()),
+            [(MOD_REPLACE, "description", [str(self.rng.random()).encode("utf-8")])],
+        )
+
+    def add(self):
+        uid = f"load{self.index}-{next(self._ids)}"
+        dn = f"uid={uid},{self._ou_dn(self.rng.randrange(self.spec['ous']))}"
+        self.conn.add_s(
+            dn,
+            [
+                ("objectClass", [b"inetOrgPerson"]),
+                ("uid", [uid.encode("utf-8")]),
+                ("cn", [uid.encode("utf-8")]),
+                ("sn", [b"load"]),
+            ],
+        )
+        self.added.append(dn)
+
+    def delete(self):
+        self.conn.delete_s(self.added.pop())
+
+
+def _connect(spec):
+    conn = ldap.initialize(spec["uri"])
+    conn.set_option(ldap.OPT_PROTOCOL_VERSION, 3)
+    if spec["sasl_external"]:
+        conn.sasl_non_interactive_bind_s("EXTERNAL")
+    else:
+        conn.simple_bind_s(spec["root_dn"], spec["root_pw"])
+    return conn
+
+
+def _worker(spec, index):
+    """Run the operations of a worker, on its own connection.
+
+    :return: A `(latencies, errors)` tuple of dictionaries indexed by
+        operation name, of the lists of latencies and of the errors count.
+    """
+    rng = random.Random(spec["seed"] * 1000003 + index)
+    conn = _connect(spec)
+    client = _Client(conn, spec, index, rng)
+    names = list(spec["mix"])
+    weights = list(itertools.accumulate(spec["mix"].values()))
+    latencies = collections.defaultdict(list)
+    errors = collections.Counter()
+
+    operations = spec["operations"]
+    if operations is not None:
+        operations = operations // spec["concurrency"] + (
+            index < operations % spec["concurrency"]
+        )
+    start = spec["start"]
+    end = start + spec["duration"] if spec["duration"] else math.inf
+    rate = spec["rate"]
+    time.sleep(max(0.0, start - time.time()))
+
+    done = 0
+    while operations is None or done < operations:
+        if rate:
+            # open loop: the operations arrive on a fixed schedule, and the
+            # latency includes the time spent waiting for the previous ones
+            scheduled = start + (done * spec["concurrency"] + index) / rate
+            if scheduled >= end:
+                break
+            time.sleep(max(0.0, scheduled - time.time()))
+        elif time.time() >= end:
+            break
+        else:
+            scheduled = time.time()
+
+        name = rng.choices(names, cum_weights=weights)[0]
+        try:
+            name = client.run(name)
+        except ldap.LDAPError:
+            errors[name] += 1
+        latencies[name].append(time.time() - scheduled)
+        done += 1
+
+    conn.unbind_s()
+    return dict(latencies), dict(errors)
+
+
+class WorkloadReport:
+    """The results of a :meth:`Workload.run`.
+
+    :ivar latencies: The sorted latencies of each operation, in seconds.
+    :ivar errors: The number of failed operations, by operation name.
+    :ivar elapsed: The duration of the run, in seconds.
+    """
+
+    def __init__(self, latencies, errors, elapsed):
+        self.latencies = {name: sorted(values) for name, values in latencies.items()}
+        self.errors = dict(errors)
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (
+            f"<WorkloadReport operations={self.operations} "
+            f"ops/s={self.ops_per_second:.1f} p99={self.percentile(0.99) * 1000:.3f}ms>"
+        )
+
+    @property
+    def operations(self):
+        """The number of operations run, including the failed ones."""
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def ops_per_second(self):
+        return self.operations / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, q, name=None):
+        """Return the latency percentile `q`, of all the operations or of `name`."""
+        if name is not None:
+            return percentile(self.latencies.get(name, []), q)
+        return percentile(sorted(itertools.chain(*self.latencies.values())), q)
+
+    def _summary(self, samples, errors):
+        return {
+            "operations": len(samples),
+            "errors": errors,
+            "ops": len(samples) / self.elapsed if self.elapsed else 0.0,
+            "mean": sum(samples) / len(samples) if samples else 0.0,
+            **{key: percentile(samples, q) for key, q in PERCENTILES.items()},
+            "max": samples[-1] if samples else 0.0,
+        }
+
+    def as_dict(self):
+        """Return the summary of all the operations, and of each operation.
+
+        :return: A dictionary with the `elapsed` time, the `total` summary,
+            and the `operations` summaries indexed by operation name. The
+            summaries have the `operations` and `errors` counts, the `ops`
+            per second, and the `mean`, `p50`, `p99`, `p999` and `max`
+            latencies in seconds.
+        """
+        return {
+            "elapsed": self.elapsed,
+            "total": self._summary(
+                sorted(itertools.chain(*self.latencies.values())),
+                sum(self.errors.values()),
+            ),
+            "operations": {
+                name: self._summary(values, self.errors.get(name, 0))
+                for name, values in sorted(self.latencies.items())
+            },
+        }
+
+
+class Workload:
+    """Generate a concurrent LDAP load on a running :class:`~slapd.Slapd` instance.
+
+    Each worker holds a persistent python-ldap connection, and runs a random
+    mix of bind, search, add, modify and delete operations on a tree made by
+    a :class:`~slapd.generator.DirectoryGenerator`, that :meth:`load` adds.
+    The indexed searches use the :data:`slapd.generator.INDEXES` attributes.
+
+    In the closed loop mode, each worker sends a new operation as soon as the
+    previous one is over. In the open loop mode, enabled by the *rate* of
+    :meth:`run`, the operations arrive on a fixed schedule whatever the
+    server speed, and the latencies include the time operations wait for
+    the previous ones.
+
+    :param server: The running :class:`~slapd.Slapd` instance.
+    :param generator: The :class:`~slapd.generator.DirectoryGenerator` of the
+        tree. Defaults to 1000 users under the instance suffix.
+    :param mix: A dictionary of operation names and relative weights.
+        Defaults to :data:`MIX`.
+    :param concurrency: The number of workers and connections. Default value is `4`.
+    :param executor: `thread` or `process`. Process workers are not limited
+        by the interpreter lock. Default value is `thread`.
+    :param uri: The URI the workers connect to. Defaults to the instance
+        `ldapi_uri`, or `ldap_uri`.
+    :param seed: The random seed. Default value is `0`.
+    """
+
+    def __init__(
+        self,
+        server,
+        generator=None,
+        mix=None,
+        concurrency=4,
+        executor="thread",
+        uri=None,
+        seed=0,
+    ):
+        if ldap is None:
+            raise ValueError("The workload driver needs the python-ldap package.")
+        mix = dict(MIX if mix is None else mix)
+        unknown = set(mix) - set(MIX)
+        if unknown or not mix or any(weight < 0 for weight in mix.values()):
+            raise ValueError(
+                f"Invalid operations mix {mix!r}, expected weights of {', '.join(MIX)}."
+            )
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1.")
+        if executor not in ("thread", "process"):
+            raise ValueError(
+                f"Unknown executor {executor!r}, expected 'thread' or 'process'."
+            )
+        self.server = server
+        self.generator = generator or DirectoryGenerator(server.suffix, groups=0)
+        self.mix = mix
+        self.concurrency = concurrency
+        self.executor = executor
+        self.uri = uri or server.ldapi_uri or server.ldap_uri
+        self.seed = seed
+
+    def load(self):
+        """Add the generator tree to the instance, whose suffix entry must exist.
+
+        :return: A :class:`slapd.bulk.LoadReport`.
+        """
+        return self.server.bulk_load(self.generator.ldif())
+
+    def run(self, duration=None, operations=None, rate=None):
+        """Run the workload.
+
+        :param duration: The maximum duration, in seconds.
+        :param operations: The maximum number of operations of all the workers.
+            Without *duration* nor *operations*, the run lasts 10 seconds.
+        :param rate: The arrival rate of the operations of the open loop mode,
+            in operations per second. By default the closed loop mode is used.
+
+        :return: A :class:`WorkloadReport`.
+        """
+        if duration is None and operations is None:
+            duration = 10.0
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive.")
+        spec = {
+            "uri": self.uri,
+            # SASL/EXTERNAL needs the peer credentials of a Unix domain socket
+            "sasl_external": self.uri.startswith("ldapi")
+            and self.server.cli_sasl_external,
+            "root_dn": self.server.root_dn,
+            "root_pw": self.server.root_pw,
+            "suffix": self.generator.suffix,
+            "users": self.generator.users,
+            "ous": self.generator.ous,
+            "mix": self.mix,
+            "seed": self.seed,
+            "concurrency": self.concurrency,
+            "duration": duration,
+            "operations": operations,
+            "rate": rate,
+            "start": time.time() + START_DELAY,
+        }
+        pool = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+        with pool(max_workers=self.concurrency) as executor:
+            futures = [
+                executor.submit(_worker, spec, index)
+                for index in range(self.concurrency)
+            ]
+            results = [future.result() for future in futures]
+        elapsed = time.time() - spec["start"]
+
+        latencies = collections.defaultdict(list)
+        errors = collections.Counter()
+        for worker_latencies, worker_errors in results:
+            for name, values in worker_latencies.items():
+                latencies[name].extend(values)
+            errors.update(worker_errors)
+        report = WorkloadReport(latencies, errors, elapsed)
+        self.server.logger.info("workload: %r", report)
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m slapd.loadgen")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--executor", default="thread", choices=("thread", "process"))
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rate", type=float, help="open loop arrival rate, in ops/s")
+    parser.add_argument(
+        "--mix", type=json.loads, help='operation weights, like {"search-sub": 1}'
+    )
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    with slapd.Slapd(schemas=SCHEMAS, indexes=INDEXES) as server:
+        server.init_tree()
+        workload = Workload(
+            server,
+            DirectoryGenerator(server.suffix, users=args.users, groups=0),
+            mix=args.mix,
+            concurrency=args.concurrency,
+            executor=args.executor,
+        )
+        workload.load()
+        report = workload.run(duration=args.duration, rate=args.rate).as_dict()
+
+    if args.output:
+        with open(args.output, "w") as fd:
+            json.dump(report, fd, indent=2)
+    for name, summary in [("total", report["total"]), *report["operations"].items()]:
+        print(
+            f"{name:18} {summary['ops']:9.1f} ops/s "
+            f"p50 {summary['p50'] * 1000:8.3f} ms "
+            f"p99 {summary['p99'] * 1000:8.3f} ms "
+            f"p999 {summary['p999'] * 1000:8.3f} ms "
+            f"errors {summary['errors']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import collections
+import re
+import threading
+import time
+
+from slapd.stats import Record
+from slapd.stats import Stats
+
+#: The slapd log level of the lines parsed by :class:`LogStats`.
+LOG_LEVEL = "256"
+
+#: The operation names of the slapd stats log lines.
+OPERATIONS = {
+    "BIND": "bind",
+    "SRCH": "search",
+    "ADD": "add",
+    "MOD": "modify",
+    "MODRDN": "modrdn",
+    "DEL": "delete",
+    "CMP": "compare",
+    "EXT": "extended",
+}
+
+_LINE = re.compile(r"conn=(?P<conn>\d+) (?:op=(?P<op>\d+) )?(?P<message>.*)")
+_FIELD = re.compile(r'(\w+)=("[^"]*"|\S*)')
+
+
+class LogStats:
+    """Compute the server-side latencies of the operations from the slapd logs.
+
+    The `conn=... op=...` lines slapd logs at the *stats* log level are
+    parsed, and the operation requests are matched with their results. The
+    latency is the `etime` of the result line, or the delay between the
+    request and the result lines with slapd versions that do not log it.
+
+    Each operation is passed as a :class:`slapd.stats.Record`, with the
+    `operation` kind and the operation name, to a :class:`slapd.stats.Stats`
+    object, so histograms of the latencies are available.
+
+    :param stats: The :class:`slapd.stats.Stats` receiving the operations
+        records. It may be shared with a :class:`~slapd.Slapd` observer.
+        By default a new one is created.
+    :param slow_threshold: The latency above which an operation is kept in
+        :attr:`slow`, in seconds. Default value is `0.1`.
+    :param slow_history: The number of slow operations kept. Default value is `100`.
+
+    :ivar slow: The last slow operations, as dictionaries with the `conn`,
+        `op`, `operation`, `request`, `etime`, `err` and `nentries` keys.
+    """
+
+    def __init__(self, stats=None, slow_threshold=0.1, slow_history=100):
+        self.stats = stats if stats is not None else Stats()
+        self.slow_threshold = slow_threshold
+        self.slow = collections.deque(maxlen=slow_history)
+        self._pending = {}
+        self._entries = collections.Counter()
+        self._errors = collections.defaultdict(collections.Counter)
+        self._lock = threading.Lock()
+
+    def feed(self, line, logger=None):
+        """Parse a slapd log line.
+
+        :param line: The line, as bytes or text.
+        :param logger: A :class:`logging.Logger` the line is forwarded to, at
+            the debug level.
+        """
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        if logger is not None:
+            logger.debug("slapd: %s", line.rstrip())
+        match = _LINE.search(line)
+        if match is None:
+            return
+        conn = match["conn"]
+        message = match["message"]
+
+        if match["op"] is None:
+            if message.endswith(" closed"):
+                with self._lock:
+                    for key in [key for key in self._pending if key[0] == conn]:
+                        del self._pending[key]
+            return
+
+        key = (conn, match["op"])
+        verb, _, details = message.partition(" ")
+        if verb in OPERATIONS:
+            with self._lock:
+                # additional lines like "SRCH attr=cn" belong to the same request
+                self._pending.setdefault(
+                    key, (OPERATIONS[verb], details, time.monotonic())
+                )
+        elif verb == "UNBIND" or verb == "ABANDON":
+            with self._lock:
+                self._pending.pop(key, None)
+        elif verb == "RESULT" or message.startswith("SEARCH RESULT "):
+            with self._lock:
+                pending = self._pending.pop(key, None)
+            if pending is not None:
+                self._result(conn, key[1], pending, dict(_FIELD.findall(message)))
+
+    def _result(self, conn, op, pending, fields):
+        operation, request, arrived = pending
+        if "etime" in fields:
+            etime = float(fields["etime"])
+        else:
+            etime = time.monotonic() - arrived
+        err = int(fields.get("err", 0))
+        nentries = int(fields.get("nentries", 0))
+
+        record = Record("operation", operation)
+        record.wall = etime
+        record.error = err != 0
+        self.stats.record(record)
+
+        with self._lock:
+            self._entries[operation] += nentries
+            self._errors[operation][err] += 1
+            if etime >= self.slow_threshold:
+                self.slow.append(
+                    {
+                        "conn": int(conn),
+                        "op": int(op),
+                        "operation": operation,
+                        "request": request,
+                        "etime": etime,
+                        "err": err,
+                        "nentries": nentries,
+                    }
+                )
+
+    def read(self, stream, logger=None):
+        """Parse the lines of `stream` until its end.
+
+        :param stream: An iterable of lines, like the slapd standard error.
+        :param logger: A :class:`logging.Logger` the lines are forwarded to, at
+            the debug level.
+        """
+        for line in stream:
+            self.feed(line, logger)
+
+    def as_dict(self):
+        """Return the operations measures.
+
+        :return: A dictionary indexed by operation name, of the
+            :meth:`slapd.stats.Stats.as_dict` values, with the `entries` count
+            and the `results` count by result code in addition.
+        """
+        operations = self.stats.as_dict().get("operation", {})
+        with self._lock:
+            for operation, values in operations.items():
+                values["entries"] = self._entries[operation]
+                values["results"] = dict(self._errors[operation])
+        return operations
@@ -0,0 +1,246 @@
+import collections
+import contextlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import slapd
+from slapd.resources import process_usage
+
+
+def _rss(server):
+    """Return the resident memory of a slapd process in bytes, or 0 if unknown."""
+    if server._proc is None:
+        return 0
+    return process_usage(server._proc.pid).get("rss", 0)
+
+
+class SlapdPool:
+    """A pool of pre-started :class:`~slapd.Slapd` instances.
+
+    The pool starts instances in background threads and keeps *size* of them
+    ready. :meth:`lease` hands out a ready instance, and :meth:`release` gives
+    it back. A snapshot of each instance is taken once it is ready, and released
+    instances are reset to that snapshot in the background before being leased
+    again, so leased instances are always in their baseline state. Instances
+    that cannot be reset are retired and replaced by fresh ones.
+
+    The pool can be used as a context manager. When exiting the context
+    manager, all the instances are stopped.
+
+    :param size: The number of ready instances to keep. The default is `4`.
+
+    :param max_instances: The maximum number of instances alive at the same time,
+        counting ready, leased and starting instances. The default is twice *size*.
+
+    :param max_memory: The maximum resident memory in bytes of all the slapd
+        processes. No new instance is started above this limit.
+        The default is `None`, meaning no limit.
+
+    :param factory: A callable returning a new, not started, instance.
+        The default is :class:`~slapd.Slapd` called with *kwargs*.
+
+    :param setup: An optional callable applied to each instance after it has started,
+        for instance :meth:`~slapd.Slapd.init_tree`.
+
+    :param recycle: Whether released instances are reset and reused, instead of
+        being retired and replaced by fresh ones. The default is `True`.
+
+    :param workers: The number of background threads starting and stopping instances.
+        The default is *size*.
+
+    :param kwargs: Arguments passed to :class:`~slapd.Slapd` by the default *factory*.
+    """
+
+    def __init__(
+        self,
+        size=4,
+        max_instances=None,
+        max_memory=None,
+        factory=None,
+        setup=None,
+        recycle=True,
+        workers=None,
+        **kwargs,
+    ):
+        if size < 1:
+            raise ValueError("The pool size must be at least 1.")
+        self.size = size
+        self.max_instances = max_instances or 2 * size
+        if self.max_instances < size:
+            raise ValueError("max_instances cannot be lower than size.")
+        self.max_memory = max_memory
+        self.factory = factory or (lambda: slapd.Slapd(**kwargs))
+        self.setup = setup
+        self.recycle = recycle
+        self.logger = logging.getLogger("python-ldap-test")
+
+        self._cond = threading.Condition()
+        self._ready = collections.deque()
+        self._leased = set()
+        self._starting = 0
+        self._retiring = 0
+        self._snapshots = {}
+        self._closed = False
+        self._error = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or size, thread_name_prefix="slapd-pool"
+        )
+        with self._cond:
+            self._fill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        """Return the number of instances alive, including the starting ones."""
+        with self._cond:
+            return (
+                len(self._ready) + len(self._leased) + self._starting + self._retiring
+            )
+
+    def _memory(self):
+        return sum(_rss(server) for server in (*self._ready, *self._leased))
+
+    def _fill(self):
+        """Schedule new instances until the pool is full. Must hold the lock."""
+        while (
+            not self._closed
+            and len(self._ready) + self._starting < self.size
+            and len(self._ready) + len(self._leased) + self._starting + self._retiring
+            < self.max_instances
+            and (self.max_memory is None or self._memory() < self.max_memory)
+        ):
+            self._starting += 1
+            self._executor.submit(self._start_one)
+
+    def _start_one(self):
+        server = snapshot = None
+        try:
+            server = self.factory()
+            server.start()
+            if self.setup:
+                self.setup(server)
+            if self.recycle:
+                snapshot = server.snapshot()
+        except Exception as exc:
+            self.logger.error("slapd pool could not start an instance: %s", exc)
+            if server is not None:
+                server.stop()
+            with self._cond:
+                self._starting -= 1
+                self._error = exc
+                self._cond.notify_all()
+            return
+
+        with self._cond:
+            self._starting -= 1
+            closed = self._closed
+            if not closed:
+                self._error = None
+                if snapshot is not None:
+                    self._snapshots[server] = snapshot
+                self._ready.append(server)
+                self._cond.notify_all()
+        if closed:
+            server.stop()
+
+    def _retire(self, server):
+        with self._cond:
+            self._snapshots.pop(server, None)
+        server.stop()
+        with self._cond:
+            self._retiring -= 1
+            self._fill()
+
+    def _recycle(self, server):
+        with self._cond:
+            snapshot = self._snapshots[server]
+        try:
+            server.reset(snapshot)
+        except Exception as exc:
+            self.logger.warning("slapd pool could not reset an instance: %s", exc)
+            self._retire(server)
+            return
+
+        with self._cond:
+            self._retiring -= 1
+            closed = self._closed
+            if not closed:
+                self._ready.append(server)
+                self._cond.notify_all()
+        if closed:
+            server.stop()
+
+    def lease(self, timeout=None):
+        """Take a ready instance from the pool, waiting for one if needed.
+
+        :param timeout: The maximum number of seconds to wait. `None` means no limit.
+
+        :return: A started :class:`~slapd.Slapd` instance.
+        :raises TimeoutError: If no instance was ready in time.
+        :raises RuntimeError: If the pool is closed, or instances cannot be started.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._ready:
+                if self._closed:
+                    raise RuntimeError("The pool is closed.")
+                if self._error is not None and not self._starting:
+                    error, self._error = self._error, None
+                    raise RuntimeError(
+                        "The pool could not start an instance."
+                    ) from error
+                self._fill()
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No slapd instance was ready in time.")
+                self._cond.wait(remaining)
+
+            server = self._ready.popleft()
+            self._leased.add(server)
+            self._fill()
+            return server
+
+    def release(self, server):
+        """Give back a leased instance to the pool.
+
+        The instance is reset in the background, or stopped and replaced by
+        a fresh one if *recycle* is `False`.
+        """
+        with self._cond:
+            self._leased.remove(server)
+            closed = self._closed
+            if not closed:
+                self._retiring += 1
+                self._executor.submit(
+                    self._recycle if server in self._snapshots else self._retire,
+                    server,
+                )
+        if closed:
+            server.stop()
+
+    @contextlib.contextmanager
+    def leased(self, timeout=None):
+        """Context manager leasing an instance, and releasing it at exit."""
+        server = self.lease(timeout)
+        try:
+            yield server
+        finally:
+            self.release(server)
+
+    def close(self):
+        """Stop all the instances of the pool, and the background threads."""
+        with self._cond:
+            self._closed = True
+            servers = [*self._ready, *self._leased]
+            self._ready.clear()
+            self._leased.clear()
+            self._cond.notify_all()
+        for server in servers:
+            server.stop()
+        self._executor.shutdown(wait=True)
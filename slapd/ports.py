@@ -0,0 +1,120 @@
+import errno
+import os
+import socket
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+#: Directory of the lock files shared by all the processes allocating ports.
+REGISTRY = os.environ.get(
+    "SLAPD_PORT_REGISTRY", os.path.join(tempfile.gettempdir(), "python-slapd-ports")
+)
+
+
+class PortReservation:
+    """A TCP port reserved for a slapd instance.
+
+    The port is protected in two ways until slapd binds it:
+
+    - a socket stays bound to the port, so the kernel does not hand it out to
+      other processes, until :meth:`release_socket` is called right before
+      slapd is spawned;
+    - a lock file of the registry is held until :meth:`release` is called,
+      so other processes using the registry skip the port while the
+      instance runs, including while it is restarted.
+
+    :ivar port: The reserved port number.
+    """
+
+    def __init__(self, port, sock, lock_path=None, lock_fd=None):
+        self.port = port
+        self._sock = sock
+        self._lock_path = lock_path
+        self._lock_fd = lock_fd
+
+    def release_socket(self):
+        """Close the socket holding the port, so that slapd can bind it."""
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def release(self):
+        """Release the socket and the registry lock."""
+        self.release_socket()
+        if self._lock_fd is not None:
+            # unlink before unlocking, see _lock
+            try:
+                os.unlink(self._lock_path)
+            except OSError:  # pragma: no cover
+                pass
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+def _lock(path):
+    """Take a non-blocking exclusive lock on the file at `path`.
+
+    :return: The locked file descriptor, or `None` if another process holds the lock.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError as exc:
+        os.close(fd)
+        if exc.errno in (errno.EAGAIN, errno.EACCES):
+            return None
+        raise  # pragma: no cover
+
+    # The owner unlinks the file before releasing the lock. If that happened
+    # between our open and our lock, we locked an orphan inode.
+    try:
+        if os.stat(path).st_ino == os.fstat(fd).st_ino:
+            return fd
+    except FileNotFoundError:
+        pass
+    os.close(fd)
+    return None
+
+
+def reserve_port(host, registry=REGISTRY, attempts=100, port=0):
+    """Reserve an available TCP port on `host`.
+
+    :param host: The address the port will be bound on.
+    :param registry: The lock file directory shared between processes.
+        `None` disables the registry.
+    :param attempts: How many ports to try before giving up.
+    :param port: The port to reserve. Defaults to any port chosen by the
+        kernel. A given port is only tried once.
+
+    :return: A :class:`PortReservation`.
+    :raises RuntimeError: If no port could be reserved.
+    """
+    if registry is not None and fcntl is not None:
+        os.makedirs(registry, exist_ok=True)
+    else:
+        registry = None
+
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    for _ in range(1 if port else attempts):
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            sock.close()
+            if port:
+                break
+            raise
+        bound = sock.getsockname()[1]
+        if registry is None:
+            return PortReservation(bound, sock)
+
+        lock_path = os.path.join(registry, f"{bound}.lock")
+        lock_fd = _lock(lock_path)
+        if lock_fd is not None:
+            return PortReservation(bound, sock, lock_path, lock_fd)
+        sock.close()
+
+    raise RuntimeError(f"Could not reserve a TCP port on {host}")
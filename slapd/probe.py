@@ -0,0 +1,142 @@
+import asyncio
+import socket
+from urllib.parse import unquote
+from urllib.parse import urlsplit
+
+# LDAPMessage { messageID 1, BindRequest { version 3, name "", simple "" } }
+ANONYMOUS_BIND_REQUEST = bytes.fromhex("300c020101600702010304008000")
+# LDAPMessage { messageID 2, UnbindRequest }
+UNBIND_REQUEST = bytes.fromhex("30050201024200")
+
+BIND_RESPONSE_TAG = 0x61
+
+
+def _address(uri):
+    """Return the socket family and address an ldap:// or ldapi:// URI points to."""
+    parts = urlsplit(uri)
+    if parts.scheme == "ldapi":
+        return socket.AF_UNIX, unquote(parts.netloc)
+    if parts.scheme == "ldap":
+        return socket.AF_INET, (parts.hostname, parts.port or 389)
+    raise ValueError(f"Unsupported URI scheme for probing: {uri!r}")
+
+
+def _read_length(data, offset):
+    """Decode a BER length at `offset`, return the length and the offset after it."""
+    first = data[offset]
+    offset += 1
+    if first < 0x80:
+        return first, offset
+    size = first & 0x7F
+    return int.from_bytes(data[offset : offset + size], "big"), offset + size
+
+
+def _recv_message(sock):
+    """Read one complete BER encoded LDAPMessage from the socket."""
+    data = b""
+    while True:
+        if len(data) >= 2 and (data[1] < 0x80 or len(data) >= 2 + (data[1] & 0x7F)):
+            length, offset = _read_length(data, 1)
+            if len(data) >= offset + length:
+                return data[: offset + length]
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise ConnectionError("connection closed before the bind response")
+        data += chunk
+
+
+def parse_bind_response(message):
+    """Return the result code of a BER encoded LDAP BindResponse message.
+
+    :raises ConnectionError: If the message is not a BindResponse.
+    """
+    try:
+        if message[0] != 0x30:
+            raise ValueError
+        _, offset = _read_length(message, 1)
+        # messageID
+        if message[offset] != 0x02:
+            raise ValueError
+        length, offset = _read_length(message, offset + 1)
+        offset += length
+        if message[offset] != BIND_RESPONSE_TAG:
+            raise ValueError
+        _, offset = _read_length(message, offset + 1)
+        # resultCode ENUMERATED
+        if message[offset] != 0x0A:
+            raise ValueError
+        length, offset = _read_length(message, offset + 1)
+        return int.from_bytes(message[offset : offset + length], "big")
+    except (IndexError, ValueError):
+        raise ConnectionError(f"unexpected LDAP response: {message.hex()}") from None
+
+
+def probe(uri, timeout=1.0):
+    """Check that an LDAP server answers on `uri`.
+
+    An anonymous simple bind is sent over a raw socket, and the bind response
+    is awaited. Any result code proves the server is processing requests,
+    even if anonymous binds are disabled.
+
+    :param uri: An `ldap://` or `ldapi://` URI.
+    :param timeout: The socket timeout in seconds.
+
+    :return: The result code of the bind operation.
+    :raises OSError: If the server cannot be reached or does not answer properly.
+    """
+    family, address = _address(uri)
+    if family == socket.AF_UNIX:
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+    else:
+        sock = socket.create_connection(address, timeout=timeout)
+
+    with sock:
+        sock.sendall(ANONYMOUS_BIND_REQUEST)
+        result = parse_bind_response(_recv_message(sock))
+        try:
+            sock.sendall(UNBIND_REQUEST)
+        except OSError:  # pragma: no cover
+            pass
+    return result
+
+
+async def async_probe(uri, timeout=1.0):
+    """Check that an LDAP server answers on `uri`, without blocking the event loop.
+
+    This is the :mod:`asyncio` version of :func:`probe`.
+    """
+    family, address = _address(uri)
+
+    async def exchange():
+        if family == socket.AF_UNIX:
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*address)
+        try:
+            writer.write(ANONYMOUS_BIND_REQUEST)
+            await writer.drain()
+            header = await reader.readexactly(2)
+            if header[1] & 0x80:
+                header += await reader.readexactly(header[1] & 0x7F)
+            length, _ = _read_length(header, 1)
+            message = header + await reader.readexactly(length)
+            result = parse_bind_response(message)
+            writer.write(UNBIND_REQUEST)
+            return result
+        except asyncio.IncompleteReadError:
+            raise ConnectionError(
+                "connection closed before the bind response"
+            ) from None
+        finally:
+            writer.close()
+
+    try:
+        return await asyncio.wait_for(exchange(), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"no bind response from {uri} in {timeout}s") from None
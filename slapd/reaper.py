@@ -0,0 +1,58 @@
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger("python-ldap-test")
+
+
+class Reaper:
+    """Run teardown functions in background threads.
+
+    Each function is run in its own thread, so a slapd process that is slow
+    to terminate does not delay the teardown of the others. Use :meth:`join`
+    to wait until all the submitted functions have been run.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = 0
+
+    def submit(self, function):
+        """Run `function` in a reaper thread.
+
+        When threads cannot be started anymore, at interpreter shutdown,
+        `function` is run immediately.
+        """
+        thread = threading.Thread(
+            target=self._run, args=(function,), name="slapd-reaper", daemon=True
+        )
+        with self._cond:
+            self._pending += 1
+        try:
+            thread.start()
+        except RuntimeError:
+            self._done()
+            function()
+
+    def _run(self, function):
+        try:
+            function()
+        except Exception:
+            logger.exception("slapd teardown failed")
+        finally:
+            self._done()
+
+    def _done(self):
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def join(self):
+        """Wait until all the submitted functions have been run."""
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending)
+
+
+#: The reaper of the instances stopped in the background.
+REAPER = Reaper()
+atexit.register(REAPER.join)
@@ -0,0 +1,185 @@
+import os
+import struct
+import threading
+import time
+
+MDB_MAGIC = 0xBEEFC0DE
+
+# MDB meta pages: a 16 bytes page header, then the magic, the version, the
+# map address and size, the free and main databases, the last page and the
+# transaction id. The page size is kept in the free database md_pad field.
+_META = struct.Struct("=IIQQ" + "I44x" + "48x" + "QQ")
+_META_OFFSET = 16
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def process_usage(pid):
+    """Return the resource usage of a process, read from `/proc`.
+
+    :return: A dictionary with the resident memory `rss` and its peak
+        `peak_rss` in bytes, the `cpu_user` and `cpu_system` times in seconds,
+        and the number of `threads`, open file descriptors `fds` and
+        `sockets`. It is empty if `/proc` cannot be read.
+    """
+    usage = {}
+    try:
+        with open(f"/proc/{pid}/status") as fd:
+            for line in fd:
+                name, _, value = line.partition(":")
+                if name == "VmRSS":
+                    usage["rss"] = int(value.split()[0]) * 1024
+                elif name == "VmHWM":
+                    usage["peak_rss"] = int(value.split()[0]) * 1024
+                elif name == "Threads":
+                    usage["threads"] = int(value)
+        with open(f"/proc/{pid}/stat") as fd:
+            # the command name may contain spaces, the fields follow its closing parenthesis
+            fields = fd.read().rpartition(")")[2].split()
+        usage["cpu_user"] = int(fields[11]) / _CLOCK_TICKS
+        usage["cpu_system"] = int(fields[12]) / _CLOCK_TICKS
+
+        fds = sockets = 0
+        for name in os.listdir(f"/proc/{pid}/fd"):
+            fds += 1
+            try:
+                sockets += os.readlink(f"/proc/{pid}/fd/{name}").startswith("socket:")
+            except OSError:
+                pass
+        usage["fds"] = fds
+        usage["sockets"] = sockets
+    except (OSError, IndexError, ValueError):
+        return {}
+    return usage
+
+
+def _read_meta(fd, offset):
+    fd.seek(offset + _META_OFFSET)
+    data = fd.read(_META.size)
+    if len(data) < _META.size:
+        return None
+    magic, _, _, mapsize, psize, last_pg, txnid = _META.unpack(data)
+    if magic != MDB_MAGIC:
+        return None
+    return mapsize, psize, last_pg, txnid
+
+
+def mdb_usage(directory):
+    """Return the size and page usage of the MDB database of a directory.
+
+    The page usage is read in the most recent of the two meta pages of
+    `data.mdb`. It counts the pages allocated to the database, including the
+    free ones that can be reused.
+
+    :return: A dictionary with the `mdb_file_size` and the `mdb_disk_usage`
+        in bytes, and the `mdb_map_size`, `mdb_page_size`, `mdb_pages` and
+        `mdb_used` values of the meta page. It is empty if there is no
+        database, and only has the file sizes if the meta pages cannot be read.
+    """
+    path = os.path.join(directory, "data.mdb")
+    try:
+        stat = os.stat(path)
+        usage = {
+            "mdb_file_size": stat.st_size,
+            "mdb_disk_usage": getattr(stat, "st_blocks", 0) * 512,
+        }
+        with open(path, "rb") as fd:
+            first = _read_meta(fd, 0)
+            if first is None:
+                return usage
+            second = _read_meta(fd, first[1])
+    except OSError:
+        return {}
+
+    metas = [meta for meta in (first, second) if meta is not None]
+    mapsize, psize, last_pg, _ = max(metas, key=lambda meta: meta[3])
+    usage.update(
+        {
+            "mdb_map_size": mapsize,
+            "mdb_page_size": psize,
+            "mdb_pages": last_pg + 1,
+            "mdb_used": (last_pg + 1) * psize,
+        }
+    )
+    return usage
+
+
+class ResourceSampler:
+    """Periodically record the :meth:`~slapd.Slapd.resource_usage` of an instance.
+
+    The sampler runs in a background thread once started, and can be used
+    as a context manager, that starts it and stops it at exit.
+
+    :param server: The :class:`~slapd.Slapd` instance.
+    :param interval: The delay between two samples, in seconds. Default value is `1.0`.
+
+    :ivar samples: The `(timestamp, usage)` tuples, where `timestamp` is
+        the :func:`time.monotonic` time of the sample.
+    """
+
+    def __init__(self, server, interval=1.0):
+        if interval <= 0:
+            raise ValueError("The sampling interval must be positive.")
+        self.server = server
+        self.interval = interval
+        self.samples = []
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def sample(self):
+        """Record a sample now."""
+        self.samples.append((time.monotonic(), self.server.resource_usage()))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.sample()
+            self._stopped.wait(self.interval)
+
+    def start(self):
+        """Start sampling in a background thread."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="slapd-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling, and record a last sample."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self.sample()
+
+    def series(self):
+        """Return the samples as time series.
+
+        :return: A dictionary indexed by measure name, like `rss`, of lists
+            of `(elapsed, value)` tuples, where `elapsed` is the number of
+            seconds since the first sample.
+        """
+        series = {}
+        if not self.samples:
+            return series
+        started = self.samples[0][0]
+        for timestamp, usage in self.samples:
+            for name, value in usage.items():
+                series.setdefault(name, []).append((timestamp - started, value))
+        return series
+
+    def peaks(self):
+        """Return the maximum value of each measure."""
+        return {
+            name: max(value for _, value in values)
+            for name, values in self.series().items()
+        }
@@ -0,0 +1,187 @@
+import collections
+import contextlib
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+#: The default histogram bucket upper bounds, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _children_cpu():
+    if resource is None:  # pragma: no cover
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Record:
+    """The measure of a lifecycle phase or of a command execution.
+
+    :ivar kind: `"phase"` or `"command"`.
+    :ivar name: The phase name, like `start_slapd`, or the command name, like `ldapadd`.
+    :ivar wall: The elapsed time, in seconds.
+    :ivar cpu: The CPU time of the child processes that terminated during the
+        measure, in seconds. Other threads of the interpreter waiting for
+        their own child processes at the same time are counted too.
+    :ivar bytes_in: The number of bytes sent to the command.
+    :ivar bytes_out: The number of bytes the command output.
+    :ivar error: Whether the phase or the command failed.
+    """
+
+    __slots__ = ("kind", "name", "wall", "cpu", "bytes_in", "bytes_out", "error")
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.error = False
+
+    def __repr__(self):
+        return (
+            f"<Record {self.kind} {self.name} wall={self.wall:.6f} cpu={self.cpu:.6f} "
+            f"in={self.bytes_in} out={self.bytes_out}{' error' if self.error else ''}>"
+        )
+
+
+@contextlib.contextmanager
+def measure(observer, kind, name):
+    """Measure the execution of the context and pass a :class:`Record` to `observer`.
+
+    The context gets the record, so it can fill the byte counters.
+
+    :param observer: An object with a `record` method, like :class:`Stats`, or
+        `None` to disable the measure.
+    """
+    record = Record(kind, name)
+    if observer is None:
+        yield record
+        return
+
+    cpu = _children_cpu()
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record.error = True
+        raise
+    finally:
+        record.wall = time.perf_counter() - started
+        record.cpu = _children_cpu() - cpu
+        observer.record(record)
+
+
+class _Metric:
+    def __init__(self, buckets):
+        self.count = 0
+        self.errors = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.buckets = [0] * len(buckets)
+
+    def add(self, record, buckets):
+        self.count += 1
+        self.errors += record.error
+        self.wall += record.wall
+        self.cpu += record.cpu
+        self.bytes_in += record.bytes_in
+        self.bytes_out += record.bytes_out
+        for i, bound in enumerate(buckets):
+            if record.wall <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Stats:
+    """Aggregate the measures of one or several slapd instances.
+
+    An instance can be passed as the `observer` of :class:`~slapd.Slapd`, and
+    shared between instances. Any other object with a `record` method
+    accepting a :class:`Record` can be used as an observer.
+
+    :param buckets: The upper bounds of the wall time histograms buckets, in seconds.
+    :param history: The number of last records kept in :attr:`records`.
+    """
+
+    def __init__(self, buckets=BUCKETS, history=1000):
+        self.buckets = tuple(sorted(buckets))
+        self.records = collections.deque(maxlen=history)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def record(self, record):
+        """Aggregate a :class:`Record`."""
+        with self._lock:
+            self.records.append(record)
+            key = (record.kind, record.name)
+            if key not in self._metrics:
+                self._metrics[key] = _Metric(self.buckets)
+            self._metrics[key].add(record, self.buckets)
+
+    def as_dict(self):
+        """Return the aggregated measures.
+
+        :return: A dictionary indexed by kind, then by name, of dictionaries
+            with the `count`, `errors`, `wall`, `cpu`, `bytes_in` and `bytes_out`
+            totals, and the `histogram` of the wall times, mapping the buckets
+            upper bounds to the cumulative counts.
+        """
+        result = {}
+        with self._lock:
+            for (kind, name), metric in sorted(self._metrics.items()):
+                cumulative = 0
+                histogram = {}
+                for bound, count in zip(self.buckets, metric.buckets):
+                    cumulative += count
+                    histogram[bound] = cumulative
+                histogram[float("inf")] = metric.count
+                result.setdefault(kind, {})[name] = {
+                    "count": metric.count,
+                    "errors": metric.errors,
+                    "wall": metric.wall,
+                    "cpu": metric.cpu,
+                    "bytes_in": metric.bytes_in,
+                    "bytes_out": metric.bytes_out,
+                    "histogram": histogram,
+                }
+        return result
+
+    def to_prometheus(self, prefix="slapd"):
+        """Return the aggregated measures in the Prometheus text exposition format."""
+        lines = []
+        for kind, metrics in self.as_dict().items():
+            name = f"{prefix}_{kind}"
+            lines.append(f"# HELP {name}_seconds Wall time of the slapd {kind}s.")
+            lines.append(f"# TYPE {name}_seconds histogram")
+            for label, values in metrics.items():
+                for bound, count in values["histogram"].items():
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(
+                        f'{name}_seconds_bucket{{name="{label}",le="{le}"}} {count}'
+                    )
+                lines.append(f'{name}_seconds_sum{{name="{label}"}} {values["wall"]}')
+                lines.append(
+                    f'{name}_seconds_count{{name="{label}"}} {values["count"]}'
+                )
+            for counter, key, description in (
+                ("cpu_seconds_total", "cpu", "CPU time of the child processes"),
+                ("bytes_in_total", "bytes_in", "Bytes sent to the commands"),
+                ("bytes_out_total", "bytes_out", "Bytes output by the commands"),
+                ("errors_total", "errors", "Failures"),
+            ):
+                lines.append(f"# HELP {name}_{counter} {description}.")
+                lines.append(f"# TYPE {name}_{counter} counter")
+                lines.extend(
+                    f'{name}_{counter}{{name="{label}"}} {values[key]}'
+                    for label, values in metrics.items()
+                )
+        return "\n".join(lines) + "\n"
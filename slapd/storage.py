@@ -0,0 +1,61 @@
+import os
+import re
+
+#: Directories tried for ephemeral instances, when `SLAPD_EPHEMERAL_DIR` is unset.
+MEMORY_DIRS = ("/dev/shm", os.environ.get("XDG_RUNTIME_DIR") or "/run/shm")
+MEMORY_FILESYSTEMS = ("tmpfs", "ramfs")
+
+_OCTAL_ESCAPE = re.compile(rb"\\([0-7]{3})")
+
+
+def _unescape(path):
+    # /proc/mounts escapes spaces and other characters as octal sequences
+    return os.fsdecode(_OCTAL_ESCAPE.sub(lambda match: bytes([int(match[1], 8)]), path))
+
+
+def filesystem_type(path, mounts="/proc/mounts"):
+    """Return the type of the filesystem holding `path`, or `None` if it is unknown."""
+    path = os.path.realpath(path)
+    found = None
+    try:
+        with open(mounts, "rb") as fd:
+            for line in fd:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mountpoint = _unescape(fields[1])
+                if path == mountpoint or path.startswith(mountpoint.rstrip("/") + "/"):
+                    if found is None or len(mountpoint) >= len(found[0]):
+                        found = (mountpoint, os.fsdecode(fields[2]))
+    except OSError:
+        return None
+    return found[1] if found else None
+
+
+def memory_directory():
+    """Return a writable directory on a memory filesystem.
+
+    The `SLAPD_EPHEMERAL_DIR` environment variable is used if set, otherwise
+    the :data:`MEMORY_DIRS` are tried.
+
+    :raises ValueError: If no such directory is found.
+    """
+    if os.environ.get("SLAPD_EPHEMERAL_DIR"):
+        return os.environ["SLAPD_EPHEMERAL_DIR"]
+    for path in MEMORY_DIRS:
+        if (
+            os.path.isdir(path)
+            and os.access(path, os.W_OK | os.X_OK)
+            and filesystem_type(path) in MEMORY_FILESYSTEMS
+        ):
+            return path
+    raise ValueError(
+        "No memory filesystem found for the ephemeral mode, "
+        "set the SLAPD_EPHEMERAL_DIR environment variable."
+    )
+
+
+def free_space(path):
+    """Return the space available to unprivileged users on the filesystem of `path`, in bytes."""
+    stat = os.statvfs(path)
+    return stat.f_bavail * stat.f_frsize
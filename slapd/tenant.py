@@ -0,0 +1,283 @@
+import os
+import re
+import shutil
+
+from slapd.batch import Batch
+from slapd.bulk import iter_chunks
+from slapd.ldif import init_tree_ldif
+from slapd.ldif import parse_line
+from slapd.tuning import database_options
+
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*$")
+_FILTER_SPECIALS = re.compile(r"[\\*()\x00]")
+_FOLD = re.compile(rb"\r?\n ")
+_DN_ATTRIBUTES = (b"dn:", b"newsuperior:")
+
+
+def _escape_filter(value):
+    return _FILTER_SPECIALS.sub(lambda match: f"\\{ord(match[0]):02x}", value)
+
+
+def _in_subtree(dn, suffix):
+    """Return whether `dn` is `suffix` or one of its descendants."""
+    dn, suffix = (
+        ",".join(rdn.strip() for rdn in value.lower().split(","))
+        for value in (dn, suffix)
+    )
+    return dn == suffix or dn.endswith("," + suffix)
+
+
+class _TenantBatch(Batch):
+    """A :class:`~slapd.batch.Batch` rejecting the DNs outside of a tenant suffix."""
+
+    def __init__(self, tenant, continue_on_error=False, max_records=1000, expected=0):
+        super().__init__(tenant.server, continue_on_error, max_records, expected)
+        self.tenant = tenant
+
+    def _append(self, dn, changetype, lines):
+        self.tenant._check_dn(dn)
+        super()._append(dn, changetype, lines)
+
+    def modrdn(self, dn, newrdn, deleteoldrdn=True, newsuperior=None):
+        if newsuperior is not None:
+            self.tenant._check_dn(newsuperior)
+        super().modrdn(dn, newrdn, deleteoldrdn, newsuperior)
+
+
+class Tenant:
+    """An isolated database of a running :class:`~slapd.Slapd` instance.
+
+    Each tenant has its own suffix, root user and MDB directory, and is
+    added and removed through `cn=config`, so many tenants share the cost of
+    a single slapd process. The helper methods behave like the
+    :class:`~slapd.Slapd` ones, with searches based on the tenant suffix.
+
+    The commands are run with the identity of the instance root user, which
+    is granted the `manage` access on the tenant database. Other clients
+    can bind as the tenant root user, with :attr:`root_dn` and
+    :attr:`root_pw`.
+
+    A tenant can be used as a context manager. When exiting the context
+    manager, the tenant is removed.
+
+    The write helpers reject the DNs outside of the tenant suffix with a
+    :class:`ValueError`.
+
+    :param server: The running :class:`~slapd.Slapd` instance.
+    :param name: The tenant name, used for its data directory.
+    :param suffix: The tenant suffix. Defaults to `dc=<name>`.
+    :param root_cn: The tenant root user common name. The default value is `Manager`.
+    :param root_pw: The tenant root user password. Defaults to the instance one.
+    :param indexes: The MDB attribute indexes, as accepted by the *indexes*
+        parameter of :class:`~slapd.Slapd`.
+    """
+
+    def __init__(
+        self, server, name, suffix=None, root_cn="Manager", root_pw=None, indexes=None
+    ):
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid tenant name {name!r}.")
+        self.server = server
+        self.name = name
+        self.suffix = suffix or f"dc={name}"
+        self.root_cn = root_cn
+        self.root_pw = root_pw or server.root_pw
+        self.indexes = dict(indexes or {})
+        self.directory = os.path.join(server.testrundir, f"tenant-{name}")
+        self.database_dn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.remove()
+
+    def __repr__(self):
+        return f"<Tenant {self.name!r} {self.suffix!r}>"
+
+    @property
+    def root_dn(self):
+        return f"cn={self.root_cn},{self.suffix}"
+
+    @property
+    def ldap_uri(self):
+        return self.server.ldap_uri
+
+    @property
+    def ldapi_uri(self):
+        return self.server.ldapi_uri
+
+    def _database_ldif(self):
+        """Return the LDIF of the configuration entry of the tenant database."""
+        server = self.server
+        return (
+            f"dn: olcDatabase={server.database},cn=config\n"
+            "objectClass: olcDatabaseConfig\n"
+            "objectClass: olcMdbConfig\n"
+            f"olcDatabase: {server.database}\n"
+            f"olcSuffix: {self.suffix}\n"
+            f"olcRootDN: {self.root_dn}\n"
+            f"olcRootPW: {self.root_pw}\n"
+            f"olcDbDirectory: {self.directory}\n"
+            f"olcDbMaxSize: {server.db_max_size}\n"
+            f'olcAccess: {{0}}to * by dn.exact="{server.root_dn}" manage by * none\n'
+            + database_options(
+                indexes=self.indexes,
+                env_flags=server.db_env_flags,
+                no_sync=server.db_no_sync,
+            )
+        )
+
+    def add(self):
+        """Create the tenant database."""
+        ldif = self._database_ldif()
+        os.makedirs(self.directory)
+        try:
+            self.server.ldapadd(ldif)
+        except Exception:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            raise
+        # slapd numbers the new database, find its configuration entry back
+        entries = self.server.iter_ldapsearch(
+            f"(olcSuffix={_escape_filter(self.suffix)})",
+            "cn=config",
+            attributes=[],
+            extra_args=["-s", "one"],
+        )
+        self.database_dn = next(entry.dn for entry in entries)
+        self.server.logger.debug("added tenant %r as %s", self.name, self.database_dn)
+        return self
+
+    def remove(self):
+        """Delete the tenant database and its data.
+
+        Deleting databases through `cn=config` needs OpenLDAP 2.5 or later.
+        """
+        if self.database_dn is None:
+            return
+        self.server.ldapdelete(self.database_dn)
+        self.database_dn = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.server.tenants.pop(self.name, None)
+
+    def _check_dn(self, dn):
+        if not _in_subtree(dn, self.suffix):
+            raise ValueError(f"{dn!r} is not in the tenant suffix {self.suffix!r}.")
+
+    def _check_line(self, line):
+        """Check the DN of a logical LDIF line, if it is a `dn` or `newsuperior` one.
+
+        The other lines, even invalid ones, are left to the tool.
+        """
+        line = _FOLD.sub(b"", line).rstrip(b"\r\n")
+        if not line.lower().startswith(_DN_ATTRIBUTES):
+            return
+        try:
+            _, dn = parse_line(line.decode("utf-8"))
+        except ValueError as exc:
+            raise ValueError(f"Cannot check the DN of {line!r}: {exc}") from exc
+        if not isinstance(dn, str):
+            raise ValueError(f"Cannot check the DN of {line!r}.")
+        self._check_dn(dn)
+
+    def _checked_chunks(self, chunks):
+        """Yield LDIF `chunks`, checking the DNs of the records as they are read.
+
+        The content is only yielded up to the last checked line, so nothing
+        past a rejected DN is sent.
+        """
+        buffer = b""
+        for chunk in chunks:
+            buffer += chunk
+            start = position = 0
+            while (end := buffer.find(b"\n", position)) != -1:
+                position = end + 1
+                # the line may be continued by the next one, not read yet
+                if position == len(buffer):
+                    break
+                if buffer[position : position + 1] != b" ":
+                    self._check_line(buffer[start:position])
+                    start = position
+            if start:
+                yield buffer[:start]
+                buffer = buffer[start:]
+        if buffer:
+            self._check_line(buffer)
+            yield buffer
+
+    def _check_args(self, extra_args):
+        if any(arg.startswith("-f") for arg in extra_args or ()):
+            raise ValueError(
+                "Tenants do not read LDIF files, pass the content instead."
+            )
+
+    def _check_ldif(self, ldif):
+        for _ in self._checked_chunks(iter_chunks(ldif or "")):
+            pass
+
+    def ldapadd(self, ldif, extra_args=None, expected=0):
+        """Run ldapadd, like :meth:`slapd.Slapd.ldapadd`."""
+        self._check_args(extra_args)
+        self._check_ldif(ldif)
+        return self.server.ldapadd(ldif, extra_args, expected)
+
+    def ldapmodify(self, ldif, extra_args=None, expected=0):
+        """Run ldapmodify, like :meth:`slapd.Slapd.ldapmodify`."""
+        self._check_args(extra_args)
+        self._check_ldif(ldif)
+        return self.server.ldapmodify(ldif, extra_args, expected)
+
+    def ldapdelete(self, dn, recursive=False, extra_args=None, expected=0):
+        """Run ldapdelete, like :meth:`slapd.Slapd.ldapdelete`."""
+        self._check_args(extra_args)
+        self._check_dn(dn)
+        return self.server.ldapdelete(dn, recursive, extra_args, expected)
+
+    def batch(self, continue_on_error=False, max_records=1000, expected=0):
+        """Collect write operations, like :meth:`slapd.Slapd.batch`."""
+        return _TenantBatch(self, continue_on_error, max_records, expected)
+
+    def ldapsearch(self, filter, searchbase=None, extra_args=None, expected=0):
+        """Run ldapsearch, like :meth:`slapd.Slapd.ldapsearch`.
+
+        The search base defaults to the tenant suffix.
+        """
+        return self.server.ldapsearch(
+            filter, searchbase or self.suffix, extra_args, expected
+        )
+
+    def iter_ldapsearch(
+        self, filter, searchbase=None, attributes=None, extra_args=None, expected=0
+    ):
+        """Yield the entries of a search, like :meth:`slapd.Slapd.iter_ldapsearch`.
+
+        The search base defaults to the tenant suffix.
+        """
+        return self.server.iter_ldapsearch(
+            filter, searchbase or self.suffix, attributes, extra_args, expected
+        )
+
+    def iter_slapcat(self, attributes=None, extra_args=None, expected=0):
+        """Yield the entries of the tenant database, like :meth:`slapd.Slapd.iter_slapcat`."""
+        return self.server.iter_slapcat(
+            attributes, ["-b", self.suffix, *(extra_args or [])], expected
+        )
+
+    def bulk_load(self, source, extra_args=None, progress=None, expected=0):
+        """Load a large amount of LDIF content, like :meth:`slapd.Slapd.bulk_load`.
+
+        Only online loads are supported, as offline ones would stop the
+        instance for all the tenants. The DNs are checked as the content is
+        streamed, and the load stops at the first one outside of the suffix.
+        """
+        self._check_args(extra_args)
+        return self.server.bulk_load(
+            self._checked_chunks(iter_chunks(source)),
+            extra_args=extra_args,
+            progress=progress,
+            expected=expected,
+        )
+
+    def init_tree(self):
+        """Create the organization and applicationProcess object of the tenant."""
+        return self.ldapadd(init_tree_ldif(self.suffix, self.root_cn))
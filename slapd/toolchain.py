@@ -0,0 +1,187 @@
+import functools
+import os
+import re
+import subprocess
+import threading
+from shutil import which
+
+SCHEMA_DIRS = ("/etc/openldap/schema", "/etc/ldap/schema")
+MODULE_DIRS = (
+    "/usr/lib/ldap",
+    "/usr/lib/openldap",
+    "/usr/lib64/openldap",
+    "/usr/libexec/openldap",
+    "/usr/local/libexec/openldap",
+)
+
+_VERSION = re.compile(r"slapd (\d+)\.(\d+)\.(\d+)")
+_TOOLCHAINS = {}
+_lock = threading.Lock()
+
+
+class Toolchain:
+    """The OpenLDAP installation used by the :class:`~slapd.Slapd` instances.
+
+    The commands, the slapd version, the backends and overlays, and the
+    schemas are looked for once, when they are first needed, and the results
+    are kept for the life of the process. Use :meth:`get` to share a toolchain
+    between instances.
+
+    :param bin_path: The search path of the client and tool commands.
+    :param sbin_path: The search path of slapd.
+    :param slapd_path: The slapd binary. Defaults to the `SLAPD` environment
+        variable, or to slapd found in *sbin_path*.
+    """
+
+    def __init__(self, bin_path, sbin_path, slapd_path=None):
+        self.bin_path = bin_path
+        self.sbin_path = sbin_path
+        self._slapd_path = slapd_path or os.environ.get("SLAPD")
+        self._commands = {}
+
+    @classmethod
+    def get(cls, bin_path, sbin_path):
+        """Return the toolchain of the process for the search paths."""
+        key = (bin_path, sbin_path, os.environ.get("SLAPD"), os.environ.get("SCHEMA"))
+        with _lock:
+            if key not in _TOOLCHAINS:
+                _TOOLCHAINS[key] = cls(bin_path, sbin_path)
+            return _TOOLCHAINS[key]
+
+    def command(self, cmd, in_sbin=False):
+        """Return the path of a command.
+
+        :raises ValueError: If the command is not found.
+        """
+        if cmd not in self._commands:
+            path, var_name = (
+                (self.sbin_path, "SBIN") if in_sbin else (self.bin_path, "BIN")
+            )
+            command = which(cmd, path=path)
+            if command is None:
+                raise ValueError(
+                    f"Command '{cmd}' not found. Set the {var_name} environment "
+                    "variable to override slapd's search path."
+                )
+            self._commands[cmd] = command
+        return self._commands[cmd]
+
+    @property
+    def slapd(self):
+        """The path of the slapd binary."""
+        return self._slapd_path or self.command("slapd", in_sbin=True)
+
+    @functools.cached_property
+    def version(self):
+        """The version banner of slapd, as printed by `slapd -VV`."""
+        proc = subprocess.run(
+            [self.slapd, "-VV"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        return proc.stdout.decode("utf-8", errors="replace")
+
+    @functools.cached_property
+    def version_info(self):
+        """The slapd version as a `(major, minor, patch)` tuple, or `None` if unknown."""
+        match = _VERSION.search(self.version)
+        return tuple(int(part) for part in match.groups()) if match else None
+
+    @functools.cached_property
+    def _static(self):
+        """Parse the backends and overlays built in slapd, listed by `slapd -VVV`."""
+        proc = subprocess.run(
+            [self.slapd, "-VVV"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+        )
+        static = {}
+        current = None
+        for line in proc.stdout.decode("utf-8", errors="replace").splitlines():
+            if line.startswith("Included static "):
+                current = static.setdefault(line.split()[2].rstrip(":"), set())
+            elif current is not None and line.startswith((" ", "\t")) and line.strip():
+                current.add(line.strip())
+            else:
+                current = None
+        return static
+
+    @property
+    def static_backends(self):
+        """The backends built in slapd, or `None` if slapd does not list them."""
+        return self._static.get("backends")
+
+    @property
+    def static_overlays(self):
+        """The overlays built in slapd, or `None` if slapd does not list them."""
+        return self._static.get("overlays")
+
+    @functools.cached_property
+    def module_dir(self):
+        """The directory of the dynamic modules, or `None` if not found.
+
+        It is read from the `SLAPD_MODULEPATH` environment variable, or
+        looked for in the usual installation directories.
+        """
+        candidates = [os.environ.get("SLAPD_MODULEPATH"), *MODULE_DIRS]
+        return next((path for path in candidates if path and os.path.isdir(path)), None)
+
+    @functools.cached_property
+    def modules(self):
+        """The dynamic modules, like `back_mdb` or `syncprov`, and their paths."""
+        if self.module_dir is None:
+            return {}
+        modules = {}
+        for filename in sorted(os.listdir(self.module_dir)):
+            name, extension = os.path.splitext(filename)
+            if extension in (".so", ".la"):
+                modules.setdefault(name, os.path.join(self.module_dir, filename))
+        return modules
+
+    def _available(self, name, static, module):
+        if static is None or self.module_dir is None:
+            # without the complete list, let slapd tell
+            return True
+        return name in static or module in self.modules
+
+    def has_backend(self, name):
+        """Return whether the backend, like `mdb`, is built in or can be loaded."""
+        return self._available(name, self.static_backends, f"back_{name}")
+
+    def has_overlay(self, name):
+        """Return whether the overlay, like `syncprov`, is built in or can be loaded."""
+        return self._available(name, self.static_overlays, name)
+
+    @functools.cached_property
+    def schema_dir(self):
+        """The schemas directory, or `None` if not found.
+
+        It is read from the `SCHEMA` environment variable, or looked for in
+        the usual installation directories.
+        """
+        if "SCHEMA" in os.environ:
+            return os.environ["SCHEMA"]
+        return next((path for path in SCHEMA_DIRS if os.path.isdir(path)), None)
+
+    @functools.cached_property
+    def schemas(self):
+        """The names of the LDIF schemas of :attr:`schema_dir`."""
+        if self.schema_dir is None or not os.path.isdir(self.schema_dir):
+            return frozenset()
+        return frozenset(
+            name for name in os.listdir(self.schema_dir) if name.endswith(".ldif")
+        )
+
+    def check(self, database=None, schema_paths=(), overlays=()):
+        """Check a configuration can run with this toolchain.
+
+        :param database: The backend of the database, like `mdb`.
+        :param schema_paths: The paths of the schemas to load.
+        :param overlays: The overlays to load.
+
+        :raises ValueError: If something is missing.
+        """
+        if database is not None and not self.has_backend(database):
+            raise ValueError(f"The slapd backend {database!r} is not available.")
+        for path in schema_paths:
+            if not os.path.exists(path):
+                raise ValueError(f"The schema {path!r} is not available.")
+        for overlay in overlays:
+            if not self.has_overlay(overlay):
+                raise ValueError(f"The slapd overlay {overlay!r} is not available.")
@@ -0,0 +1,136 @@
+import re
+
+INDEX_TYPES = (
+    "pres",
+    "eq",
+    "approx",
+    "sub",
+    "subinitial",
+    "subany",
+    "subfinal",
+    "nolang",
+    "nosubtypes",
+    "notags",
+)
+ENV_FLAGS = ("nosync", "nometasync", "writemap", "mapasync", "nordahead")
+
+_ATTRIBUTE = re.compile(r"^[A-Za-z][A-Za-z0-9-]*(;[A-Za-z0-9-]+)*$")
+
+
+def _positive(name, value, minimum=1):
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise ValueError(f"{name} must be an integer >= {minimum}, got {value!r}.")
+    return value
+
+
+def _limit(name, value):
+    if value == "unlimited":
+        return value
+    return _positive(name, value, minimum=0)
+
+
+def _types(value):
+    return value.replace(" ", "").split(",") if isinstance(value, str) else value
+
+
+def index_lines(indexes):
+    """Return the `olcDbIndex` lines of `indexes`.
+
+    :param indexes: A dictionary of attribute names, or `default`, and index
+        types, either as a list like `["eq", "sub"]` or a string like `"eq,sub"`.
+    """
+    lines = []
+    for attribute, types in (indexes or {}).items():
+        if not _ATTRIBUTE.match(attribute):
+            raise ValueError(f"Invalid index attribute {attribute!r}.")
+        types = list(_types(types))
+        unknown = set(types) - set(INDEX_TYPES)
+        if not types or unknown:
+            raise ValueError(
+                f"Invalid index types {types!r} for {attribute!r}, "
+                f"expected some of {', '.join(INDEX_TYPES)}."
+            )
+        lines.append(f"olcDbIndex: {attribute} {','.join(types)}\n")
+    return lines
+
+
+def global_options(
+    threads=None,
+    listener_threads=None,
+    conn_max_pending=None,
+    conn_max_pending_auth=None,
+):
+    """Return the `cn=config` LDIF lines of the global tuning options.
+
+    :param threads: The size of the slapd worker threads pool, `olcThreads`.
+    :param listener_threads: The number of listener threads, `olcListenerThreads`.
+        It must be a power of 2, up to 16.
+    :param conn_max_pending: The number of pending requests of anonymous
+        connections, `olcConnMaxPending`.
+    :param conn_max_pending_auth: The number of pending requests of
+        authenticated connections, `olcConnMaxPendingAuth`.
+    """
+    lines = []
+    if threads is not None:
+        lines.append(f"olcThreads: {_positive('threads', threads, minimum=2)}\n")
+    if listener_threads is not None:
+        if listener_threads not in (1, 2, 4, 8, 16):
+            raise ValueError(
+                f"listener_threads must be a power of 2 up to 16, got {listener_threads!r}."
+            )
+        lines.append(f"olcListenerThreads: {listener_threads}\n")
+    if conn_max_pending is not None:
+        lines.append(
+            f"olcConnMaxPending: {_positive('conn_max_pending', conn_max_pending)}\n"
+        )
+    if conn_max_pending_auth is not None:
+        value = _positive("conn_max_pending_auth", conn_max_pending_auth)
+        lines.append(f"olcConnMaxPendingAuth: {value}\n")
+    return "".join(lines)
+
+
+def database_options(
+    indexes=None,
+    env_flags=None,
+    no_sync=False,
+    checkpoint=None,
+    max_readers=None,
+    size_limit=None,
+    time_limit=None,
+):
+    """Return the LDIF lines of the MDB database tuning options.
+
+    :param indexes: The attribute indexes, as accepted by :func:`index_lines`.
+    :param env_flags: A list of LMDB environment flags, `olcDbEnvFlags`, among
+        `nosync`, `nometasync`, `writemap`, `mapasync` and `nordahead`.
+    :param no_sync: Whether the database is not flushed to disk after each
+        write, `olcDbNoSync`.
+    :param checkpoint: A `(kbytes, minutes)` tuple, `olcDbCheckpoint`.
+    :param max_readers: The maximum number of reader threads, `olcDbMaxReaders`.
+    :param size_limit: The maximum number of entries returned by a search,
+        or `"unlimited"`, `olcSizeLimit`.
+    :param time_limit: The maximum duration of a search in seconds, or
+        `"unlimited"`, `olcTimeLimit`.
+    """
+    lines = index_lines(indexes)
+    for flag in env_flags or ():
+        if flag not in ENV_FLAGS:
+            raise ValueError(
+                f"Unknown environment flag {flag!r}, expected some of {', '.join(ENV_FLAGS)}."
+            )
+        lines.append(f"olcDbEnvFlags: {flag}\n")
+    if no_sync:
+        lines.append("olcDbNoSync: TRUE\n")
+    if checkpoint is not None:
+        kbytes, minutes = checkpoint
+        lines.append(
+            f"olcDbCheckpoint: {_positive('checkpoint kbytes', kbytes, 0)} "
+            f"{_positive('checkpoint minutes', minutes, 0)}\n"
+        )
+    if max_readers is not None:
+        lines.append(f"olcDbMaxReaders: {_positive('max_readers', max_readers)}\n")
+    if size_limit is not None:
+        lines.append(f"olcSizeLimit: {_limit('size_limit', size_limit)}\n")
+    if time_limit is not None:
+        lines.append(f"olcTimeLimit: {_limit('time_limit', time_limit)}\n")
+    return "".join(lines)
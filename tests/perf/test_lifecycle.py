@@ -0,0 +1,101 @@
+"""Lifecycle benchmarks, run with `pytest tests/perf --benchmark-json=results.json`."""
+
+import atexit
+
+import pytest
+
+import slapd
+from slapd.benchmark import PAYLOAD_SIZES
+from slapd.benchmark import entry_ldif
+from slapd.benchmark import modify_ldif
+
+pytest.importorskip("pytest_benchmark")
+
+PHASES = ("setup_rundir", "write_config", "test_config", "start_slapd")
+
+
+@pytest.fixture
+def servers():
+    started = []
+    yield started
+    for server in started:
+        server.stop()
+
+
+@pytest.fixture(scope="module")
+def server():
+    with slapd.Slapd() as server:
+        server.init_tree()
+        yield server
+
+
+def test_start(benchmark, servers):
+    def setup():
+        server = slapd.Slapd()
+        servers.append(server)
+        return (server,), {}
+
+    benchmark.pedantic(lambda server: server.start(), setup=setup, rounds=5)
+
+
+@pytest.mark.parametrize("phase", PHASES)
+def test_start_phase(benchmark, servers, phase):
+    def setup():
+        server = slapd.Slapd()
+        servers.append(server)
+        atexit.register(server.stop)
+        server._cleanup_rundir()
+        for previous in PHASES[: PHASES.index(phase)]:
+            getattr(server, f"_{previous}")()
+        return (server,), {}
+
+    benchmark.pedantic(
+        lambda server: getattr(server, f"_{phase}")(), setup=setup, rounds=5
+    )
+
+
+def test_restart(benchmark, server):
+    benchmark.pedantic(server.restart, rounds=5)
+
+
+def test_stop(benchmark, servers):
+    def setup():
+        server = slapd.Slapd()
+        server.start()
+        return (server,), {}
+
+    benchmark.pedantic(lambda server: server.stop(), setup=setup, rounds=5)
+
+
+def test_cleanup_rundir(benchmark):
+    def setup():
+        server = slapd.Slapd()
+        server._setup_rundir()
+        server._write_config()
+        return (server,), {}
+
+    benchmark.pedantic(lambda server: server._cleanup_rundir(), setup=setup, rounds=5)
+
+
+@pytest.mark.parametrize("size", PAYLOAD_SIZES)
+def test_ldapadd(benchmark, server, size):
+    indexes = iter(range(size * 1000, size * 1000 + 1000))
+    benchmark.pedantic(
+        lambda: server.ldapadd(entry_ldif(server, next(indexes), size)), rounds=50
+    )
+
+
+@pytest.mark.parametrize("size", PAYLOAD_SIZES)
+def test_ldapsearch(benchmark, server, size):
+    server.ldapadd(entry_ldif(server, size, size), expected=(0, 68))
+    benchmark.pedantic(
+        server.ldapsearch, args=(f"(cn=bench{size})", server.suffix), rounds=50
+    )
+
+
+@pytest.mark.parametrize("size", PAYLOAD_SIZES)
+def test_ldapmodify(benchmark, server, size):
+    server.ldapadd(entry_ldif(server, size, size), expected=(0, 68))
+    benchmark.pedantic(
+        server.ldapmodify, args=(modify_ldif(server, size, size),), rounds=50
+    )
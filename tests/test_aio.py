@@ -0,0 +1,84 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import slapd
+
+
+def test_async_nominal_case():
+    async def run():
+        server = slapd.AsyncSlapd()
+        await server.start()
+        await server.restart()
+        await server.stop()
+        assert server._proc is None
+
+    asyncio.run(run())
+
+
+def test_async_attributes():
+    server = slapd.AsyncSlapd()
+    assert server.ldapi_uri == server.server.ldapi_uri
+    assert server.root_dn == server.server.root_dn
+    # the synchronous methods would not see the slapd process
+    for name in ("snapshot", "reset", "batch", "iter_ldapsearch", "resource_usage"):
+        assert not hasattr(server, name)
+
+
+def test_async_terminate():
+    # at interpreter exit, a slapd ignoring SIGTERM is killed before the cleanup
+    server = slapd.AsyncSlapd()
+    server.server.STOP_TIMEOUT = 1
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); "
+            "print(flush=True); time.sleep(60)",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    proc.stdout.readline()
+    proc.stdout.close()
+    server._proc = proc
+    os.makedirs(server.server.testrundir)
+
+    started = time.monotonic()
+    server._terminate()
+    assert time.monotonic() - started >= 1
+    with pytest.raises(ProcessLookupError):
+        os.kill(proc.pid, 0)
+    assert not os.path.exists(server.server.testrundir)
+    proc.wait()
+
+
+def test_async_commands():
+    async def run():
+        async with slapd.AsyncSlapd() as server:
+            assert "dn:cn=manager,dc=slapd-test,dc=python-ldap,dc=org\n" == (
+                await server.ldapwhoami()
+            ).stdout.decode("utf-8")
+            await server.init_tree()
+            await server.ldapadd(
+                f"dn: ou=home,{server.suffix}\nobjectClass: organizationalUnit\nou: home\n"
+            )
+            assert "ou=home" in (await server.slapcat()).stdout.decode("utf-8")
+            await server.ldapsearch("(ou=home)", server.suffix)
+            await server.ldapdelete(f"ou=home,{server.suffix}")
+            await server.ldapadd("bad ldif", expected=247)
+
+    asyncio.run(run())
+
+
+def test_async_concurrent_start():
+    async def run():
+        servers = [slapd.AsyncSlapd() for _ in range(4)]
+        await asyncio.gather(*(server.start() for server in servers))
+        assert len({server.ldapi_uri for server in servers}) == 4
+        await asyncio.gather(*(server.stop() for server in servers))
+
+    asyncio.run(run())
@@ -0,0 +1,105 @@
+import io
+
+import pytest
+
+import slapd
+from slapd.batch import Batch
+from slapd.batch import parse_rejects
+
+
+class FakeSlapd:
+    PATH_LDAPMODIFY = "ldapmodify"
+
+    def __init__(self, testrundir):
+        self.testrundir = testrundir
+        self.calls = []
+
+    def _cli_popen(self, ldapcommand, extra_args=None, stdin_data=None, expected=0):
+        self.calls.append((extra_args, stdin_data.decode("utf-8")))
+        with open(extra_args[1], "w") as fd:
+            fd.write(
+                "# Error: Already exists (68)\n"
+                "dn: cn=a,dc=example\n"
+                "changetype: add\n"
+                "cn: a\n"
+                "\n"
+            )
+        return "result"
+
+
+def test_batch(tmp_path):
+    server = FakeSlapd(str(tmp_path))
+    with Batch(server, continue_on_error=True, max_records=3) as batch:
+        batch.add("cn=a,dc=example", {"cn": ["a"]})
+        batch.modify(
+            "cn=a,dc=example",
+            [("replace", "description", ["foo", "bar"]), ("delete", "seeAlso", [])],
+        )
+        batch.modrdn("cn=a,dc=example", "cn=b", newsuperior="ou=people,dc=example")
+        assert len(batch) == 0
+        batch.delete("cn=b,ou=people,dc=example")
+        assert len(batch) == 1
+
+    assert len(server.calls) == 2
+    extra_args, stdin = server.calls[0]
+    assert extra_args[0] == "-S"
+    assert extra_args[2] == "-c"
+    assert stdin == (
+        "dn: cn=a,dc=example\nchangetype: add\ncn: a\n\n"
+        "dn: cn=a,dc=example\nchangetype: modify\nreplace: description\n"
+        "description: foo\ndescription: bar\n-\ndelete: seeAlso\n-\n\n"
+        "dn: cn=a,dc=example\nchangetype: modrdn\nnewrdn: cn=b\ndeleteoldrdn: 1\n"
+        "newsuperior: ou=people,dc=example\n\n"
+    )
+    assert server.calls[1][1] == "dn: cn=b,ou=people,dc=example\nchangetype: delete\n\n"
+    assert batch.results == ["result", "result"]
+    assert batch.errors[0] == ("cn=a,dc=example", "add", 68, "Already exists")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_batch_exception(tmp_path):
+    server = FakeSlapd(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        with Batch(server) as batch:
+            batch.delete("cn=a,dc=example")
+            raise RuntimeError()
+    assert server.calls == []
+
+
+def test_parse_rejects():
+    rejects = io.StringIO(
+        "# Error: No such object (32), matched DN: dc=example\n"
+        "dn: cn=a,ou=missing,dc=example\n"
+        "changetype: modify\n"
+        "replace: cn\n"
+        "cn: a\n"
+        "-\n"
+        "\n"
+        "# Error: Invalid syntax (21), additional info: bad\n"
+        "dn: cn=b,dc=example\n"
+        "changetype: add\n"
+        "cn: b\n"
+    )
+    assert list(parse_rejects(rejects)) == [
+        ("cn=a,ou=missing,dc=example", "modify", 32, "No such object"),
+        ("cn=b,dc=example", "add", 21, "Invalid syntax"),
+    ]
+
+
+def test_slapd_batch():
+    with slapd.Slapd() as server:
+        server.init_tree()
+        with server.batch(continue_on_error=True, expected=(0, 68)) as batch:
+            for i in range(100):
+                batch.add(
+                    f"cn=app{i},{server.suffix}",
+                    {"objectClass": ["applicationProcess"], "cn": [f"app{i}"]},
+                )
+            batch.add(
+                server.root_dn,
+                {"objectClass": ["applicationProcess"], "cn": [server.root_cn]},
+            )
+        assert len(batch.results) == 1
+        assert batch.errors == [(server.root_dn, "add", 68, "Already exists")]
+        entries = server.iter_ldapsearch("(cn=app*)", server.suffix, attributes=[])
+        assert len(list(entries)) == 100
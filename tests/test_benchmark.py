@@ -0,0 +1,17 @@
+from slapd.benchmark import _stats
+from slapd.benchmark import compare
+
+
+def test_compare():
+    baseline = {"benchmarks": {"start": _stats([0.1, 0.1]), "stop": _stats([0.2])}}
+    results = {
+        "benchmarks": {
+            "start": _stats([0.2, 0.2]),
+            "stop": _stats([0.2]),
+            "restart": _stats([0.1]),
+        }
+    }
+    assert compare(baseline, results) == [
+        ("start", 0.1, 0.2, 2.0, True),
+        ("stop", 0.2, 0.2, 1.0, False),
+    ]
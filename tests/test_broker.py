@@ -0,0 +1,85 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from slapd.broker import Broker
+from slapd.broker import BrokerClient
+
+
+class FakeServer:
+    ldapi_uri = None
+    suffix = "dc=example"
+    root_dn = "cn=Manager,dc=example"
+    root_pw = "password"
+
+    def __init__(self, port):
+        self.ldap_uri = f"ldap://127.0.0.1:{port}/"
+
+
+class FakePool:
+    def __init__(self):
+        self.servers = [FakeServer(1), FakeServer(2)]
+        self.released = []
+
+    def __len__(self):
+        return 2
+
+    def lease(self, timeout=None):
+        if not self.servers:
+            raise TimeoutError("No slapd instance was ready in time.")
+        return self.servers.pop(0)
+
+    def release(self, server):
+        self.released.append(server)
+        self.servers.append(server)
+
+
+@pytest.fixture
+def broker(tmp_path):
+    with Broker(FakePool(), str(tmp_path / "broker.sock")) as broker:
+        thread = threading.Thread(target=broker.serve_forever)
+        thread.start()
+        yield broker
+        broker.shutdown()
+        thread.join()
+
+
+def test_broker_lease(broker):
+    with BrokerClient(broker.path) as client:
+        with client.leased() as lease:
+            assert lease.ldap_uri == "ldap://127.0.0.1:1/"
+            assert lease.root_dn == "cn=Manager,dc=example"
+            other = client.lease()
+            assert client.status() == {"instances": 2, "leased": 2}
+            with pytest.raises(TimeoutError):
+                client.lease(timeout=0)
+        client.release(other)
+        with pytest.raises(RuntimeError):
+            client.release(other)
+        assert client.status() == {"instances": 2, "leased": 0}
+    assert [server.ldap_uri for server in broker.pool.released] == [
+        "ldap://127.0.0.1:1/",
+        "ldap://127.0.0.1:2/",
+    ]
+
+
+def test_broker_client_crash(broker):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(broker.path)
+    sock.sendall(json.dumps({"op": "lease"}).encode() + b"\n")
+    assert json.loads(sock.makefile().readline())["lease"]
+    sock.close()
+
+    for _ in range(100):
+        if broker.pool.released:
+            break
+        time.sleep(0.01)
+    assert len(broker.pool.released) == 1
+
+
+def test_broker_already_running(broker):
+    with pytest.raises(RuntimeError):
+        Broker(FakePool(), broker.path)
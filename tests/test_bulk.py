@@ -0,0 +1,112 @@
+import io
+import os
+import pathlib
+import sys
+
+import slapd
+from slapd.bulk import iter_chunks
+from slapd.bulk import stream
+from slapd.ldif import format_record
+from slapd.ldif import init_tree_ldif
+
+LDIF = "dn: cn=a,dc=example\ncn: a\n\ndn: cn=b,dc=example\ncn: b\n\n"
+CAT = [
+    sys.executable,
+    "-c",
+    "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)",
+]
+
+
+def test_iter_chunks(tmp_path):
+    path = tmp_path / "data.ldif"
+    path.write_text(LDIF)
+    expected = LDIF.encode("utf-8")
+
+    assert b"".join(iter_chunks(LDIF, chunk_size=7)) == expected
+    assert b"".join(iter_chunks(expected)) == expected
+    assert b"".join(iter_chunks(path, chunk_size=7)) == expected
+    assert b"".join(iter_chunks(io.StringIO(LDIF))) == expected
+    with open(path, "rb") as fd:
+        assert b"".join(iter_chunks(fd)) == expected
+    assert b"".join(iter_chunks(LDIF.splitlines(keepends=True))) == expected
+    assert list(iter_chunks(iter(LDIF), chunk_size=10))[0] == expected[:10]
+
+
+def test_stream():
+    records = (
+        format_record(f"cn={i},dc=example", {"cn": [str(i)]}) for i in range(5000)
+    )
+    reports = []
+    report = stream(CAT, iter_chunks(records, chunk_size=1000), reports.append, 0)
+    assert report.process.returncode == 0
+    assert report.entries == 5000
+    assert report.bytes == len(report.process.stdout)
+    assert report.process.stdout.startswith(b"dn: cn=0,dc=example\n")
+    assert report.entries_per_second > 0
+    assert len(reports) > 1
+    assert reports[-1] is report
+
+
+def test_stream_exited():
+    report = stream(
+        [sys.executable, "-c", "import sys; sys.exit(3)"], iter_chunks(LDIF * 100000)
+    )
+    assert report.process.returncode == 3
+
+
+def test_bulk_load(tmp_path):
+    records = (
+        format_record(
+            f"cn=user{i},dc=slapd-test,dc=python-ldap,dc=org",
+            {"objectClass": ["applicationProcess"], "cn": [f"user{i}"]},
+        )
+        for i in range(1000)
+    )
+    path = tmp_path / "data.ldif"
+    path.write_text(
+        "".join(
+            format_record(
+                f"cn=other{i},dc=slapd-test,dc=python-ldap,dc=org",
+                {"objectClass": ["applicationProcess"], "cn": [f"other{i}"]},
+            )
+            for i in range(1000)
+        )
+    )
+
+    with slapd.Slapd() as server:
+        server.init_tree()
+        report = server.bulk_load(records)
+        assert report.entries == 1000
+
+        report = server.bulk_load(pathlib.Path(path), offline=True)
+        assert report.entries == 1000
+
+        entries = server.iter_ldapsearch("(cn=*)", server.suffix, attributes=[])
+        assert len(list(entries)) == 2001
+
+
+def test_bulk_load_stopped(tmp_path):
+    server = slapd.Slapd()
+    ldif = (
+        init_tree_ldif(server.suffix, server.root_cn)
+        + "\n"
+        + "".join(
+            format_record(
+                f"cn=user{i},{server.suffix}",
+                {"objectClass": ["applicationProcess"], "cn": [f"user{i}"]},
+            )
+            for i in range(100)
+        )
+    )
+    try:
+        report = server.bulk_load(ldif, offline=True)
+        assert report.entries == 102
+        assert server._proc is None
+
+        # the content loaded before starting is kept
+        server.start()
+        entries = server.iter_ldapsearch("(cn=*)", server.suffix, attributes=[])
+        assert len(list(entries)) == 101
+    finally:
+        server.stop()
+    assert not os.path.exists(server.testrundir)
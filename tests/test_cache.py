@@ -0,0 +1,140 @@
+import logging
+import os
+import zlib
+
+import pytest
+
+import slapd
+import slapd.cache
+from slapd.cache import DatasetStore
+from slapd.cache import _rewrite_ldif
+
+
+def test_config_cache(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+
+    with slapd.Slapd(config_cache=cache_dir) as server:
+        key = server.config_cache.key(server)
+        assert key is not None
+        assert os.listdir(cache_dir) == [key]
+
+    with slapd.Slapd(config_cache=cache_dir) as server:
+        assert server.config_cache.key(server) == key
+        server.init_tree()
+        assert (
+            "dn:cn=manager,dc=slapd-test,dc=python-ldap,dc=org\n"
+            == server.ldapwhoami().stdout.decode("utf-8")
+        )
+        config = server.slapcat(["-n0"]).stdout.decode("utf-8")
+        assert f"olcDbDirectory: {server._db_directory}" in config
+        assert slapd.cache.DIRECTORY_PLACEHOLDER not in config
+
+
+def test_config_cache_key(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    server = slapd.Slapd(config_cache=cache_dir)
+    other = slapd.Slapd(config_cache=cache_dir)
+    assert server.config_cache.key(server) == other.config_cache.key(other)
+
+    other = slapd.Slapd(config_cache=cache_dir, schemas=["core.ldif", "cosine.ldif"])
+    assert server.config_cache.key(server) != other.config_cache.key(other)
+
+    other = slapd.Slapd(config_cache=cache_dir, suffix="dc=other")
+    assert server.config_cache.key(server) != other.config_cache.key(other)
+
+
+def test_rewrite_ldif(tmp_path):
+    path = tmp_path / "cn=config.ldif"
+    path.write_text(
+        "# AUTO-GENERATED FILE - DO NOT EDIT!! Use ldapmodify.\n"
+        "# CRC32 00000000\n"
+        "dn: cn=config\n"
+        "olcDbDirectory: /some/long/\n"
+        " path\n"
+    )
+    _rewrite_ldif(str(path), lambda line: line.replace("/some/long/path", "/other"))
+
+    header, crc, body = path.read_text().split("\n", 2)
+    assert body == "dn: cn=config\nolcDbDirectory: /other\n"
+    assert crc == f"# CRC32 {zlib.crc32(body.encode()):08x}"
+
+
+class FakeSlapd:
+    logger = logging.getLogger("python-ldap-test")
+
+    def __init__(self, db_directory):
+        self._db_directory = str(db_directory)
+
+
+def test_dataset_store_eviction(tmp_path):
+    store = DatasetStore(str(tmp_path / "store"), budget=4 * 4096)
+    assert store.entries() == []
+
+    for index, key in enumerate(["a", "b", "c"]):
+        directory = tmp_path / key
+        directory.mkdir()
+        (directory / "data.mdb").write_bytes(key.encode() * 2 * 4096)
+        store.store(key, FakeSlapd(directory))
+        os.utime(os.path.join(store.path, key), (index, index))
+    assert [key for _, _, key in store.entries()] == ["b", "c"]
+
+    restored = tmp_path / "restored"
+    restored.mkdir()
+    assert not store.restore("a", FakeSlapd(restored))
+    assert store.restore("b", FakeSlapd(restored))
+    assert (restored / "data.mdb").read_bytes() == b"b" * 2 * 4096
+    assert [key for _, _, key in store.entries()] == ["c", "b"]
+
+    store.budget = 0
+    store.evict(keep="b")
+    assert [key for _, _, key in store.entries()] == ["b"]
+
+
+def test_dataset_store_restore_failure(tmp_path, monkeypatch):
+    store = DatasetStore(str(tmp_path / "store"))
+    directory = tmp_path / "a"
+    directory.mkdir()
+    (directory / "data.mdb").write_bytes(b"a" * 4096)
+    store.store("a", FakeSlapd(directory))
+
+    # the entry is evicted after it was touched, once the copy started
+    def clone_file(src, dst):
+        with open(dst, "wb") as fd:
+            fd.write(b"a")
+        raise FileNotFoundError(src)
+
+    monkeypatch.setattr(slapd.cache, "clone_file", clone_file)
+    restored = tmp_path / "restored"
+    restored.mkdir()
+    assert not store.restore("a", FakeSlapd(restored))
+    assert not (restored / "data.mdb").exists()
+
+    def clone_file(src, dst):
+        with open(dst, "wb") as fd:
+            fd.write(b"a")
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(slapd.cache, "clone_file", clone_file)
+    with pytest.raises(OSError):
+        store.restore("a", FakeSlapd(restored))
+    assert not (restored / "data.mdb").exists()
+
+
+def test_dataset_store(tmp_path, monkeypatch):
+    store_dir = str(tmp_path / "store")
+    dataset = tmp_path / "dataset.ldif"
+    server = slapd.Slapd(dataset_store=store_dir)
+    dataset.write_text(server._init_tree_ldif())
+    server.start(dataset=dataset)
+    key = server.dataset_store.key(server, dataset)
+    assert os.listdir(store_dir) == [key]
+    assert len(list(server.iter_ldapsearch("(objectClass=*)", server.suffix))) == 2
+    server.stop()
+
+    # the database is restored, and not built again
+    monkeypatch.setattr(DatasetStore, "store", None)
+    with slapd.Slapd(dataset_store=store_dir) as server:
+        server.stop()
+        server.start(dataset=dataset)
+        assert server.dataset_store.key(server, dataset) == key
+        assert len(list(server.iter_ldapsearch("(objectClass=*)", server.suffix))) == 2
@@ -0,0 +1,63 @@
+import pytest
+
+import slapd
+
+pytest.importorskip("ldap")
+
+
+def test_ldap_engine_commands():
+    with slapd.Slapd(engine="ldap") as server:
+        assert server.client is not None
+        assert (
+            "dn:cn=manager,dc=slapd-test,dc=python-ldap,dc=org\n"
+            == server.ldapwhoami().stdout.decode("utf-8")
+        )
+        server.ldapsearch("ou=home", "dc=slapd-test,dc=python-ldap,dc=org", expected=32)
+        server.init_tree()
+
+        ldif = (
+            "dn: ou=home,dc=slapd-test,dc=python-ldap,dc=org\n"
+            "objectClass: organizationalUnit\n"
+            "ou: home\n"
+        )
+        server.ldapadd(ldif)
+        server.ldapadd(ldif, expected=68)
+
+        ldif = (
+            "dn: ou=home,dc=slapd-test,dc=python-ldap,dc=org\n"
+            "changetype: modify\n"
+            "add: description\n"
+            "description: foobar\n"
+        )
+        server.ldapmodify(ldif)
+        output = server.ldapsearch(
+            "(ou=home)",
+            "dc=slapd-test,dc=python-ldap,dc=org",
+            extra_args=["-LLL"],
+        ).stdout.decode("utf-8")
+        assert output == (
+            "dn: ou=home,dc=slapd-test,dc=python-ldap,dc=org\n"
+            "objectClass: organizationalUnit\n"
+            "ou: home\n"
+            "description: foobar\n"
+            "\n"
+        )
+
+        server.ldapdelete("dc=slapd-test,dc=python-ldap,dc=org", True)
+        server.ldapsearch(
+            "(objectClass=*)", "dc=slapd-test,dc=python-ldap,dc=org", expected=32
+        )
+
+
+def test_ldap_engine_restart():
+    with slapd.Slapd(engine="ldap") as server:
+        server.ldapwhoami()
+        server.restart()
+        server.ldapwhoami()
+
+
+def test_ldap_engine_return_codes():
+    with slapd.Slapd(engine="ldap") as server:
+        with pytest.raises(RuntimeError):
+            server.ldapadd("bad ldif")
+        server.ldapadd("bad ldif", expected=247)
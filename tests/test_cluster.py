@@ -0,0 +1,50 @@
+import pytest
+
+import slapd
+from slapd.generator import SCHEMAS
+from slapd.generator import DirectoryGenerator
+
+
+class FakeSlapd:
+    def __init__(self, server_id, ldap_uri="ldap://127.0.0.1:1234/"):
+        self.server_id = server_id
+        self.ldap_uri = ldap_uri
+
+
+def test_cluster_invalid():
+    with pytest.raises(ValueError):
+        slapd.SlapdCluster(size=1)
+    with pytest.raises(ValueError):
+        slapd.SlapdCluster(topology="ring")
+
+    ids = iter([1, 1])
+    with pytest.raises(ValueError):
+        slapd.SlapdCluster(factory=lambda: FakeSlapd(next(ids)))
+    ids = iter([1, 2])
+    with pytest.raises(ValueError):
+        slapd.SlapdCluster(factory=lambda: FakeSlapd(next(ids), None))
+
+
+def test_provider_consumer():
+    with slapd.SlapdCluster(size=3, schemas=SCHEMAS) as cluster:
+        cluster.provider.init_tree()
+        cluster.wait_converged()
+        lags = cluster.lag()
+        assert set(lags) == {server.ldap_uri for server in cluster.servers[1:]}
+
+        generator = DirectoryGenerator(cluster.provider.suffix, users=100, groups=0)
+        result = cluster.catch_up(generator.ldif())
+        assert result["entries"] == len(generator)
+        for server in cluster.servers:
+            assert (
+                len(list(server.iter_ldapsearch("(ou=*)", server.suffix)))
+                == generator.ous + 1
+            )
+
+
+def test_multi_provider():
+    with slapd.SlapdCluster(size=2, topology="multi-provider") as cluster:
+        cluster.provider.init_tree()
+        cluster.wait_converged()
+        lags = cluster.lag(cluster.servers[1])
+        assert set(lags) == {cluster.servers[0].ldap_uri}
@@ -0,0 +1,134 @@
+import pytest
+
+import slapd
+from slapd.config import LiveConfig
+from slapd.generator import SCHEMAS
+from slapd.generator import DirectoryGenerator
+
+
+class FakeBatch:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def modify(self, dn, changes):
+        self.calls.append((dn, changes))
+
+
+class FakeToolchain:
+    static_backends = {"mdb", "monitor"}
+    static_overlays = {"syncprov"}
+
+
+class FakeSlapd:
+    _database_dn = "olcDatabase={1}mdb,cn=config"
+    SCHEMADIR = "/schemas"
+
+    def __init__(self):
+        self.calls = []
+        self.indexes = {}
+        self.toolchain = FakeToolchain()
+
+    def batch(self):
+        return FakeBatch(self.calls)
+
+    def ldapmodify(self, ldif, extra_args=None, expected=0):
+        self.calls.append((ldif, expected))
+
+    _schema_path = slapd.Slapd._schema_path
+
+
+def test_live_config_changes():
+    server = FakeSlapd()
+    config = LiveConfig(server)
+
+    config.add_index({"cn": "eq,sub", "mail": ["eq"]}, wait=False)
+    config.set_limits(size_limit=10, time_limit="unlimited")
+    config.set_threads(8)
+    config.set_log_level("stats", "sync")
+    assert server.calls == [
+        (
+            "olcDatabase={1}mdb,cn=config",
+            [("add", "olcDbIndex", ["cn eq,sub", "mail eq"])],
+        ),
+        (
+            "olcDatabase={1}mdb,cn=config",
+            [
+                ("replace", "olcSizeLimit", ["10"]),
+                ("replace", "olcTimeLimit", ["unlimited"]),
+            ],
+        ),
+        ("cn=config", [("replace", "olcThreads", ["8"])]),
+        ("cn=config", [("replace", "olcLogLevel", ["stats", "sync"])]),
+    ]
+    assert server.indexes == {"cn": "eq,sub", "mail": ["eq"]}
+    assert (server.size_limit, server.time_limit, server.threads) == (
+        10,
+        "unlimited",
+        8,
+    )
+
+    with pytest.raises(ValueError):
+        config.add_index({"cn": "fuzzy"})
+    with pytest.raises(ValueError):
+        config.set_threads(1)
+    assert len(server.calls) == 4
+
+
+def test_live_config():
+    with slapd.Slapd(schemas=SCHEMAS) as server:
+        server.init_tree()
+        server.bulk_load(DirectoryGenerator(server.suffix, users=500, groups=0).ldif())
+        server.config.add_index({"cn": "eq"}, wait=True)
+        assert server.config._monitor is True
+        (entry,) = server.iter_ldapsearch(
+            "(objectClass=*)",
+            server._database_dn,
+            attributes=["olcDbIndex"],
+            extra_args=["-s", "base"],
+        )
+        assert "cn eq" in entry.get("olcDbIndex")
+
+        server.config.set_limits(size_limit=5)
+        server.config.set_log_level("stats")
+
+        entries = server.iter_slapcat(extra_args=["-n", "0"])
+        config = {entry.dn: entry for entry in entries}
+        assert "cn eq" in config[server._database_dn].get("olcDbIndex")
+        assert config[server._database_dn].get("olcSizeLimit") == ["5"]
+        assert config["cn=config"].get("olcLogLevel") == ["stats"]
+        assert server.size_limit == 5
+
+
+def test_live_config_modules():
+    server = FakeSlapd()
+    config = LiveConfig(server)
+
+    # built-in modules are not loaded
+    config._load_module("syncprov")
+    config._load_module("back_monitor")
+    assert server.calls == []
+
+    config._load_module("memberof")
+    config._load_module("back_ldap")
+    assert [expected for _, expected in server.calls] == [(0, 20), (0, 20)]
+    assert "olcModuleLoad: memberof\n" in server.calls[0][0]
+
+    # without the list of the built-in modules, slapd tells
+    server.calls.clear()
+    server.toolchain.static_overlays = None
+    config._load_module("syncprov")
+    assert [expected for _, expected in server.calls] == [(0, 20, 80)]
+
+
+def test_live_config_schema_path(tmp_path):
+    server = FakeSlapd()
+    schema = tmp_path / "custom.ldif"
+    schema.touch()
+    assert server._schema_path(str(schema)) == str(schema)
+    assert server._schema_path("cosine.ldif") == "/schemas/cosine.ldif"
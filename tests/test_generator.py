@@ -0,0 +1,77 @@
+import pytest
+
+import slapd
+from slapd import ldif
+from slapd.generator import SCHEMAS
+from slapd.generator import DirectoryGenerator
+
+SUFFIX = "dc=slapd-test,dc=python-ldap,dc=org"
+
+
+def test_generator():
+    generator = DirectoryGenerator(SUFFIX, users=50, groups=5, ous=3, group_size=(2, 4))
+    entries = list(generator.entries())
+    assert len(entries) == len(generator) == 3 + 1 + 50 + 5
+
+    dns = [dn for dn, _ in entries]
+    assert len(set(dns)) == len(dns)
+    assert dns[0] == f"ou=unit0,{SUFFIX}"
+    assert generator.user_dn(4) in dns
+    # parents come before their children
+    seen = {SUFFIX}
+    for dn in dns:
+        assert dn.split(",", 1)[1] in seen
+        seen.add(dn)
+
+    for _, attributes in entries[-5:]:
+        assert 2 <= len(attributes["member"]) <= 4
+        assert set(attributes["member"]) <= seen
+
+    # the output is reproducible, and depends on the seed
+    assert (
+        list(
+            DirectoryGenerator(
+                SUFFIX, users=50, groups=5, ous=3, group_size=(2, 4)
+            ).entries()
+        )
+        == entries
+    )
+    assert (
+        list(
+            DirectoryGenerator(
+                SUFFIX, users=50, groups=5, ous=3, group_size=(2, 4), seed=1
+            ).entries()
+        )
+        != entries
+    )
+
+
+def test_generator_ldif():
+    generator = DirectoryGenerator(
+        SUFFIX, users=10, groups=2, group_size=3, suffix_entry=True
+    )
+    entries = list(ldif.parse("".join(generator.ldif()).splitlines()))
+    assert entries == list(generator.entries())
+    assert entries[0][0] == SUFFIX
+
+
+def test_generator_invalid():
+    with pytest.raises(ValueError):
+        DirectoryGenerator(SUFFIX, users=10, group_size=20)
+    with pytest.raises(ValueError):
+        DirectoryGenerator(SUFFIX, ous=0)
+
+
+def test_generator_load():
+    generator = DirectoryGenerator(SUFFIX, users=1000, groups=50)
+    with slapd.Slapd(schemas=SCHEMAS) as server:
+        server.init_tree()
+        report = server.bulk_load(generator.ldif(), offline=True)
+        assert report.entries == len(generator)
+
+        entries = list(
+            server.iter_ldapsearch(
+                "(objectClass=inetOrgPerson)", server.suffix, attributes=["uid"]
+            )
+        )
+        assert len(entries) == 1000
@@ -0,0 +1,133 @@
+import pytest
+
+from slapd import ldif
+
+
+def test_parse():
+    lines = [
+        b"version: 1\n",
+        b"# a comment\n",
+        b"dn: dc=slapd-test,dc=python-ldap,\n",
+        b" dc=org\n",
+        b"objectClass: dcObject\n",
+        b"objectClass: organization\n",
+        b"description:: w6l0w6k=\n",
+        b"\n",
+        b"\n",
+        b"dn:: b3U9aG9tZSxkYz1vcmc=\n",
+        b"jpegPhoto:: /9j/\n",
+    ]
+    assert list(ldif.parse(lines)) == [
+        (
+            "dc=slapd-test,dc=python-ldap,dc=org",
+            {
+                "objectClass": ["dcObject", "organization"],
+                "description": ["été"],
+            },
+        ),
+        ("ou=home,dc=org", {"jpegPhoto": [b"\xff\xd8\xff"]}),
+    ]
+
+
+def test_parse_folded_multibyte():
+    # ldapsearch folds lines by bytes, even inside a multibyte character
+    value = "é".encode()
+    lines = [
+        b"dn: cn=" + value[:1] + b"\n",
+        b" " + value[1:] + b",dc=org\n",
+        b"cn: \xc3\xa9\n",
+    ]
+    assert list(ldif.parse(lines)) == [("cn=é,dc=org", {"cn": ["é"]})]
+
+
+def test_parse_changes():
+    text = (
+        "dn: ou=home,dc=org\n"
+        "objectClass: organizationalUnit\n"
+        "ou: home\n"
+        "\n"
+        "dn: ou=home,dc=org\n"
+        "changetype: modify\n"
+        "add: description\n"
+        "description: foo\n"
+        "description: bar\n"
+        "-\n"
+        "delete: seeAlso\n"
+        "-\n"
+        "\n"
+        "dn: ou=home,dc=org\n"
+        "changetype: modrdn\n"
+        "newrdn: ou=house\n"
+        "deleteoldrdn: 1\n"
+        "\n"
+        "dn: ou=house,dc=org\n"
+        "changetype: delete\n"
+    )
+    assert list(ldif.parse_changes(text.splitlines(), "add")) == [
+        (
+            "ou=home,dc=org",
+            "add",
+            {"objectClass": ["organizationalUnit"], "ou": ["home"]},
+        ),
+        (
+            "ou=home,dc=org",
+            "modify",
+            [("add", "description", ["foo", "bar"]), ("delete", "seeAlso", [])],
+        ),
+        (
+            "ou=home,dc=org",
+            "modrdn",
+            {"newrdn": "ou=house", "deleteoldrdn": True, "newsuperior": None},
+        ),
+        ("ou=house,dc=org", "delete", None),
+    ]
+
+    with pytest.raises(ValueError):
+        list(ldif.parse_changes(text.splitlines()))
+    with pytest.raises(ValueError):
+        list(ldif.parse_changes(["bad ldif"], "add"))
+
+
+def test_format_record():
+    assert ldif.format_record(
+        "ou=home,dc=org",
+        {"ou": ["home"], "description": ["été", " leading space"], "photo": [b"\xff"]},
+    ) == (
+        "dn: ou=home,dc=org\n"
+        "ou: home\n"
+        "description:: w6l0w6k=\n"
+        "description:: IGxlYWRpbmcgc3BhY2U=\n"
+        "photo:: /w==\n"
+        "\n"
+    )
+
+    line = ldif.format_line("description", "x" * 100, wrap=20)
+    assert all(len(folded) <= 20 for folded in line.splitlines())
+    assert list(ldif.parse(["dn: dc=org", *line.splitlines()])) == [
+        ("dc=org", {"description": ["x" * 100]})
+    ]
+
+
+def test_entries():
+    lines = [
+        b"dn: cn=a,dc=example\n",
+        b"objectClass: person\n",
+        b"cn: a\n",
+        b"userCertificate;binary:: /wA=\n",
+        b"\n",
+    ]
+    (entry,) = ldif.entries(lines)
+    assert entry.dn == "cn=a,dc=example"
+    assert entry.get("CN") == ["a"]
+    assert entry.get("sn") is None
+    assert entry == ldif.Entry(
+        "cn=a,dc=example",
+        {
+            "objectClass": ["person"],
+            "cn": ["a"],
+            "userCertificate;binary": [b"\xff\x00"],
+        },
+    )
+
+    (entry,) = ldif.entries(lines, attributes=["CN", "userCertificate"])
+    assert entry.attributes == {"cn": ["a"], "userCertificate;binary": [b"\xff\x00"]}
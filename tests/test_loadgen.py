@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+import slapd
+from slapd.generator import INDEXES
+from slapd.generator import SCHEMAS
+from slapd.generator import DirectoryGenerator
+from slapd.loadgen import WorkloadReport
+from slapd.loadgen import _Client
+from slapd.loadgen import percentile
+
+
+def test_percentile():
+    samples = [i / 1000 for i in range(1, 1001)]
+    assert percentile(samples, 0.5) == 0.5
+    assert percentile(samples, 0.99) == 0.99
+    assert percentile(samples, 0.999) == 0.999
+    assert percentile(samples, 1) == 1
+    assert percentile([0.1], 0.999) == 0.1
+    assert percentile([], 0.5) == 0.0
+
+
+def test_report():
+    report = WorkloadReport(
+        {"search-sub": [0.003, 0.001, 0.002], "add": [0.01]}, {"add": 1}, 2.0
+    )
+    assert report.operations == 4
+    assert report.ops_per_second == 2.0
+    assert report.percentile(0.5) == 0.002
+    assert report.percentile(0.5, "search-sub") == 0.002
+    summary = report.as_dict()
+    assert summary["total"]["operations"] == 4
+    assert summary["total"]["errors"] == 1
+    assert summary["total"]["max"] == 0.01
+    assert summary["operations"]["search-sub"]["p50"] == 0.002
+    assert summary["operations"]["search-sub"]["ops"] == 1.5
+    assert list(summary["operations"]) == ["add", "search-sub"]
+
+
+class FakeConnection:
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, *args))
+
+
+def test_client_operations():
+    conn = FakeConnection()
+    spec = {
+        "suffix": "dc=example",
+        "users": 10,
+        "ous": 2,
+        "root_dn": "cn=Manager,dc=example",
+        "root_pw": "password",
+    }
+    client = _Client(conn, spec, 3, random.Random(0))
+    assert client.run("delete") == "add"
+    name, dn, attributes = conn.calls[-1]
+    assert name == "add_s"
+    assert dn.startswith("uid=load3-0,ou=unit")
+    assert ("uid", [b"load3-0"]) in attributes
+    assert client.run("delete") == "delete"
+    assert conn.calls[-1] == ("delete_s", dn)
+
+    client.run("search-sub")
+    name, base, scope, filter = conn.calls[-1]
+    assert (name, base, scope) == ("search_s", "dc=example", 2)
+    assert filter.startswith("(uid=user")
+    client.run("search-one")
+    assert conn.calls[-1][1].startswith("ou=unit")
+    client.run("bind")
+    assert conn.calls[-1] == ("simple_bind_s", "cn=Manager,dc=example", "password")
+
+
+def test_workload_invalid():
+    pytest.importorskip("ldap")
+    from slapd.loadgen import Workload
+
+    class FakeSlapd:
+        suffix = "dc=example"
+        ldapi_uri = None
+        ldap_uri = "ldap://127.0.0.1:1234/"
+
+    with pytest.raises(ValueError):
+        Workload(FakeSlapd(), mix={"compare": 1})
+    with pytest.raises(ValueError):
+        Workload(FakeSlapd(), executor="fiber")
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_workload(executor):
+    pytest.importorskip("ldap")
+    from slapd.loadgen import Workload
+
+    with slapd.Slapd(schemas=SCHEMAS, indexes=INDEXES) as server:
+        server.init_tree()
+        generator = DirectoryGenerator(server.suffix, users=50, groups=0)
+        workload = Workload(server, generator, concurrency=2, executor=executor)
+        workload.load()
+
+        report = workload.run(operations=100)
+        assert report.operations == 100
+        assert report.errors == {}
+        assert report.percentile(0.999) >= report.percentile(0.5) > 0
+
+        report = workload.run(duration=0.5, rate=100)
+        assert 30 < report.operations <= 50
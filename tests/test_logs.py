@@ -0,0 +1,66 @@
+import logging
+
+import slapd
+from slapd.logs import LogStats
+from slapd.stats import Stats
+
+LOG_25 = """\
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 fd=12 ACCEPT from PATH=/tmp/ldapi (PATH=/tmp/ldapi)
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 op=0 BIND dn="" method=163
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 op=0 RESULT tag=97 err=0 qtime=0.000010 etime=0.000120 text=
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 op=1 SRCH base="dc=example" scope=2 deref=0 filter="(objectClass=*)"
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 op=1 SRCH attr=cn
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 op=1 SEARCH RESULT tag=101 err=0 qtime=0.000010 etime=0.250000 nentries=3 text=
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 op=2 ADD dn="cn=a,dc=example"
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 op=2 RESULT tag=105 err=68 qtime=0.000010 etime=0.001000 text=
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 op=3 MOD dn="cn=a,dc=example"
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 op=4 UNBIND
+6523f1a2.1b2c3d4e 0x7f0a conn=1000 fd=12 closed
+"""
+
+
+def test_log_stats():
+    log_stats = LogStats(slow_threshold=0.1)
+    log_stats.read(LOG_25.splitlines(keepends=True))
+
+    values = log_stats.as_dict()
+    assert set(values) == {"bind", "search", "add"}
+    assert values["search"]["count"] == 1
+    assert values["search"]["wall"] == 0.25
+    assert values["search"]["entries"] == 3
+    assert values["add"]["errors"] == 1
+    assert values["add"]["results"] == {68: 1}
+
+    (slow,) = log_stats.slow
+    assert slow["operation"] == "search"
+    assert slow["request"].startswith('base="dc=example"')
+    assert slow["nentries"] == 3
+
+    # the modification without result is forgotten when the connection closes
+    assert not log_stats._pending
+
+
+def test_log_stats_without_etime():
+    stats = Stats()
+    log_stats = LogStats(stats)
+    log_stats.feed(b'conn=5 op=1 DEL dn="cn=a,dc=example"\n')
+    log_stats.feed(b"conn=5 op=1 RESULT tag=107 err=0 text=\n")
+    assert stats.as_dict()["operation"]["delete"]["count"] == 1
+
+
+def test_log_stats_logger(caplog):
+    logger = logging.getLogger("python-ldap-test")
+    with caplog.at_level(logging.DEBUG, logger.name):
+        LogStats().read([b"conn=5 fd=12 closed\n", "slapd starting\n"], logger)
+    assert caplog.messages == ["slapd: conn=5 fd=12 closed", "slapd: slapd starting"]
+
+
+def test_slapd_log_stats():
+    with slapd.Slapd(log_stats=True) as server:
+        server.init_tree()
+        server.ldapsearch("(objectClass=*)", server.suffix)
+        server.stop()
+
+        values = server.log_stats.as_dict()
+        assert values["add"]["count"] == 2
+        assert values["search"]["entries"] == 2
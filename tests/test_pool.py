@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+import slapd
+
+
+class FakeSlapd:
+    instances = []
+
+    def __init__(self):
+        self._proc = None
+        self.started = threading.Event()
+        self.stopped = threading.Event()
+        FakeSlapd.instances.append(self)
+
+    def start(self):
+        self.started.set()
+
+    def stop(self):
+        self.stopped.set()
+
+    def snapshot(self):
+        return object()
+
+    def reset(self, snapshot):
+        raise RuntimeError("cannot reset")
+
+
+def test_pool_lease_release():
+    FakeSlapd.instances = []
+    with slapd.SlapdPool(size=2, factory=FakeSlapd) as pool:
+        server = pool.lease(timeout=5)
+        assert server.started.is_set()
+        other = pool.lease(timeout=5)
+        assert other is not server
+
+        # instances that cannot be reset are retired
+        pool.release(server)
+        assert server.stopped.wait(5)
+        assert len(pool) <= pool.max_instances
+
+    assert all(instance.stopped.is_set() for instance in FakeSlapd.instances)
+
+
+def test_pool_max_instances():
+    with slapd.SlapdPool(
+        size=1, max_instances=1, factory=FakeSlapd, recycle=False
+    ) as pool:
+        with pool.leased(timeout=5):
+            with pytest.raises(TimeoutError):
+                pool.lease(timeout=0.1)
+        assert pool.lease(timeout=5) is not None
+
+
+def test_pool_start_error():
+    def factory():
+        raise ValueError("no slapd")
+
+    with slapd.SlapdPool(size=1, factory=factory) as pool:
+        with pytest.raises(RuntimeError):
+            pool.lease(timeout=5)
+
+
+def test_pool():
+    with slapd.SlapdPool(size=2, setup=slapd.Slapd.init_tree) as pool:
+        with pool.leased() as server:
+            server.ldapsearch("(objectClass=*)", server.suffix)
+            server.ldapadd(
+                f"dn: ou=home,{server.suffix}\nobjectClass: organizationalUnit\nou: home\n"
+            )
+
+        with pool.leased() as server:
+            assert "ou=home" not in server.ldapsearch(
+                "(ou=home)", server.suffix
+            ).stdout.decode("utf-8")
+
+
+def test_pool_recycle():
+    with slapd.SlapdPool(size=1, max_instances=1, setup=slapd.Slapd.init_tree) as pool:
+        with pool.leased() as server:
+            server.ldapadd(
+                f"dn: ou=home,{server.suffix}\nobjectClass: organizationalUnit\nou: home\n"
+            )
+
+        with pool.leased() as other:
+            assert other is server
+            assert "ou=home" not in server.slapcat().stdout.decode("utf-8")
@@ -0,0 +1,105 @@
+import socket
+
+import pytest
+
+import slapd
+from slapd.ports import reserve_port
+
+
+def test_reserve_port(tmp_path):
+    reservation = reserve_port("127.0.0.1", registry=str(tmp_path))
+    assert (tmp_path / f"{reservation.port}.lock").exists()
+
+    # the port is held until the socket is released
+    sock = socket.socket()
+    with pytest.raises(OSError):
+        sock.bind(("127.0.0.1", reservation.port))
+    sock.close()
+
+    reservation.release_socket()
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", reservation.port))
+    sock.close()
+
+    reservation.release()
+    assert not (tmp_path / f"{reservation.port}.lock").exists()
+
+
+def test_reserve_port_registry(tmp_path):
+    reservations = [
+        reserve_port("127.0.0.1", registry=str(tmp_path)) for _ in range(20)
+    ]
+    for reservation in reservations:
+        reservation.release_socket()
+    # locked ports are skipped even when their socket is released
+    other = reserve_port("127.0.0.1", registry=str(tmp_path))
+    assert other.port not in {reservation.port for reservation in reservations}
+    for reservation in [*reservations, other]:
+        reservation.release()
+
+
+def test_reserve_port_without_registry():
+    reservation = reserve_port("127.0.0.1", registry=None)
+    assert reservation.port > 0
+    reservation.release()
+
+
+def test_reserve_given_port(tmp_path):
+    reservation = reserve_port("127.0.0.1", registry=str(tmp_path))
+    reservation.release_socket()
+    # the port is locked in the registry
+    with pytest.raises(RuntimeError):
+        reserve_port("127.0.0.1", registry=str(tmp_path), port=reservation.port)
+    reservation.release()
+
+    again = reserve_port("127.0.0.1", registry=str(tmp_path), port=reservation.port)
+    assert again.port == reservation.port
+    again.release()
+
+
+def test_port_reserved_while_started(tmp_path, monkeypatch):
+    monkeypatch.setattr(slapd.Slapd, "PORT_REGISTRY", str(tmp_path))
+    server = slapd.Slapd()
+    # instances hold no socket nor lock until they are started
+    assert server._port_reservation is None
+    assert not list(tmp_path.iterdir())
+
+    server.start()
+    lock = tmp_path / f"{server.port}.lock"
+    assert lock.exists()
+    server.stop()
+    assert not lock.exists()
+    assert server._port_reservation is None
+
+
+def test_ldapi_only_server_id():
+    first = slapd.Slapd(ldapi_only=True)
+    second = slapd.Slapd(ldapi_only=True)
+    assert first.server_id != second.server_id
+
+
+def test_ldapi_only():
+    server = slapd.Slapd(ldapi_only=True)
+    assert server.port is None
+    assert server.ldap_uri is None
+    assert server.default_ldap_uri == server.ldapi_uri
+    with server:
+        assert server.ldapwhoami().stdout.decode("utf-8") == (
+            "dn:" + server.root_dn.lower() + "\n"
+        )
+
+
+def test_start_many():
+    servers = slapd.Slapd.start_many(4)
+    try:
+        assert len({server.port for server in servers}) == 4
+        for server in servers:
+            assert server.ldapwhoami().returncode == 0
+    finally:
+        for server in servers:
+            server.stop()
+
+
+def test_start_many_port():
+    with pytest.raises(ValueError):
+        slapd.Slapd.start_many(2, port=1234)
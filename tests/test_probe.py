@@ -0,0 +1,80 @@
+import asyncio
+import os
+import socket
+import threading
+from urllib.parse import quote_plus
+
+import pytest
+
+import slapd
+from slapd.probe import ANONYMOUS_BIND_REQUEST
+from slapd.probe import async_probe
+from slapd.probe import parse_bind_response
+from slapd.probe import probe
+
+
+def test_parse_bind_response():
+    assert parse_bind_response(bytes.fromhex("300c02010161070a010004000400")) == 0
+    assert parse_bind_response(bytes.fromhex("300c02010161070a013004000400")) == 48
+    # long form lengths
+    assert (
+        parse_bind_response(bytes.fromhex("30840000000c02010161070a013504000400")) == 53
+    )
+    with pytest.raises(ConnectionError):
+        parse_bind_response(bytes.fromhex("300c02010165070a010004000400"))
+
+
+def test_probe_ldapi(tmp_path):
+    path = os.path.join(tmp_path, "ldapi")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            assert conn.recv(len(ANONYMOUS_BIND_REQUEST)) == ANONYMOUS_BIND_REQUEST
+            # send the response in two parts
+            conn.sendall(bytes.fromhex("300c020101"))
+            conn.sendall(bytes.fromhex("61070a010004000400"))
+            conn.recv(64)
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    try:
+        assert probe(f"ldapi://{quote_plus(path)}") == 0
+    finally:
+        thread.join()
+        server.close()
+
+
+def test_probe_unreachable(tmp_path):
+    with pytest.raises(OSError):
+        probe(f"ldapi://{quote_plus(os.path.join(tmp_path, 'missing'))}")
+
+
+def test_start_timings():
+    with slapd.Slapd() as server:
+        assert len(server.start_timings) == 1
+        assert server.start_timings[0]["probes"] >= 1
+        server.restart()
+        assert len(server.start_timings) == 2
+
+
+def test_async_probe(tmp_path):
+    path = os.path.join(tmp_path, "ldapi")
+
+    async def handle(reader, writer):
+        assert await reader.readexactly(len(ANONYMOUS_BIND_REQUEST)) == (
+            ANONYMOUS_BIND_REQUEST
+        )
+        writer.write(bytes.fromhex("300c02010161070a013004000400"))
+        await writer.drain()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_unix_server(handle, path)
+        async with server:
+            return await async_probe(f"ldapi://{quote_plus(path)}")
+
+    assert asyncio.run(run()) == 48
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import slapd
+from slapd.reaper import Reaper
+
+
+def test_reaper():
+    reaper = Reaper()
+    done = []
+    release = threading.Event()
+
+    def fail():
+        raise RuntimeError()
+
+    reaper.submit(release.wait)
+    reaper.submit(fail)
+    reaper.submit(lambda: done.append(1))
+    # the functions do not wait for the blocked one
+    for _ in range(100):
+        if done:
+            break
+        time.sleep(0.05)
+    assert done == [1]
+    release.set()
+    reaper.join()
+
+
+def test_reaper_stubborn_slapd():
+    # a slapd ignoring SIGTERM does not delay the teardown of the others
+    stubborn, other = (
+        slapd.Slapd(background_teardown=True),
+        slapd.Slapd(background_teardown=True),
+    )
+    stubborn.STOP_TIMEOUT = 10
+    stubborn._proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); "
+            "print(flush=True); time.sleep(60)",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    stubborn._proc.stdout.readline()
+    stubborn._proc.stdout.close()
+    other._proc = subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(60)"]
+    )
+
+    stubborn.stop()
+    other.stop()
+    assert other.wait_teardown(timeout=5)
+    assert not stubborn.wait_teardown(timeout=0)
+    assert stubborn.wait_teardown(timeout=30)
+
+
+def test_background_teardown():
+    server = slapd.Slapd(background_teardown=True)
+    server.start()
+    server.stop()
+    assert server.wait_teardown(timeout=30)
+    assert not os.path.exists(server.testrundir)
+
+    # the instance can be started again
+    server.start()
+    assert server.ldapwhoami().returncode == 0
+    server.stop()
+    server.wait_teardown()
@@ -0,0 +1,88 @@
+import os
+import struct
+import sys
+
+import pytest
+
+import slapd
+from slapd.resources import MDB_MAGIC
+from slapd.resources import ResourceSampler
+from slapd.resources import mdb_usage
+from slapd.resources import process_usage
+
+
+def meta_page(psize, mapsize, last_pg, txnid):
+    page = struct.pack("=QHHI", 0, 0, 8, 0)
+    page += struct.pack("=IIQQ", MDB_MAGIC, 1, 0, mapsize)
+    page += struct.pack("=I44x48x", psize)
+    page += struct.pack("=QQ", last_pg, txnid)
+    return page.ljust(psize, b"\0")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs /proc")
+def test_process_usage():
+    usage = process_usage(os.getpid())
+    assert usage["rss"] > 0
+    assert usage["peak_rss"] >= usage["rss"]
+    assert usage["threads"] >= 1
+    assert usage["fds"] >= 3
+    assert usage["cpu_user"] + usage["cpu_system"] > 0
+    assert process_usage(-1) == {}
+
+
+def test_mdb_usage(tmp_path):
+    assert mdb_usage(str(tmp_path)) == {}
+
+    path = tmp_path / "data.mdb"
+    path.write_bytes(
+        meta_page(4096, 1000000, 9, 12)
+        + meta_page(4096, 2000000, 11, 13)
+        + b"\0" * 4096
+    )
+    usage = mdb_usage(str(tmp_path))
+    assert usage["mdb_file_size"] == 3 * 4096
+    assert usage["mdb_map_size"] == 2000000
+    assert usage["mdb_page_size"] == 4096
+    assert usage["mdb_pages"] == 12
+    assert usage["mdb_used"] == 12 * 4096
+
+    path.write_bytes(b"\0" * 4096)
+    assert mdb_usage(str(tmp_path)) == {
+        "mdb_file_size": 4096,
+        "mdb_disk_usage": os.stat(path).st_blocks * 512,
+    }
+
+
+class FakeSlapd:
+    def __init__(self):
+        self.calls = 0
+
+    def resource_usage(self):
+        self.calls += 1
+        return {"rss": self.calls * 10, "threads": 2}
+
+
+def test_sampler():
+    server = FakeSlapd()
+    with pytest.raises(ValueError):
+        ResourceSampler(server, interval=0)
+
+    with ResourceSampler(server, interval=0.01) as sampler:
+        while server.calls < 3:
+            pass
+    series = sampler.series()
+    assert len(series["rss"]) == len(sampler.samples) >= 4
+    assert series["rss"][0] == (0, 10)
+    assert sampler.peaks() == {"rss": server.calls * 10, "threads": 2}
+
+
+def test_resource_usage():
+    with slapd.Slapd() as server:
+        server.init_tree()
+        with server.sampler(interval=0.01) as sampler:
+            server.ldapsearch("(objectClass=*)", server.suffix)
+        usage = server.resource_usage()
+        assert usage["rss"] > 0
+        assert usage["mdb_page_size"] > 0
+        assert abs(usage["mdb_map_size"] - server.db_max_size) < usage["mdb_page_size"]
+        assert "mdb_pages" in sampler.series()
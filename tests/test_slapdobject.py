@@ -117,3 +117,52 @@ def test_return_codes():
     server.ldapadd("bad ldif", expected=(0, 247))
 
     server.stop()
+
+
+def test_snapshot_reset():
+    ou_ldif = (
+        "dn: ou=home,dc=slapd-test,dc=python-ldap,dc=org\n"
+        "objectClass: organizationalUnit\n"
+        "ou: home\n"
+    )
+    with slapd.Slapd() as server:
+        server.init_tree()
+        snapshot = server.snapshot()
+        assert "dc=slapd-test,dc=python-ldap,dc=org" in snapshot.entries
+
+        server.ldapadd(ou_ldif)
+        assert server.reset(snapshot) == "delete"
+        assert "ou=home" not in server.slapcat().stdout.decode("utf-8")
+
+        server.ldapadd(ou_ldif)
+        assert server.reset(snapshot, strategy="swap") == "swap"
+        assert "ou=home" not in server.slapcat().stdout.decode("utf-8")
+
+        server.ldapmodify(
+            "dn: dc=slapd-test,dc=python-ldap,dc=org\n"
+            "changetype: modify\n"
+            "add: description\n"
+            "description: foobar\n"
+        )
+        with pytest.raises(ValueError):
+            server.reset(snapshot, strategy="delete")
+        assert server.reset(snapshot) == "swap"
+        assert "foobar" not in server.slapcat().stdout.decode("utf-8")
+
+
+def test_iter_entries():
+    with slapd.Slapd() as server:
+        server.init_tree()
+
+        entries = list(
+            server.iter_ldapsearch("(objectClass=*)", server.suffix, attributes=["cn"])
+        )
+        assert [entry.dn for entry in entries] == [server.suffix, server.root_dn]
+        assert entries[1].attributes == {"cn": [server.root_cn]}
+
+        entries = server.iter_slapcat(attributes=["objectClass"])
+        assert next(entries).get("objectclass") == ["dcObject", "organization"]
+        entries.close()
+
+        with pytest.raises(RuntimeError):
+            list(server.iter_ldapsearch("(objectClass=*)", searchbase="dc=missing"))
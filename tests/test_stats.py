@@ -0,0 +1,67 @@
+import subprocess
+import sys
+
+import pytest
+
+import slapd
+from slapd.stats import Stats
+from slapd.stats import measure
+
+
+def test_measure():
+    stats = Stats(buckets=(0.5, 60))
+    with measure(stats, "command", "python") as record:
+        subprocess.run([sys.executable, "-c", "sum(range(10**6))"])
+        record.bytes_in = 3
+        record.bytes_out = 5
+    with pytest.raises(RuntimeError):
+        with measure(stats, "command", "python"):
+            raise RuntimeError()
+
+    assert record.wall > 0
+    assert record.cpu > 0
+    assert list(stats.records)[0] is record
+
+    values = stats.as_dict()["command"]["python"]
+    assert values["count"] == 2
+    assert values["errors"] == 1
+    assert values["bytes_in"] == 3
+    assert values["bytes_out"] == 5
+    assert values["histogram"][60] == 2
+    assert values["histogram"][float("inf")] == 2
+
+
+def test_measure_without_observer():
+    with measure(None, "phase", "nothing") as record:
+        pass
+    assert record.wall == 0
+
+
+def test_to_prometheus():
+    stats = Stats(buckets=(1,))
+    with measure(stats, "phase", "start_slapd"):
+        pass
+    text = stats.to_prometheus()
+    assert "# TYPE slapd_phase_seconds histogram\n" in text
+    assert 'slapd_phase_seconds_bucket{name="start_slapd",le="1.0"} 1\n' in text
+    assert 'slapd_phase_seconds_bucket{name="start_slapd",le="+Inf"} 1\n' in text
+    assert 'slapd_phase_seconds_count{name="start_slapd"} 1\n' in text
+    assert 'slapd_phase_errors_total{name="start_slapd"} 0\n' in text
+
+
+def test_slapd_observer():
+    stats = Stats()
+    with slapd.Slapd(observer=stats) as server:
+        server.init_tree()
+        server.ldapwhoami()
+
+    values = stats.as_dict()
+    assert set(values["phase"]) >= {
+        "cleanup_rundir",
+        "setup_rundir",
+        "configure",
+        "start_slapd",
+        "stop_slapd",
+    }
+    assert values["command"]["ldapadd"]["bytes_in"] > 0
+    assert values["command"]["ldapwhoami"]["bytes_out"] > 0
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+import slapd
+from slapd.storage import filesystem_type
+from slapd.storage import free_space
+from slapd.storage import memory_directory
+
+MOUNTS = """\
+/dev/sda1 / ext4 rw,relatime 0 0
+tmpfs /dev/shm tmpfs rw,nosuid,nodev 0 0
+tmpfs /mnt/with\\040space tmpfs rw 0 0
+tmpfs /media/日本 tmpfs rw 0 0
+"""
+
+
+def test_filesystem_type(tmp_path):
+    mounts = tmp_path / "mounts"
+    mounts.write_text(MOUNTS, encoding="utf-8")
+    assert filesystem_type("/dev/shm/foo", str(mounts)) == "tmpfs"
+    assert filesystem_type("/dev/shmfoo", str(mounts)) == "ext4"
+    assert filesystem_type("/mnt/with space/bar", str(mounts)) == "tmpfs"
+    assert filesystem_type("/media/日本/bar", str(mounts)) == "tmpfs"
+    assert filesystem_type("/", str(tmp_path / "missing")) is None
+
+
+def test_memory_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("SLAPD_EPHEMERAL_DIR", str(tmp_path))
+    assert memory_directory() == str(tmp_path)
+    assert free_space(str(tmp_path)) > 0
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="no /dev/shm")
+def test_ephemeral():
+    server = slapd.Slapd(ephemeral=True, db_max_size=10 * 1024 * 1024)
+    assert server.testrundir.startswith(server.tmpdir)
+    assert {"nosync", "writemap"} <= set(server.db_env_flags)
+    with server:
+        server.init_tree()
+        assert server.ldapwhoami().returncode == 0
+
+    server = slapd.Slapd(ephemeral=True, db_max_size=2**62)
+    with pytest.raises(ValueError):
+        server.start()
+    server.stop()
@@ -0,0 +1,136 @@
+import pytest
+
+import slapd
+from slapd.tenant import Tenant
+from slapd.tenant import _escape_filter
+from slapd.tenant import _in_subtree
+
+
+class FakeSlapd:
+    database = "mdb"
+    root_dn = "cn=Manager,dc=example"
+    root_pw = "password"
+    db_max_size = 1000
+    db_env_flags = ["nosync"]
+    db_no_sync = False
+
+    def __init__(self, testrundir):
+        self.testrundir = testrundir
+        self.loaded = []
+
+    def ldapadd(self, ldif, extra_args=None, expected=0):
+        return (ldif, expected)
+
+    def bulk_load(self, source, extra_args=None, progress=None, expected=0):
+        for chunk in source:
+            self.loaded.append(chunk)
+
+
+def test_tenant_ldif(tmp_path):
+    server = FakeSlapd(str(tmp_path))
+    tenant = Tenant(server, "foo", indexes={"cn": "eq"})
+    assert tenant.suffix == "dc=foo"
+    assert tenant.root_dn == "cn=Manager,dc=foo"
+    assert tenant.root_pw == "password"
+    assert tenant._database_ldif() == (
+        "dn: olcDatabase=mdb,cn=config\n"
+        "objectClass: olcDatabaseConfig\n"
+        "objectClass: olcMdbConfig\n"
+        "olcDatabase: mdb\n"
+        "olcSuffix: dc=foo\n"
+        "olcRootDN: cn=Manager,dc=foo\n"
+        "olcRootPW: password\n"
+        f"olcDbDirectory: {tmp_path / 'tenant-foo'}\n"
+        "olcDbMaxSize: 1000\n"
+        'olcAccess: {0}to * by dn.exact="cn=Manager,dc=example" manage by * none\n'
+        "olcDbIndex: cn eq\n"
+        "olcDbEnvFlags: nosync\n"
+    )
+
+    with pytest.raises(ValueError):
+        Tenant(server, "../foo")
+    with pytest.raises(ValueError):
+        Tenant(server, "foo", indexes={"cn": "fuzzy"})._database_ldif()
+    assert _escape_filter("o=a*(b)\\") == "o=a\\2a\\28b\\29\\5c"
+
+
+def test_tenant_scope(tmp_path):
+    tenant = Tenant(FakeSlapd(str(tmp_path)), "foo", suffix="dc=foo,dc=example")
+    assert _in_subtree("ou=People, DC=foo,dc=example", tenant.suffix)
+    assert not _in_subtree("dc=foo", tenant.suffix)
+    assert not _in_subtree("dc=notfoo,dc=example", tenant.suffix)
+
+    with pytest.raises(ValueError):
+        tenant.ldapadd("dn: cn=Manager,dc=example\nobjectClass: applicationProcess\n")
+    with pytest.raises(ValueError):
+        tenant.ldapmodify(
+            "dn: ou=people,dc=foo,dc=example\n"
+            "changetype: modrdn\n"
+            "newrdn: ou=people\n"
+            "deleteoldrdn: 1\n"
+            "newsuperior: dc=example\n"
+        )
+    with pytest.raises(ValueError):
+        tenant.ldapdelete("dc=example")
+    with pytest.raises(ValueError):
+        tenant.ldapadd("dn: cn=a,dc=foo,dc=ex\n ample\n\ndn: cn=b,dc=example\n")
+    with pytest.raises(ValueError):
+        tenant.ldapadd(None, extra_args=["-f", "/tmp/content.ldif"])
+    # invalid content is left to the tool
+    assert tenant.ldapadd("bad ldif", expected=247) == ("bad ldif", 247)
+
+    batch = tenant.batch()
+    batch.add("cn=a,dc=foo,dc=example", {"cn": ["a"]})
+    with pytest.raises(ValueError):
+        batch.add("cn=a,dc=example", {"cn": ["a"]})
+    with pytest.raises(ValueError):
+        batch.modrdn("cn=a,dc=foo,dc=example", "cn=b", newsuperior="dc=example")
+    assert len(batch) == 1
+
+
+def test_tenant_bulk_load_scope(tmp_path):
+    server = FakeSlapd(str(tmp_path))
+    tenant = Tenant(server, "foo", suffix="dc=foo,dc=example")
+    chunks = [
+        b"dn: cn=a,dc=foo,dc=example\ncn: a\n\ndn: cn=b,dc=f",
+        b"oo,dc=example\ncn: b\n\ndn: cn=c,dc=example\ncn: c\n",
+    ]
+    with pytest.raises(ValueError):
+        for chunk in tenant._checked_chunks(chunks):
+            server.loaded.append(chunk)
+    # nothing past the rejected DN was sent
+    assert b"".join(server.loaded) == b"dn: cn=a,dc=foo,dc=example\ncn: a\n\n"
+
+    server.loaded.clear()
+    tenant.bulk_load(iter(chunks[:1] + [b"oo,dc=example\ncn: b\n"]))
+    assert b"".join(server.loaded).count(b"dn: ") == 2
+    with pytest.raises(ValueError):
+        tenant.bulk_load(b"dn: cn=c,dc=example\ncn: c\n")
+
+
+def test_tenants():
+    with slapd.Slapd() as server:
+        server.init_tree()
+        first = server.add_tenant()
+        second = server.add_tenant("second", suffix="dc=second,dc=example")
+        assert set(server.tenants) == {"tenant-1", "second"}
+        with pytest.raises(ValueError):
+            server.add_tenant("second")
+
+        first.init_tree()
+        second.init_tree()
+        second.ldapadd(
+            "dn: ou=people,dc=second,dc=example\n"
+            "objectClass: organizationalUnit\n"
+            "ou: people\n"
+        )
+        assert [entry.dn for entry in first.iter_ldapsearch("(ou=people)")] == []
+        assert [entry.dn for entry in second.iter_ldapsearch("(ou=people)")] == [
+            "ou=people,dc=second,dc=example"
+        ]
+        assert len(list(second.iter_slapcat())) == 3
+        assert len(list(server.iter_ldapsearch("(objectClass=*)", server.suffix))) == 2
+
+        second.remove()
+        assert set(server.tenants) == {"tenant-1"}
+        second.ldapsearch("(objectClass=*)", expected=32)
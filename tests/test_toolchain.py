@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+import slapd
+from slapd.toolchain import Toolchain
+
+VERSION = """@(#) $OpenLDAP: slapd 2.6.7 (Feb 12 2024 18:00:00) $
+\topenldap
+"""
+
+STATIC = """Included static overlays:
+    syncprov
+Included static backends:
+    config
+    ldif
+    mdb
+"""
+
+
+@pytest.fixture
+def toolchain(tmp_path, monkeypatch):
+    sbin = tmp_path / "sbin"
+    sbin.mkdir()
+    slapd = sbin / "slapd"
+    slapd.write_text(
+        "#!/bin/sh\n"
+        f"cat <<'EOF'\n{VERSION}EOF\n"
+        f'if [ "$1" = "-VVV" ]; then cat <<\'EOF\'\n{STATIC}EOF\nfi\n'
+    )
+    slapd.chmod(0o755)
+    (tmp_path / "bin").mkdir()
+    ldapadd = tmp_path / "bin" / "ldapadd"
+    ldapadd.write_text("#!/bin/sh\n")
+    ldapadd.chmod(0o755)
+    modules = tmp_path / "modules"
+    modules.mkdir()
+    (modules / "memberof.so").touch()
+    (modules / "back_ldap.so").touch()
+    (modules / "back_ldap.la").touch()
+    schemas = tmp_path / "schema"
+    schemas.mkdir()
+    (schemas / "core.ldif").touch()
+    (schemas / "core.schema").touch()
+
+    monkeypatch.delenv("SLAPD", raising=False)
+    monkeypatch.setenv("SLAPD_MODULEPATH", str(modules))
+    monkeypatch.setenv("SCHEMA", str(schemas))
+    return Toolchain(str(tmp_path / "bin"), str(sbin))
+
+
+def test_toolchain(toolchain, tmp_path):
+    assert toolchain.command("ldapadd") == str(tmp_path / "bin" / "ldapadd")
+    with pytest.raises(ValueError, match="BIN"):
+        toolchain.command("ldapsearch")
+    with pytest.raises(ValueError, match="SBIN"):
+        toolchain.command("slapadd", in_sbin=True)
+    assert toolchain.slapd == str(tmp_path / "sbin" / "slapd")
+
+    assert toolchain.version == VERSION
+    assert toolchain.version_info == (2, 6, 7)
+    assert toolchain.static_backends == {"config", "ldif", "mdb"}
+    assert toolchain.static_overlays == {"syncprov"}
+    assert toolchain.modules == {
+        "back_ldap": str(tmp_path / "modules" / "back_ldap.la"),
+        "memberof": str(tmp_path / "modules" / "memberof.so"),
+    }
+    assert toolchain.has_backend("mdb")
+    assert toolchain.has_backend("ldap")
+    assert not toolchain.has_backend("sql")
+    assert toolchain.has_overlay("syncprov")
+    assert toolchain.has_overlay("memberof")
+    assert not toolchain.has_overlay("ppolicy")
+    assert toolchain.schema_dir == str(tmp_path / "schema")
+    assert toolchain.schemas == {"core.ldif"}
+
+    toolchain.check("mdb", [str(tmp_path / "schema" / "core.ldif")], ["memberof"])
+    with pytest.raises(ValueError):
+        toolchain.check("sql")
+    with pytest.raises(ValueError):
+        toolchain.check("mdb", [str(tmp_path / "schema" / "nis.ldif")])
+    with pytest.raises(ValueError):
+        toolchain.check("mdb", overlays=["ppolicy"])
+
+
+def test_toolchain_memoized(toolchain, tmp_path):
+    assert toolchain.version == VERSION
+    os.remove(toolchain.slapd)
+    assert toolchain.version_info == (2, 6, 7)
+
+    first = Toolchain.get(str(tmp_path / "bin"), str(tmp_path / "sbin"))
+    assert Toolchain.get(str(tmp_path / "bin"), str(tmp_path / "sbin")) is first
+    assert Toolchain.get(str(tmp_path / "bin"), str(tmp_path)) is not first
+
+
+def test_toolchain_unknown_static(toolchain, tmp_path):
+    (tmp_path / "sbin" / "slapd").write_text("#!/bin/sh\necho slapd\n")
+    assert toolchain.static_backends is None
+    assert toolchain.version_info is None
+    assert toolchain.has_backend("sql")
+
+
+def test_slapd_schemadir(monkeypatch, tmp_path):
+    monkeypatch.setenv("SCHEMA", str(tmp_path))
+    assert slapd.Slapd.SCHEMADIR == str(tmp_path)
+
+    class CustomSlapd(slapd.Slapd):
+        SCHEMADIR = "/custom/schema"
+
+    assert CustomSlapd.SCHEMADIR == "/custom/schema"
@@ -0,0 +1,89 @@
+import pytest
+
+import slapd
+from slapd.tuning import database_options
+from slapd.tuning import global_options
+from slapd.tuning import index_lines
+
+
+def test_index_lines():
+    assert index_lines({"objectClass": "eq", "cn": ["eq", "sub"]}) == [
+        "olcDbIndex: objectClass eq\n",
+        "olcDbIndex: cn eq,sub\n",
+    ]
+    assert index_lines(None) == []
+    with pytest.raises(ValueError):
+        index_lines({"cn": "eq,bogus"})
+    with pytest.raises(ValueError):
+        index_lines({"cn eq": "eq"})
+    with pytest.raises(ValueError):
+        index_lines({"cn": ""})
+
+
+def test_global_options():
+    assert global_options() == ""
+    assert global_options(threads=8, listener_threads=2, conn_max_pending=10) == (
+        "olcThreads: 8\nolcListenerThreads: 2\nolcConnMaxPending: 10\n"
+    )
+    with pytest.raises(ValueError):
+        global_options(threads=1)
+    with pytest.raises(ValueError):
+        global_options(listener_threads=3)
+    with pytest.raises(ValueError):
+        global_options(conn_max_pending="10")
+
+
+def test_database_options():
+    assert database_options() == ""
+    assert database_options(
+        indexes={"uid": "eq"},
+        env_flags=["writemap", "nometasync"],
+        no_sync=True,
+        checkpoint=(1024, 5),
+        size_limit="unlimited",
+        time_limit=0,
+    ) == (
+        "olcDbIndex: uid eq\n"
+        "olcDbEnvFlags: writemap\n"
+        "olcDbEnvFlags: nometasync\n"
+        "olcDbNoSync: TRUE\n"
+        "olcDbCheckpoint: 1024 5\n"
+        "olcSizeLimit: unlimited\n"
+        "olcTimeLimit: 0\n"
+    )
+    with pytest.raises(ValueError):
+        database_options(env_flags=["fast"])
+    with pytest.raises(ValueError):
+        database_options(checkpoint=(-1, 5))
+    with pytest.raises(ValueError):
+        database_options(size_limit=-1)
+
+
+def test_slapd_tuning():
+    server = slapd.Slapd(
+        indexes={"objectClass": "eq", "cn": "eq,sub"},
+        db_max_size=2**30,
+        db_env_flags=["writemap"],
+        threads=4,
+        size_limit=10,
+    )
+    config = server._gen_config()
+    assert "olcDbMaxSize: 1073741824\n" in config
+    assert "olcDbIndex: cn eq,sub\n" in config
+    assert "olcThreads: 4\n\ndn: cn=module" in config
+
+    with server:
+        server.init_tree()
+        entries = server.iter_ldapsearch(
+            "(objectClass=*)",
+            "cn=config",
+            attributes=["olcDbIndex", "olcThreads"],
+        )
+        values = {
+            (name, value)
+            for entry in entries
+            for name, values in entry.attributes.items()
+            for value in values
+        }
+        assert ("olcDbIndex", "cn eq,sub") in values
+        assert ("olcThreads", "4") in values